@@ -2,66 +2,211 @@
 from .query_classifier_agent import QueryClassifierAgent
 from .prompt_crafter_agent import PromptCrafterAgent
 from .result_validator_agent import ResultValidatorAgent
+from .run_budget import RunBudget
+from .metadata_answer_agent import MetadataAnswerAgent
+from .local_query_classifier import LocalQueryClassifier, split_sentences
 from services.agent_search_service import AgentSearchService
+from data_loaders.ocr_index import quoted_text
+from llm_connectors.image_payload import warm_image_payloads
 from utilities.json_parser import parse_json_response
+from utilities.rank_fusion import reciprocal_rank_fusion
+from config import Config
+import asyncio
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+class RunContext:
+    """State of one `process_query` run, so concurrent runs on a shared orchestrator do not overwrite each other."""
+
+    def __init__(self, budget, progress_callback=None):
+        self.budget = budget
+        self.progress_callback = progress_callback
+        self.speculative_queries = []
+        self.speculative_task = None
+
+    def report_progress(self, stage, message=''):
+        if self.progress_callback:
+            self.progress_callback(stage, message)
+
+def create_local_classifier(model=None):
+    """
+    Local classifier that matches ambiguous queries against logged LLM
+    classifications with CLIP text embeddings of `model`. Build one per
+    process and pass it to every AgentOrchestrator.
+    """
+    if not Config.LOCAL_CLASSIFIER_ENABLED:
+        return None
+    if model is None:
+        return LocalQueryClassifier()
+
+    def encode(text):
+        from utilities.model_utils import encode_text
+        return encode_text(model, text).float().cpu().numpy().ravel()
+
+    vectors_path = f"{os.path.splitext(Config.CLASSIFICATION_LOG_PATH)[0]}_vectors.npz"
+    return LocalQueryClassifier(encode=encode, vectors_path=vectors_path, encoder_name=Config.TEXT_ENCODER_MODE)
+
 class AgentOrchestrator:
-    def __init__(self, llm_connector, search_service):
+    def __init__(self, llm_connector, search_service, local_classifier=None):
         logger.debug("Initializing AgentOrchestrator")
         self.llm_connector = llm_connector
         self.search_service = search_service
-        self.query_classifier = QueryClassifierAgent(llm_connector)
+        if local_classifier is None:
+            local_classifier = create_local_classifier(getattr(search_service, 'model', None))
+        self.query_classifier = QueryClassifierAgent(llm_connector, local_classifier)
         self.prompt_crafter = PromptCrafterAgent(llm_connector)
         self.result_validator = ResultValidatorAgent(llm_connector)
+        self.metadata_answerer = MetadataAnswerAgent()
+        # Summary of the most recently finished run; concurrent callers read their own budget's summary()
+        self.last_run_summary = None
 
-    async def process_query(self, raw_query, top_k, human_verified_classification=None):
+    async def process_query(self, raw_query, top_k, human_verified_classification=None, budget=None, progress_callback=None):
         logger.info(f"Processing query: {raw_query}")
-        # Step 1: Query Classification
-        if not human_verified_classification:
-            classification = await self.query_classifier.classify_query(raw_query)
-        else:
-            classification = human_verified_classification
+        run = RunContext(budget or RunBudget.from_config(), progress_callback)
+        self.start_speculative_search(run, raw_query, top_k)
+
+        try:
+            # Step 1: Query Classification
+            if not human_verified_classification:
+                run.report_progress('classification', 'Classifying query')
+                classification = await self.query_classifier.classify_query(raw_query, run.budget)
+            else:
+                classification = human_verified_classification
 
-        # Step 2: Prompt Crafting
-        crafted_prompts = await self.prompt_crafter.craft_prompts(classification)
+            # Step 2: Prompt Crafting
+            run.report_progress('prompt_crafting', f"Crafting prompts for {len(classification['scenes'])} scene(s)")
+            crafted_prompts = await self.prompt_crafter.craft_prompts(classification, run.budget)
 
-        # Step 3: Search and Validation
-        results = await self.search_and_validate(classification, crafted_prompts, top_k)
+            # Step 3: Search and Validation
+            results = await self.search_and_validate(run, classification, crafted_prompts, top_k)
+        finally:
+            if run.speculative_task and not run.speculative_task.done():
+                run.speculative_task.cancel()
+            self.last_run_summary = run.budget.summary()
+            logger.info(f"Run summary: {self.last_run_summary}")
 
         return results
 
-    async def search_and_validate(self, classification, crafted_prompts, top_k):
+    def start_speculative_search(self, run, raw_query, top_k):
+        """Search the raw query and its sentences while the LLM plans, so retrieval overlaps classification."""
+        run.speculative_queries, run.speculative_task = [], None
+        if not Config.SPECULATIVE_SEARCH_ENABLED:
+            return
+        sentences = split_sentences(raw_query)
+        queries = [raw_query] + (sentences if len(sentences) > 1 else [])
+        run.speculative_queries = queries[:Config.SPECULATIVE_MAX_QUERIES]
+        captions = Config.SPECULATIVE_CAPTION_SEARCH
+        if captions:
+            run.budget.record_embedding_calls(len(run.speculative_queries))
+        run.speculative_task = asyncio.create_task(self.speculative_search(run.speculative_queries, top_k, captions))
+
+    async def speculative_search(self, queries, top_k, captions=False):
+        """Per-query candidates, with their metadata and vision payloads warmed; [] if the search fails."""
+        try:
+            result_lists = await self.search_service.multi_query_search(queries, top_k, captions)
+            image_paths = [result['image_path'] for result in reciprocal_rank_fusion(result_lists)[:top_k]]
+            await asyncio.gather(self.search_service.load_metadata(image_paths), warm_image_payloads(image_paths))
+            return result_lists
+        except Exception as e:
+            logger.warning(f"Speculative search failed: {e}")
+            return []
+
+    async def speculative_candidates(self, run, scene_index, number_of_scenes):
+        """
+        Speculative results relevant to a scene: all of them for a single-scene
+        query, the matching sentence's when the query has one sentence per
+        scene, none otherwise (the raw query mixes scenes). Waits for the
+        speculative search no longer than the run's deadline allows.
+        """
+        if run.speculative_task is None:
+            return []
+        try:
+            # Shielded so a later scene can still use the results once they arrive
+            result_lists = await asyncio.wait_for(asyncio.shield(run.speculative_task), run.budget.remaining_seconds())
+        except asyncio.TimeoutError:
+            run.budget.record_skip('speculative_search', 'deadline')
+            return []
+        if not result_lists:
+            return []
+        if number_of_scenes == 1:
+            return reciprocal_rank_fusion(result_lists)
+        sentence_lists = result_lists[1:]
+        if len(sentence_lists) == number_of_scenes:
+            return sentence_lists[scene_index]
+        return []
+
+    def merge_speculative(self, search_results, speculative_results):
+        """Rank-fuse speculative candidates into the crafted-prompt results without growing the candidate count."""
+        if not speculative_results:
+            return search_results
+        fused = reciprocal_rank_fusion([search_results, speculative_results], weights=[1.0, Config.SPECULATIVE_MERGE_WEIGHT])
+        # Crafted-prompt fields (e.g. distance) take precedence over the raw query's
+        crafted = {result['image_path']: result for result in search_results}
+        return [{**result, **crafted.get(result['image_path'], {})} for result in fused[:max(len(search_results), 1)]]
+
+    async def search_and_validate(self, run, classification, crafted_prompts, top_k):
         logger.debug("Starting search and validation")
         results = []
-        for scene_index, scene in enumerate(classification['scenes']):
-            scene_results = await self.process_scene(scene, crafted_prompts, scene_index, top_k)
+        scenes = classification['scenes']
+        for scene_index, scene in enumerate(scenes):
+            if run.budget.deadline_passed():
+                run.budget.record_skip('search', 'deadline', len(scenes) - scene_index)
+                break
+
+            scene_results = await self.process_scene(run, scene, crafted_prompts, scene_index, top_k, len(scenes))
             results.extend(scene_results)
 
-            if classification['temporal'] and scene_index < len(classification['scenes']) - 1:
-                exact_match_found = await self.find_next_scene(scene_results, crafted_prompts, scene_index + 1, classification)
+            if classification['temporal'] and scene_index < len(scenes) - 1:
+                exact_match_found = await self.find_next_scene(run, scene_results, crafted_prompts, scene_index + 1, classification)
                 if exact_match_found:
                     # If an exact match is found, stop searching for other alternatives
                     break
 
         return results
 
-    async def process_scene(self, scene, crafted_prompts, scene_index, top_k):
+    async def process_scene(self, run, scene, crafted_prompts, scene_index, top_k, number_of_scenes=1):
         logger.debug(f"Processing scene {scene_index}")
         clip_prompt = crafted_prompts['clip_prompts'][scene_index]['prompt']
         caption_prompt = crafted_prompts['caption_prompts'][scene_index]['prompt']
 
+        question = scene.get('specific_question') or crafted_prompts.get('question')
+        # On-screen text quoted in the scene or its question is also looked up in the OCR index
+        ocr_query = quoted_text(scene.get('description'), caption_prompt, question)
+
         # Perform search with user-provided top_k
-        search_results = await self.search_service.agent_search(clip_prompt, caption_prompt, top_k)
+        run.report_progress('search', f"Searching scene {scene_index + 1}: {clip_prompt}")
+        search_results = await self.search_service.agent_search(clip_prompt, caption_prompt, top_k, ocr_query)
+        search_results = self.merge_speculative(search_results, await self.speculative_candidates(run, scene_index, number_of_scenes))
+
+        # Question scenes: candidates answered confidently from OCR / count metadata skip the vision calls
+        answered_results = []
+        if scene.get('question') and question and search_results:
+            answered_results, search_results = await self.answer_from_metadata(search_results, question)
+            if answered_results:
+                run.budget.record_avoided('validation', len(answered_results) * len(crafted_prompts['clip_prompts']))
+                run.report_progress('validation', f"Answered {len(answered_results)} candidates for scene {scene_index + 1} from metadata")
 
         # Validate results
-        validated_results = await self.result_validator.validate_results(search_results, crafted_prompts)
-
-        return validated_results
+        run.report_progress('validation', f"Validating {len(search_results)} candidates for scene {scene_index + 1}")
+        validated_results = await self.result_validator.validate_results(search_results, crafted_prompts, run.budget)
+
+        return answered_results + validated_results
+
+    async def answer_from_metadata(self, search_results, question):
+        """Split `search_results` into (answered from metadata, still needing the vision validator)."""
+        metadata = await self.search_service.load_metadata([result['image_path'] for result in search_results])
+        answered, remaining = [], []
+        for result in search_results:
+            answer = self.metadata_answerer.answer(question, metadata.get(result['image_path'], {}))
+            if self.metadata_answerer.is_confident(answer):
+                answered.append(self.metadata_answerer.answered_result(result, answer))
+            else:
+                remaining.append(result)
+        return answered, remaining
 
-    async def find_next_scene(self, current_scene_results, crafted_prompts, next_scene_index, classification):
+    async def find_next_scene(self, run, current_scene_results, crafted_prompts, next_scene_index, classification):
         logger.debug(f"Finding next scene. Current index: {next_scene_index - 1}")
         exact_match_found = False
         matching_frame = None
@@ -72,27 +217,35 @@ class AgentOrchestrator:
             key=lambda x: ('2' if x['match_assessment']['category'] == 'Near Match' else '1', -x['match_assessment']['confidence'])
         )
 
-        for result in sorted_results:
-            if result['match_assessment']['category'] in ["Exact Match", "Near Match"]:
-                next_frames = await self.search_service.get_next_frames(result['image_path'], 3)
-                next_scene_prompt = crafted_prompts['clip_prompts'][next_scene_index]['prompt']
-                validated_next_frames = await self.result_validator.validate_results(next_frames, {'clip_prompts': [{'prompt': next_scene_prompt}]})
-
-                # Check if any of the validated next frames is an exact match
-                for next_frame in validated_next_frames:
-                    if next_frame['match_assessment']['category'] == "Exact Match":
-                        exact_match_found = True
-                        matching_frame = next_frame
-                        result['next_scene'] = matching_frame
-                        break
-
-                if exact_match_found:
+        candidates = [result for result in sorted_results if result['match_assessment']['category'] in ["Exact Match", "Near Match"]]
+        # Neighbour lookups are in-memory, resolve every candidate's next frames at once
+        next_frames_batch = await self.search_service.get_next_frames_batch([result['image_path'] for result in candidates], 3)
+
+        for result, next_frames in zip(candidates, next_frames_batch):
+            reason = run.budget.exhausted_reason()
+            if reason:
+                run.budget.record_skip('temporal_expansion', reason)
+                break
+
+            run.report_progress('temporal_expansion', f"Checking frames after {result['image_path']} for scene {next_scene_index + 1}")
+            next_scene_prompt = crafted_prompts['clip_prompts'][next_scene_index]['prompt']
+            validated_next_frames = await self.result_validator.validate_results(next_frames, {'clip_prompts': [{'prompt': next_scene_prompt}]}, run.budget)
+
+            # Check if any of the validated next frames is an exact match
+            for next_frame in validated_next_frames:
+                if next_frame['match_assessment']['category'] == "Exact Match":
+                    exact_match_found = True
+                    matching_frame = next_frame
+                    result['next_scene'] = matching_frame
                     break
 
+            if exact_match_found:
+                break
+
         if exact_match_found and matching_frame:
             # If there are more scenes, continue the search
             if next_scene_index + 1 < len(classification['scenes']):
-                next_exact_match = await self.find_next_scene([matching_frame], crafted_prompts, next_scene_index + 1, classification)
+                next_exact_match = await self.find_next_scene(run, [matching_frame], crafted_prompts, next_scene_index + 1, classification)
                 return next_exact_match
             else:
                 return True
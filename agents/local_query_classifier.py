@@ -0,0 +1,242 @@
+# agents/local_query_classifier.py
+import json
+import os
+import re
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from data_loaders.ocr_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Markers are matched on folded (lower-case, diacritic-free) text, English and Vietnamese
+TEMPORAL_MARKERS = re.compile(
+    r'\b(then|after|afterwards|before|next(?! to\b)|later|followed by|finally|subsequently|meanwhile|'
+    r'sau do|tiep theo|sau khi|truoc khi|cuoi cung|tiep do|roi sau)\b')
+QUESTION_WORDS = re.compile(
+    r'\b(how many|how much|what is|what are|bao nhieu|la gi|cai gi|o dau|khi nao|tai sao|vi sao|ai la)\b')
+# Matched on lower-cased text with diacritics kept: folding turns "Đó"/"Đồ" into "do".
+# A wh-word only starts a question when an auxiliary follows ("when does", not "when the sun sets")
+QUESTION_STARTERS = re.compile(
+    r'^(is|are|was|were|does|do|did|can|could|will|has|have)\s|'
+    r'^(how|what|which|who|whom|whose|when|where|why)\s+'
+    r'(is|are|was|were|does|do|did|can|could|will|has|have|many|much|color|colour|kind|type|time)\b')
+VIETNAMESE_INTERROGATIVES = re.compile(r'(?<!\w)(bao nhiêu|gì|nào|đâu|mấy|tại sao|vì sao)(?!\w)')
+# Relative-clause words that can also start questions; on their own they make a query ambiguous
+AMBIGUOUS_WORDS = re.compile(r'\b(who|which|where|when|what)\b')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# Nearest logged LLM classification must be at least this similar to be reused
+EXAMPLE_SIMILARITY = 0.92
+MAX_EXAMPLES = 500
+
+
+def append_classification_log(entry, path=None):
+    """Append one classification record to the JSONL log used for evaluation."""
+    path = path or Config.CLASSIFICATION_LOG_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def read_classification_log(path=None, source='llm'):
+    """Logged entries from `source` ('llm' or 'local'), oldest first."""
+    path = path or Config.CLASSIFICATION_LOG_PATH
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if source is None or entry.get('source') == source:
+                entries.append(entry)
+    return entries
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text or '') if sentence.strip()]
+
+
+def single_scene(description, question=None):
+    return {
+        "temporal": False,
+        "question": question is not None,
+        "number_of_scenes": 1,
+        "scenes": [
+            {
+                "scene": 1,
+                "description": description,
+                "question": question is not None,
+                "specific_question": question
+            }
+        ]
+    }
+
+
+class LocalQueryClassifier:
+    """
+    Rule-based classifier for simple queries, producing the same schema as
+    QueryClassifierAgent. Returns a confidence with every classification so
+    ambiguous queries (temporal markers, relative clauses, several questions)
+    can fall back to the LLM.
+
+    With an `encode` function (text -> normalized vector), queries that the
+    rules find ambiguous are also compared against logged LLM classifications
+    and take the flags of a near-identical single-scene example. Example
+    vectors are cached at `vectors_path` (tagged with `encoder_name`), so a
+    restart only encodes queries logged since. One instance is meant to be
+    shared by every orchestrator of a process.
+    """
+
+    def __init__(self, encode: Optional[Callable[[str], np.ndarray]] = None, min_confidence: Optional[float] = None,
+                 vectors_path: Optional[str] = None, encoder_name: str = ''):
+        self.encode = encode
+        self.min_confidence = Config.LOCAL_CLASSIFIER_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.vectors_path = vectors_path
+        self.encoder_name = encoder_name
+        self.example_vectors = None
+        self.example_classifications = []
+        # Examples are loaded and added from worker threads of concurrent requests
+        self.lock = threading.Lock()
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.min_confidence
+
+    def classify(self, query: str) -> Tuple[Dict[str, Any], float]:
+        query = (query or '').strip()
+        if not query:
+            return single_scene(query), 0.0
+        folded = fold_text(query)
+        sentences = split_sentences(query)
+
+        if TEMPORAL_MARKERS.search(folded):
+            # Scene breakdown needs the LLM's judgement
+            return single_scene(query), 0.3
+
+        questions = [sentence for sentence in sentences if self._is_question(sentence)]
+        if len(questions) > 1:
+            return single_scene(query), 0.4
+        if questions:
+            description = ' '.join(sentence for sentence in sentences if sentence not in questions) or query
+            return single_scene(description, questions[0]), 0.8
+
+        if AMBIGUOUS_WORDS.search(folded):
+            return self._classify_by_example(query)
+        return single_scene(query), 0.9
+
+    def _is_question(self, sentence):
+        if sentence.endswith('?') or QUESTION_WORDS.search(fold_text(sentence)):
+            return True
+        lowered = sentence.lower()
+        return bool(QUESTION_STARTERS.search(lowered) or VIETNAMESE_INTERROGATIVES.search(lowered))
+
+    def _classify_by_example(self, query):
+        """Reuse the flags of a near-identical logged LLM classification, if any."""
+        if self.encode is None:
+            return single_scene(query), 0.6
+        self.load_examples()
+        with self.lock:
+            example_vectors, example_classifications = self.example_vectors, self.example_classifications
+        if example_vectors is None or len(example_vectors) == 0:
+            return single_scene(query), 0.6
+
+        similarities = example_vectors @ np.asarray(self.encode(query), dtype=np.float32).ravel()
+        best = int(np.argmax(similarities))
+        example = example_classifications[best]
+        if similarities[best] >= EXAMPLE_SIMILARITY and not example.get('temporal') and not example.get('question'):
+            return single_scene(query), float(similarities[best])
+        return single_scene(query), 0.6
+
+    def needs_examples(self) -> bool:
+        return self.encode is not None and self.example_vectors is None
+
+    def load_examples(self):
+        """Encode the logged LLM classifications once; blocking, so async callers run it in a thread."""
+        with self.lock:
+            if not self.needs_examples():
+                return
+            entries = read_classification_log()[-MAX_EXAMPLES:]
+            cached = self._read_cached_vectors()
+            vectors = [cached.get(entry['query']) for entry in entries]
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            for i in missing:
+                vectors[i] = np.asarray(self.encode(entries[i]['query']), dtype=np.float32).ravel()
+            if missing:
+                self._write_cached_vectors([entry['query'] for entry in entries], vectors)
+            self.example_vectors = np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+            self.example_classifications = [entry['classification'] for entry in entries]
+
+    def add_example(self, query: str, classification: Dict[str, Any]):
+        """Make a fresh LLM classification available for example matching."""
+        if self.encode is None or self.example_vectors is None:
+            return
+        vector = np.asarray(self.encode(query), dtype=np.float32).ravel()
+        with self.lock:
+            self.example_vectors = np.vstack([self.example_vectors, vector]) if len(self.example_vectors) else vector[None, :]
+            self.example_classifications = self.example_classifications + [classification]
+
+    def _read_cached_vectors(self):
+        """Query -> vector from the cache at `vectors_path`, if it was written by the same encoder."""
+        if not self.vectors_path or not os.path.exists(self.vectors_path):
+            return {}
+        try:
+            with np.load(self.vectors_path, allow_pickle=False) as data:
+                if str(data['encoder']) != self.encoder_name:
+                    return {}
+                return dict(zip(data['queries'].tolist(), data['vectors']))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring classification vector cache {self.vectors_path}: {e}")
+            return {}
+
+    def _write_cached_vectors(self, queries, vectors):
+        if not self.vectors_path or not vectors:
+            return
+        tmp_path = f"{self.vectors_path}.tmp.npz"
+        try:
+            np.savez(tmp_path, queries=np.array(queries), vectors=np.stack(vectors), encoder=np.array(self.encoder_name))
+            os.replace(tmp_path, self.vectors_path)
+        except OSError as e:
+            logger.warning(f"Could not write classification vector cache: {e}")
+
+
+def log_classification(query: str, classification: Dict[str, Any], source: str, confidence: Optional[float] = None):
+    try:
+        append_classification_log({
+            'timestamp': time.time(),
+            'query': query,
+            'source': source,
+            'confidence': confidence,
+            'classification': classification,
+        })
+    except OSError as e:
+        logger.warning(f"Could not write classification log: {e}")
+
+
+def compare_classifications(local: Dict[str, Any], reference: Dict[str, Any]) -> Dict[str, bool]:
+    """Field-by-field agreement of a local classification with a reference (LLM) one."""
+    return {
+        'temporal': bool(local.get('temporal')) == bool(reference.get('temporal')),
+        'question': bool(local.get('question')) == bool(reference.get('question')),
+        'number_of_scenes': local.get('number_of_scenes', 1) == reference.get('number_of_scenes', 1),
+    }
+
+
+def summarize_agreement(rows: List[Tuple[float, bool, Dict[str, bool]]]) -> Dict[str, Any]:
+    """Coverage and agreement from (confidence, confident, agreement) rows."""
+    confident = [agreement for _, is_confident, agreement in rows if is_confident]
+    summary = {'queries': len(rows), 'handled_locally': len(confident),
+               'coverage': round(len(confident) / len(rows), 3) if rows else 0.0}
+    for field in ('temporal', 'question', 'number_of_scenes'):
+        summary[f'{field}_agreement'] = round(sum(agreement[field] for agreement in confident) / len(confident), 3) if confident else None
+    summary['full_agreement'] = round(sum(all(agreement.values()) for agreement in confident) / len(confident), 3) if confident else None
+    return summary
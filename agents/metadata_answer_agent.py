@@ -0,0 +1,121 @@
+# agents/metadata_answer_agent.py
+import re
+import logging
+from typing import Dict, Any, List, Optional
+
+from config import Config
+from data_loaders.ocr_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Question cues, matched against folded (lower-case, diacritic-free) text
+COUNT_QUESTION = re.compile(r'\b(?:how many|bao nhieu)\s+([a-z]+)')
+NUMBER_CUES = {'number', 'digit', 'digits', 'year', 'price', 'cost', 'plate', 'score', 'phone', 'code',
+               'date', 'time', 'so', 'nam', 'gia', 'ngay', 'gio', 'bien'}
+TEXT_CUES = {'written', 'write', 'say', 'says', 'text', 'name', 'title', 'sign', 'banner', 'caption',
+             'headline', 'word', 'words', 'ten', 'chu', 'ghi', 'tieu', 'de'}
+STOPWORDS = {'what', 'which', 'is', 'are', 'the', 'a', 'an', 'of', 'on', 'in', 'at', 'to', 'does', 'do',
+             'this', 'that', 'there', 'shown', 'show', 'la', 'gi', 'cua', 'tren', 'trong', 'co', 'duoc'}
+# Count targets that are not object class names
+NOUN_CLASSES = {'people': 'person', 'men': 'person', 'women': 'person', 'children': 'person', 'nguoi': 'person',
+                'xe': 'car', 'cho': 'dog', 'meo': 'cat'}
+# Tokens containing a digit: numbers, years, prices, plates like 51A-123.45
+NUMBER_PATTERN = re.compile(r'[\w.,:/-]*\d[\w.,:/-]*')
+# Digit tokens that are never the answer: on-screen clocks (12:30, 08:15:02) and
+# letters followed by digits, which covers channel logos like VTV24 or HTV7
+TIMESTAMP_PATTERN = re.compile(r'^\d{1,2}:\d{2}(?::\d{2})?$')
+LETTERS_DIGITS_PATTERN = re.compile(r'^[^\W\d_]+\d+$')
+CHANNEL_LOGOS = ('VTV', 'HTV', 'THVL', 'ANTV', 'VTC', 'VNEWS', 'QPVN', 'VOV')
+COUNT_TERM_PATTERNS = (re.compile(r'^(\d+)[_:\s-]*([a-z ]+)$'), re.compile(r'^([a-z ]+)[_:\s-]*(\d+)$'))
+
+
+class MetadataAnswerAgent:
+    """
+    Answers question queries from OCR and object-count metadata.
+
+    Answers carry a confidence; only answers at or above `min_confidence`
+    replace the vision LLM calls for a candidate.
+    """
+
+    def __init__(self, min_confidence: Optional[float] = None):
+        self.min_confidence = Config.METADATA_ANSWER_MIN_CONFIDENCE if min_confidence is None else min_confidence
+
+    def answer(self, question: Optional[str], metadata: Dict[str, List[str]]) -> Optional[Dict[str, Any]]:
+        folded = fold_text(question or '')
+        if not folded:
+            return None
+        words = set(folded.split())
+
+        count_match = COUNT_QUESTION.search(folded)
+        if count_match:
+            return self._answer_count(question, count_match.group(1), metadata)
+        if words & NUMBER_CUES:
+            return self._answer_number(question, metadata.get('ocr', []))
+        if words & TEXT_CUES:
+            return self._answer_text(question, words, metadata.get('ocr', []))
+        return None
+
+    def is_confident(self, answer: Optional[Dict[str, Any]]) -> bool:
+        return answer is not None and answer['confidence'] >= self.min_confidence
+
+    def answered_result(self, image_result: Dict[str, Any], answer: Dict[str, Any]) -> Dict[str, Any]:
+        """Validation result for a candidate answered from metadata instead of the vision LLM."""
+        return {
+            **image_result,
+            'image_path': image_result.get('image_path', ''),
+            'question_answer': answer,
+            'match_assessment': {'category': 'Near Match', 'confidence': answer['confidence']},
+            'justification': f"Answered from {answer['source']} metadata without a vision call: {answer['answer']}"
+        }
+
+    def _result(self, question, answer, confidence, source):
+        return {'question': question, 'answer': answer, 'confidence': confidence, 'source': source}
+
+    def _answer_count(self, question, noun, metadata):
+        target = NOUN_CLASSES.get(noun, noun)
+        candidates = {target, target.rstrip('s'), target[:-2] if target.endswith('es') else target}
+
+        for term in metadata.get('counts', []):
+            parsed = self._parse_count_term(term)
+            if parsed and parsed[1] in candidates:
+                return self._result(question, str(parsed[0]), 0.8, 'object count')
+
+        # Without a count term, repeated detections of the class are a weaker signal
+        detections = sum(1 for obj in metadata.get('objects', []) if obj.lower() in candidates)
+        if detections:
+            return self._result(question, str(detections), 0.5, 'object')
+        return None
+
+    def _parse_count_term(self, term):
+        term = term.lower()
+        for pattern in COUNT_TERM_PATTERNS:
+            match = pattern.match(term)
+            if match:
+                first, second = match.groups()
+                return (int(first), second.strip()) if first.isdigit() else (int(second), first.strip())
+        return None
+
+    def _is_answer_number(self, token):
+        if not token or TIMESTAMP_PATTERN.match(token) or LETTERS_DIGITS_PATTERN.match(token):
+            return False
+        return not token.upper().startswith(CHANNEL_LOGOS)
+
+    def _answer_number(self, question, ocr_texts):
+        tokens = (token.strip('.,:/-') for token in NUMBER_PATTERN.findall(' '.join(ocr_texts)))
+        numbers = list(dict.fromkeys(token for token in tokens if self._is_answer_number(token)))
+        if not numbers:
+            return None
+        # A single number on screen is very likely the answer; several need the vision model
+        return self._result(question, numbers[0], 0.8 if len(numbers) == 1 else 0.4, 'OCR')
+
+    def _answer_text(self, question, question_words, ocr_texts):
+        if not ocr_texts:
+            return None
+        keywords = question_words - TEXT_CUES - STOPWORDS
+        overlaps = [len(keywords & set(fold_text(text).split())) for text in ocr_texts]
+        best = max(overlaps)
+        if best > 0 and overlaps.count(best) == 1:
+            return self._result(question, ocr_texts[overlaps.index(best)], 0.75, 'OCR')
+        if len(ocr_texts) == 1:
+            return self._result(question, ocr_texts[0], 0.6, 'OCR')
+        return self._result(question, max(ocr_texts, key=len), 0.3, 'OCR')
@@ -1,6 +1,8 @@
+import asyncio
 import json
 import re
 from utilities.json_parser import parse_json_response
+from .run_budget import estimate_text_tokens, RESPONSE_TOKEN_ESTIMATE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,12 +11,19 @@ class PromptCrafterAgent:
     def __init__(self, llm_connector):
         self.llm_connector = llm_connector
 
-    async def craft_prompts(self, classification):
+    async def craft_prompts(self, classification, budget=None):
         logger.info(f"Starting prompt crafting with classification: {classification}")
         prompt = self._generate_super_prompt(classification)
         logger.debug(f"Generated super prompt: {prompt}")
 
-        response = await self.llm_connector.generate_text(prompt)
+        if budget and not budget.try_acquire('prompt_crafting', estimate_text_tokens(prompt) + RESPONSE_TOKEN_ESTIMATE):
+            return self.fallback_prompts(classification)
+
+        try:
+            response = await asyncio.wait_for(self.llm_connector.generate_text(prompt), budget.remaining_seconds() if budget else None)
+        except asyncio.TimeoutError:
+            budget.record_skip('prompt_crafting', 'deadline')
+            return self.fallback_prompts(classification)
         logger.info(f"Raw LLM response:\n{response}")
 
         parsed_response = self._parse_response(response)
@@ -25,6 +34,17 @@ class PromptCrafterAgent:
         logger.info(f"Parsed response: {parsed_response}")
         return parsed_response
 
+    def fallback_prompts(self, classification):
+        """Use the scene descriptions verbatim as CLIP and caption prompts."""
+        scenes = classification['scenes']
+        prompts = [{'scene': scene.get('scene', i + 1), 'prompt': scene.get('description', '')} for i, scene in enumerate(scenes)]
+        question = next((scene['specific_question'] for scene in scenes if scene.get('specific_question')), None)
+        return {
+            'clip_prompts': prompts,
+            'caption_prompts': [dict(prompt) for prompt in prompts],
+            'question': question
+        }
+
     def _generate_super_prompt(self, classification):
         return f"""
         you are an expert ai assistant specializing in crafting search prompts for a sophisticated multi-modal image retrieval system. your task is to create optimal prompts based on classified user queries.
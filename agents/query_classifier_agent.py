@@ -1,15 +1,45 @@
 # agents/query_classifier_agent.py
+import asyncio
 import json
 from utilities.json_parser import parse_json_response
+from config import Config
+from .run_budget import estimate_text_tokens, RESPONSE_TOKEN_ESTIMATE
+from .local_query_classifier import LocalQueryClassifier, log_classification, single_scene
 
 class QueryClassifierAgent:
-    def __init__(self, llm_connector):
+    def __init__(self, llm_connector, local_classifier=None):
         self.llm_connector = llm_connector
+        if local_classifier is None and Config.LOCAL_CLASSIFIER_ENABLED:
+            local_classifier = LocalQueryClassifier()
+        self.local_classifier = local_classifier
+
+    async def classify_query(self, input_query, budget=None):
+        # Simple queries are classified locally; ambiguous ones go to the LLM
+        if self.local_classifier is not None:
+            if self.local_classifier.needs_examples():
+                # Encoding the logged examples is CPU-bound; keep it off the event loop
+                await asyncio.to_thread(self.local_classifier.load_examples)
+            classification, confidence = self.local_classifier.classify(input_query)
+            if self.local_classifier.is_confident(confidence):
+                if budget:
+                    budget.record_avoided('classification')
+                log_classification(input_query, classification, 'local', confidence)
+                return classification
 
-    async def classify_query(self, input_query):
         prompt = self.generate_prompt(input_query)
-        response = await self.llm_connector.generate_text(prompt)
-        return self.parse_classification(response)
+        if budget and not budget.try_acquire('classification', estimate_text_tokens(prompt) + RESPONSE_TOKEN_ESTIMATE):
+            return single_scene(input_query)
+        try:
+            # The budget is otherwise only checked between steps; a slow call must not run past the deadline
+            response = await asyncio.wait_for(self.llm_connector.generate_text(prompt), budget.remaining_seconds() if budget else None)
+        except asyncio.TimeoutError:
+            budget.record_skip('classification', 'deadline')
+            return single_scene(input_query)
+        classification = self.parse_classification(response)
+        log_classification(input_query, classification, 'llm')
+        if self.local_classifier is not None:
+            await asyncio.to_thread(self.local_classifier.add_example, input_query, classification)
+        return classification
 
     def generate_prompt(self, input_query):
         return f"""
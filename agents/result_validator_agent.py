@@ -3,6 +3,7 @@ import asyncio
 import tenacity
 from utilities.json_parser import parse_json_response
 from llm_connectors.llm_connector import LLMConnector
+from .run_budget import estimate_text_tokens, BudgetExhausted, IMAGE_TOKEN_ESTIMATE, RESPONSE_TOKEN_ESTIMATE
 import logging
 from typing import Dict, Any, List, Optional
 
@@ -16,7 +17,7 @@ class ResultValidatorAgent:
         self.llm_connector = llm_connector
         self.semaphore = asyncio.Semaphore(max_concurrent_requests)
 
-    async def validate_single_result(self, image_result: Dict[str, Any], clip_prompt: str, question: Optional[str] = None) -> Dict[str, Any]:
+    async def validate_single_result(self, image_result: Dict[str, Any], clip_prompt: str, question: Optional[str] = None, budget=None) -> Dict[str, Any]:
         image_path = image_result.get('image_path', '')
         if not image_path:
             return {
@@ -28,19 +29,34 @@ class ResultValidatorAgent:
 
         validator_prompt = self._generate_validator_prompt(clip_prompt, question, image_path)
 
+        estimated_tokens = estimate_text_tokens(validator_prompt) + IMAGE_TOKEN_ESTIMATE + RESPONSE_TOKEN_ESTIMATE
+        if budget and not budget.try_acquire('validation', estimated_tokens):
+            return self.unvalidated_result(image_result)
+
+        attempts = 0
+
         @tenacity.retry(
             wait=tenacity.wait_exponential(min=1, max=10),
             stop=tenacity.stop_after_attempt(3),
-            retry=tenacity.retry_if_exception_type(Exception)
+            retry=tenacity.retry_if_exception_type(Exception) & tenacity.retry_if_not_exception_type(BudgetExhausted)
         )
         async def make_request():
-            return await self.llm_connector.analyze_image(image_path, validator_prompt)
+            nonlocal attempts
+            attempts += 1
+            # The first attempt was acquired above; every retry is another LLM call against the budget
+            if attempts > 1 and budget and not budget.try_acquire('validation', estimated_tokens):
+                raise BudgetExhausted()
+            if budget is None:
+                return await self.llm_connector.analyze_image(image_path, validator_prompt)
+            return await self.llm_connector.analyze_image(image_path, validator_prompt, payload_stats=budget.image_payloads)
 
         try:
             async with self.semaphore:
                 response = await make_request()
                 validation = self.parse_validation(response)
                 return validation
+        except BudgetExhausted:
+            return self.unvalidated_result(image_result)
         except Exception as e:
             logger.error(f"Error during validation for image {image_path}: {e}")
             return {
@@ -53,17 +69,48 @@ class ResultValidatorAgent:
                 'justification': "Validation failed due to error."
             }
 
-    async def validate_results(self, image_results: List[Dict[str, Any]], crafted_prompts: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def validate_results(self, image_results: List[Dict[str, Any]], crafted_prompts: Dict[str, Any], budget=None) -> List[Dict[str, Any]]:
         tasks = []
+        task_inputs = []
         for image_result in image_results:
             for prompt in crafted_prompts['clip_prompts']:
                 clip_prompt = prompt['prompt']
                 question = crafted_prompts.get('question')
-                tasks.append(self.validate_single_result(image_result, clip_prompt, question))
+                tasks.append(self.validate_single_result(image_result, clip_prompt, question, budget))
+                task_inputs.append(image_result)
 
-        validated_results = await asyncio.gather(*tasks)
+        if budget is None or budget.remaining_seconds() is None:
+            validated_results = await asyncio.gather(*tasks)
+        else:
+            validated_results = await self._gather_until_deadline(tasks, task_inputs, budget)
         return [result for result in validated_results if result is not None]
 
+    async def _gather_until_deadline(self, coros, task_inputs, budget):
+        # Validations still running at the deadline are cancelled and reported as unvalidated
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=budget.remaining_seconds())
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            budget.record_skip('validation', 'deadline', len(pending))
+
+        return [
+            task.result() if task in done else self.unvalidated_result(image_result)
+            for task, image_result in zip(tasks, task_inputs)
+        ]
+
+    def unvalidated_result(self, image_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Placeholder for a search hit that was not validated because the run budget ran out."""
+        return {
+            **image_result,
+            'image_path': image_result.get('image_path', ''),
+            'match_assessment': {'category': 'Unvalidated', 'confidence': 0.0},
+            'justification': 'Not validated: run budget exhausted.'
+        }
+
     def _generate_validator_prompt(self, clip_prompt, question, image_path):
         return f"""
         you're an expert image analyst. analyze this image based on the given prompt and question.
@@ -0,0 +1,134 @@
+# agents/run_budget.py
+import time
+import logging
+
+from config import Config
+from llm_connectors.image_payload import PayloadStats
+
+logger = logging.getLogger(__name__)
+
+# Rough per-call token estimates used when the provider does not report usage.
+IMAGE_TOKEN_ESTIMATE = 765
+RESPONSE_TOKEN_ESTIMATE = 300
+
+
+def estimate_text_tokens(text):
+    """Cheap token estimate (~4 characters per token)."""
+    return len(text or '') // 4 + 1
+
+
+class BudgetExhausted(Exception):
+    """Raised inside a stage when the budget refuses a further LLM call (e.g. a retry)."""
+
+
+class RunBudget:
+    """
+    Per-run limits for an agent query: wall-clock deadline, LLM call count,
+    estimated tokens and estimated cost. A limit of 0 or None is disabled.
+
+    Stages ask the budget before spending (`try_acquire`) and record what they
+    had to skip, so the run can stop early and still report what was left out.
+    """
+
+    def __init__(self, deadline_seconds=None, max_llm_calls=None, max_tokens=None,
+                 max_cost=None, cost_per_1k_tokens=0.0):
+        self.started_at = time.monotonic()
+        self.deadline_seconds = deadline_seconds or None
+        self.max_llm_calls = max_llm_calls or None
+        self.max_tokens = max_tokens or None
+        self.max_cost = max_cost or None
+        self.cost_per_1k_tokens = cost_per_1k_tokens or 0.0
+
+        self.llm_calls = 0
+        self.tokens = 0
+        self.skipped = {}
+        self.llm_calls_avoided = {}
+        # Paid embedding API calls (caption search) made outside the LLM stages
+        self.embedding_calls = 0
+        # Vision payloads prepared for this run only (the payload cache's totals are process-wide)
+        self.image_payloads = PayloadStats()
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            deadline_seconds=Config.AGENT_DEADLINE_SECONDS,
+            max_llm_calls=Config.AGENT_MAX_LLM_CALLS,
+            max_tokens=Config.AGENT_MAX_TOKENS,
+            max_cost=Config.AGENT_MAX_COST,
+            cost_per_1k_tokens=Config.AGENT_COST_PER_1K_TOKENS,
+        )
+
+    @property
+    def elapsed_seconds(self):
+        return time.monotonic() - self.started_at
+
+    @property
+    def estimated_cost(self):
+        return self.tokens / 1000 * self.cost_per_1k_tokens
+
+    def remaining_seconds(self):
+        if self.deadline_seconds is None:
+            return None
+        return max(0.0, self.deadline_seconds - self.elapsed_seconds)
+
+    def deadline_passed(self):
+        remaining = self.remaining_seconds()
+        return remaining is not None and remaining <= 0
+
+    def exhausted_reason(self, estimated_tokens=0):
+        """Return why a call of `estimated_tokens` would break the budget, or None."""
+        if self.deadline_passed():
+            return 'deadline'
+        if self.max_llm_calls is not None and self.llm_calls + 1 > self.max_llm_calls:
+            return 'max_llm_calls'
+        if self.max_tokens is not None and self.tokens + estimated_tokens > self.max_tokens:
+            return 'max_tokens'
+        if self.max_cost is not None:
+            cost = (self.tokens + estimated_tokens) / 1000 * self.cost_per_1k_tokens
+            if cost > self.max_cost:
+                return 'max_cost'
+        return None
+
+    def try_acquire(self, stage, estimated_tokens=0):
+        """Reserve one LLM call for `stage`. Returns False (and records the skip) if over budget."""
+        reason = self.exhausted_reason(estimated_tokens)
+        if reason:
+            self.record_skip(stage, reason)
+            return False
+        self.llm_calls += 1
+        self.tokens += estimated_tokens
+        return True
+
+    def record_skip(self, stage, reason, count=1):
+        key = (stage, reason)
+        if key not in self.skipped:
+            logger.warning(f"Budget exhausted ({reason}), skipping {stage}")
+        self.skipped[key] = self.skipped.get(key, 0) + count
+
+    def record_avoided(self, stage, count=1):
+        """Count LLM calls that `stage` made unnecessary (e.g. answered from metadata)."""
+        self.llm_calls_avoided[stage] = self.llm_calls_avoided.get(stage, 0) + count
+
+    def record_embedding_calls(self, count=1):
+        self.embedding_calls += count
+
+    def summary(self):
+        return {
+            'elapsed_seconds': round(self.elapsed_seconds, 2),
+            'llm_calls': self.llm_calls,
+            'estimated_tokens': self.tokens,
+            'estimated_cost': round(self.estimated_cost, 4),
+            'llm_calls_avoided': dict(self.llm_calls_avoided),
+            'embedding_calls': self.embedding_calls,
+            'image_payloads': self.image_payloads.as_dict(),
+            'limits': {
+                'deadline_seconds': self.deadline_seconds,
+                'max_llm_calls': self.max_llm_calls,
+                'max_tokens': self.max_tokens,
+                'max_cost': self.max_cost,
+            },
+            'skipped': [
+                {'stage': stage, 'reason': reason, 'count': count}
+                for (stage, reason), count in self.skipped.items()
+            ],
+        }
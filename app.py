@@ -3,22 +3,29 @@ import streamlit as st
 
 import asyncio
 import os
+import time
 import logging
 
 from config import Config
 from llm_connectors.llm_connector import LLMConnector
 from services.agent_search_service import AgentSearchService
-from agents.agent_orchestrator import AgentOrchestrator
-from services.search_service import perform_search
+from agents.agent_orchestrator import AgentOrchestrator, create_local_classifier
+from agents.run_budget import RunBudget
+from services.search_service import perform_search, search_similar, search_videos
+from services.ensemble_search_service import EnsembleSearchService
+from services.job_manager import JobManager, DONE, FAILED, CANCELLED
+from server.client import SearchClient
 
 from utilities.csv_utils import create_csv_file, create_csv_with_selected_images
-from utilities.model_utils import load_model, load_faiss_index, load_id2img_fps
+from utilities.model_utils import load_model, load_faiss_index, load_id2img_fps, load_ensemble_members
 from utilities.utils import sanitize_filename
+from utilities.video_utils import get_video_and_frame_idx_batch, prefetch_video_segments, format_frame_time
 from utilities.ui_utils import (
     display_image_with_buttons,
     display_validation_details,
     display_surrounding_frames,
-    create_image_selector
+    create_image_selector,
+    create_search_filter_inputs
 )
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -33,6 +40,8 @@ if "deleted_images" not in st.session_state:
     st.session_state.deleted_images = set()
 if "selected_images" not in st.session_state:
     st.session_state.selected_images = []
+if "selected_image_paths" not in st.session_state:
+    st.session_state.selected_image_paths = []
 if 'filtered_results' not in st.session_state:
     st.session_state.filtered_results = []
 if 'clicked_image_path' not in st.session_state:
@@ -45,33 +54,136 @@ if 'classification' not in st.session_state:
     st.session_state.classification = None
 if 'agent_results' not in st.session_state:
     st.session_state.agent_results = None
+if 'agent_run_summary' not in st.session_state:
+    st.session_state.agent_run_summary = None
+if 'example_images' not in st.session_state:
+    st.session_state.example_images = []
+if 'similar_results' not in st.session_state:
+    st.session_state.similar_results = None
+if 'agent_job_id' not in st.session_state:
+    # Reattach to a running or finished job after a page reload
+    st.session_state.agent_job_id = st.query_params.get('job')
 
-def display_images(image_paths, id2img_fps):
+def display_images(image_paths, id2img_fps, key_prefix='regular'):
+    frame_infos = get_video_and_frame_idx_batch(image_paths, id2img_fps)
+    if Config.CLIP_PREFETCH_TOP_N:
+        prefetch_video_segments([info[:2] for info in frame_infos[:Config.CLIP_PREFETCH_TOP_N]])
     cols = st.columns(5)
     for i, path in enumerate(image_paths):
         with cols[i % 5]:
-            display_image_with_buttons(path, id2img_fps, i)
+            display_image_with_buttons(path, id2img_fps, i, frame_info=frame_infos[i], key_prefix=key_prefix)
 
-    create_image_selector(image_paths, 'regular')
+    create_image_selector(image_paths, key_prefix)
+
+def display_video_results(videos, id2img_fps):
+    for rank, video in enumerate(videos, start=1):
+        window = ""
+        if video['window_start'] is not None:
+            window = (f", best window {format_frame_time(video['window_start'])[0]} - "
+                      f"{format_frame_time(video['window_end'])[0]} ({video['window_hits']} hits)")
+        st.write(f"{rank}. **{video['video']}**: score {video['score']:.3f}, {video['hits']} hits{window}")
+    # Best frame of each video, in video rank order
+    display_images([video['image_path'] for video in videos], id2img_fps, key_prefix='videos')
+
+def display_similar_search(index, top_k, id2img_fps, filters):
+    examples = st.session_state.example_images
+    st.subheader(f"Similar Frames ({len(examples)} example{'s' if len(examples) > 1 else ''})")
+    st.caption(", ".join(os.path.basename(path) for path in examples))
+    exclude_same_video = st.checkbox("Exclude frames from the examples' videos", key='similar_exclude_same_video')
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Search Similar Frames"):
+            try:
+                st.session_state.similar_results = search_similar(
+                    index, examples, top_k, st.session_state.deleted_images, id2img_fps, exclude_same_video, filters
+                )
+            except ValueError as e:
+                st.error(f"Similar-frame search failed: {e}")
+    with col2:
+        if st.button("Clear Examples"):
+            st.session_state.example_images = []
+            st.session_state.similar_results = None
+            st.rerun()
+
+    if st.session_state.similar_results:
+        display_images(st.session_state.similar_results, id2img_fps, key_prefix='similar')
 
 def display_validated_results(validated_results, id2img_fps):
-    filtered_results = [res for res in validated_results if res['match_assessment']['category'] in ['Exact Match', 'Near Match']]
-    filtered_results.sort(key=lambda x: ('1' if x['match_assessment']['category'] == 'Exact Match' else '2', -x['match_assessment']['confidence']))
+    category_order = {'Exact Match': '1', 'Near Match': '2', 'Unvalidated': '3'}
+    filtered_results = [res for res in validated_results if res['match_assessment']['category'] in category_order]
+    filtered_results.sort(key=lambda x: (category_order[x['match_assessment']['category']], -x['match_assessment']['confidence']))
 
     st.session_state.filtered_results = filtered_results
 
     if filtered_results:
-        st.subheader(f"Showing {len(filtered_results)} Exact/Near Matches")
+        st.subheader(f"Showing {len(filtered_results)} Exact/Near Matches and unvalidated hits")
+        frame_infos = get_video_and_frame_idx_batch([res['image_path'] for res in filtered_results], id2img_fps)
         cols = st.columns(5)
         for i, validation in enumerate(filtered_results):
             with cols[i % 5]:
-                video_name, frame_idx = display_image_with_buttons(validation['image_path'], id2img_fps, i, is_validated=True)
+                video_name, frame_idx = display_image_with_buttons(validation['image_path'], id2img_fps, i, is_validated=True, frame_info=frame_infos[i])
                 display_validation_details(validation, video_name, frame_idx, i)
 
         create_image_selector([res['image_path'] for res in filtered_results], 'validated')
     else:
         st.warning("No Exact or Near Matches found in the validated results.")
 
+def display_run_summary(summary):
+    if not summary:
+        return
+    st.caption(f"Agent run: {summary['elapsed_seconds']}s, {summary['llm_calls']} LLM calls, "
+               f"~{summary['estimated_tokens']} tokens (~${summary['estimated_cost']})")
+    avoided = summary.get('llm_calls_avoided', {})
+    if avoided:
+        st.caption("LLM calls avoided: " + ", ".join(f"{count} {stage}" for stage, count in avoided.items()))
+    if summary.get('embedding_calls'):
+        st.caption(f"{summary['embedding_calls']} caption embedding calls for speculative search")
+    payloads = summary.get('image_payloads')
+    if payloads and payloads['requests']:
+        st.caption(f"Images sent: {payloads['requests']} ({payloads['cache_hits']} from cache), "
+                   f"~{payloads['tokens_saved']} vision tokens and {payloads['bytes_saved'] // 1024} KB saved by downscaling")
+    for skip in summary['skipped']:
+        st.info(f"Budget reached ({skip['reason']}): skipped {skip['count']} x {skip['stage']}")
+
+def display_job_progress(job):
+    st.info(f"Agent search running (job {job.id}, {int(time.time() - job.created_at)}s)")
+    for event in job.events[-8:]:
+        st.write(f"- **{event['stage']}** {event['message']}")
+
+@st.cache_resource
+def get_search_client(base_url):
+    return SearchClient(base_url)
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
+
+@st.cache_resource
+def get_ensemble_search_service():
+    # The ensemble only kicks in with at least two CLIP models whose indexes are built
+    members = load_ensemble_members()
+    return EnsembleSearchService(members, load_id2img_fps()) if len(members) > 1 else None
+
+@st.cache_resource
+def get_local_classifier(_model):
+    # Shared by every agent run, so logged examples are encoded once and fresh ones are kept
+    return create_local_classifier(_model)
+
+def display_ensemble_latency(ensemble):
+    latency = ensemble.latency_summary()
+    if latency:
+        st.caption(" | ".join(f"{name}: {stats['mean_ms']:.0f} ms mean, {stats['p95_ms']:.0f} ms p95" for name, stats in latency.items()))
+
+def make_agent_job(agent_orchestrator, search_client, text_query, top_k, provider_name):
+    async def run(progress):
+        if search_client:
+            progress('remote', 'Processing query on search server')
+            return await asyncio.to_thread(search_client.agent_search, text_query, top_k, provider_name)
+        budget = RunBudget.from_config()
+        results = await agent_orchestrator.process_query(text_query, top_k, None, budget, progress)
+        return results, budget.summary()
+    return run
+
 def main():
     st.title("Image Search")
 
@@ -99,61 +211,138 @@ def main():
                                                                 "gemini"])
 
     config = Config()
-    model, preprocess = load_model()
-    index = load_faiss_index()
+    # With SEARCH_API_URL set, the model and index live in the search server and this app is a thin client
+    search_client = get_search_client(Config.SEARCH_API_URL) if Config.SEARCH_API_URL else None
+    ensemble, ensemble_models = None, None
+    if search_client is None:
+        model, preprocess = load_model()
+        index = load_faiss_index()
+        ensemble = get_ensemble_search_service()
     id2img_fps = load_id2img_fps()
 
-    if search_method != "Agent" and text_query:
-        image_paths = perform_search(
-            search_method=search_method,
-            model=model,
-            index=index,
-            text_query=text_query,
-            top_k=top_k,
-            deleted_images=st.session_state.deleted_images,
-            id2img_fps=id2img_fps
-        )
+    filters = create_search_filter_inputs() if search_method != "Agent" else None
+    if ensemble is not None and search_method in ("CLIP", "Agent"):
+        ensemble_models = st.multiselect("CLIP models:", ensemble.model_names, default=ensemble.model_names)
+
+    positive_paths, negative_paths = None, None
+    has_feedback = st.session_state.selected_image_paths or st.session_state.deleted_images
+    if search_method == "CLIP" and search_client is None and has_feedback:
+        if st.checkbox(f"Refine with feedback ({len(st.session_state.selected_image_paths)} selected, "
+                       f"{len(st.session_state.deleted_images)} deleted)", key='use_relevance_feedback'):
+            positive_paths, negative_paths = st.session_state.selected_image_paths, st.session_state.deleted_images
+
+    video_mode = None
+    if search_method == "CLIP" and search_client is None and st.checkbox("Group results by video", key='group_by_video'):
+        video_mode = st.selectbox("Rank videos by:", ["max", "sum", "density"], key='video_rank_mode')
+
+    if search_method != "Agent" and text_query and video_mode:
+        try:
+            videos = search_videos(model, index, text_query, top_k, st.session_state.deleted_images, video_mode, filters)
+        except ValueError as e:
+            st.error(f"Video search failed: {e}")
+            videos = []
+
+        st.subheader("Top Videos")
+        display_video_results(videos, id2img_fps)
+
+    elif search_method != "Agent" and text_query:
+        try:
+            if search_client:
+                image_paths = search_client.search(search_method, text_query, top_k, st.session_state.deleted_images, filters)
+            else:
+                image_paths = perform_search(
+                    search_method=search_method,
+                    model=model,
+                    index=index,
+                    text_query=text_query,
+                    top_k=top_k,
+                    deleted_images=st.session_state.deleted_images,
+                    id2img_fps=id2img_fps,
+                    filters=filters,
+                    ensemble=ensemble,
+                    models=ensemble_models,
+                    positive_paths=positive_paths,
+                    negative_paths=negative_paths
+                )
+        except ValueError as e:
+            st.error(f"Invalid search filter: {e}")
+            image_paths = []
 
         st.subheader("Search Results")
+        if ensemble is not None and search_method == "CLIP":
+            display_ensemble_latency(ensemble)
         display_images(image_paths, id2img_fps)
 
     elif search_method == "Agent" and text_query:
-        logger.info(f"Starting Agent search with query: {text_query}")
-        agent_search_service = AgentSearchService(model, index, id2img_fps)
-
-        # Use the selected provider
-        api_key = Config.get_api_key(provider_name)
-        llm_connector = LLMConnector(provider_name=provider_name, api_key=api_key)
-        agent_orchestrator = AgentOrchestrator(llm_connector, agent_search_service)
-
-        if st.button("Run Agent Search") or st.session_state.agent_results is not None:
-            if text_query and st.session_state.agent_results is None:
-                try:
-                    with st.spinner("Classifying query..."):
-                        classification = asyncio.run(agent_orchestrator.query_classifier.classify_query(text_query))
-
-                    logger.debug("Starting query processing with classification")
-                    with st.spinner("Processing query..."):
-                        results = asyncio.run(agent_orchestrator.process_query(text_query, top_k, classification))
-
-                    if results:
-                        logger.info(f"Query processing completed. Number of results: {len(results)}")
-                        st.session_state.agent_results = results
-                    else:
-                        logger.warning("Query processing returned no results")
-                        st.warning("No results found. Please try a different query.")
-                except Exception as e:
-                    logger.error(f"Error during query processing: {str(e)}", exc_info=True)
-                    st.error(f"An error occurred during processing: {str(e)}")
-
-            if st.session_state.agent_results:
-                st.subheader("Search Results")
-                display_validated_results(st.session_state.agent_results, id2img_fps)
+        job_manager = get_job_manager()
+        job = job_manager.get(st.session_state.agent_job_id) if st.session_state.agent_job_id else None
+
+        if st.button("Run Agent Search"):
+            job_key = (text_query, top_k, provider_name, tuple(ensemble_models or ()))
+            job = job_manager.find_finished(job_key)
+            if job is None:
+                logger.info(f"Starting Agent search with query: {text_query}")
+                if search_client is None:
+                    agent_search_service = AgentSearchService(model, index, id2img_fps, ensemble, ensemble_models)
+
+                    # Use the selected provider
+                    api_key = Config.get_api_key(provider_name)
+                    llm_connector = LLMConnector(provider_name=provider_name, api_key=api_key)
+                    agent_orchestrator = AgentOrchestrator(llm_connector, agent_search_service, get_local_classifier(model))
+                else:
+                    agent_orchestrator = None
+                job_id = job_manager.submit(
+                    make_agent_job(agent_orchestrator, search_client, text_query, top_k, provider_name),
+                    description=text_query,
+                    key=job_key
+                )
+                job = job_manager.get(job_id)
+            else:
+                logger.info(f"Reusing results of job {job.id} for query: {text_query}")
+            st.session_state.agent_job_id = job.id
+            st.query_params['job'] = job.id
+            st.session_state.agent_results = None
+            st.session_state.agent_run_summary = None
+
+        if job is not None:
+            if not job.finished:
+                display_job_progress(job)
+                if st.button("Cancel Agent Search"):
+                    job_manager.cancel(job.id)
+                    st.rerun()
+                time.sleep(1)
+                st.rerun()
+            elif job.status == DONE and st.session_state.agent_results is None:
+                results, st.session_state.agent_run_summary = job.result
+                if results:
+                    logger.info(f"Query processing completed. Number of results: {len(results)}")
+                    st.session_state.agent_results = results
+                else:
+                    logger.warning("Query processing returned no results")
+                    st.warning("No results found. Please try a different query.")
+            elif job.status == FAILED:
+                st.error(f"An error occurred during processing: {job.error}")
+            elif job.status == CANCELLED:
+                st.warning("Agent search was cancelled.")
+
+        if st.session_state.agent_results:
+            st.subheader("Search Results")
+            display_run_summary(st.session_state.agent_run_summary)
+            display_validated_results(st.session_state.agent_results, id2img_fps)
 
         if st.button("Clear Agent Search Results"):
             st.session_state.agent_results = None
+            st.session_state.agent_run_summary = None
+            st.session_state.agent_job_id = None
+            st.query_params.pop('job', None)
             st.rerun()
 
+    if st.session_state.example_images:
+        if search_client is None:
+            display_similar_search(index, top_k, id2img_fps, filters)
+        else:
+            st.info("Similar-frame search reads vectors from the local index; unset SEARCH_API_URL to use it.")
+
     if st.session_state.get('clicked_image_path'):
         display_surrounding_frames(st.session_state.clicked_image_path, id2img_fps)
 
@@ -14,6 +14,77 @@ class Config:
     ANTHROPIC_MODEL = os.getenv('ANTHROPIC_MODEL', 'claude-3.5-sonnet')
     GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
 
+    # Per-run agent budgets (0 disables a limit)
+    AGENT_DEADLINE_SECONDS = float(os.getenv('AGENT_DEADLINE_SECONDS', '120'))
+    AGENT_MAX_LLM_CALLS = int(os.getenv('AGENT_MAX_LLM_CALLS', '200'))
+    AGENT_MAX_TOKENS = int(os.getenv('AGENT_MAX_TOKENS', '500000'))
+    AGENT_MAX_COST = float(os.getenv('AGENT_MAX_COST', '0'))
+    AGENT_COST_PER_1K_TOKENS = float(os.getenv('AGENT_COST_PER_1K_TOKENS', '0.005'))
+
+    # Search backend service (leave SEARCH_API_URL unset to search in-process)
+    SEARCH_API_URL = os.getenv('SEARCH_API_URL')
+    SEARCH_SERVER_HOST = os.getenv('SEARCH_SERVER_HOST', '0.0.0.0')
+    SEARCH_SERVER_PORT = int(os.getenv('SEARCH_SERVER_PORT', '8080'))
+    SEARCH_SERVER_WORKERS = int(os.getenv('SEARCH_SERVER_WORKERS', '4'))
+
+    # Video clip cache
+    CLIP_CACHE_DIR = os.getenv('CLIP_CACHE_DIR', 'clip_cache')
+    CLIP_CACHE_MAX_MB = int(os.getenv('CLIP_CACHE_MAX_MB', '2048'))
+    FFMPEG_WORKERS = int(os.getenv('FFMPEG_WORKERS', '2'))
+    CLIP_PREFETCH_TOP_N = int(os.getenv('CLIP_PREFETCH_TOP_N', '0'))
+
+    # Result grid thumbnails
+    THUMBNAIL_DIR = os.getenv('THUMBNAIL_DIR', 'thumbnails')
+    THUMBNAIL_MAX_SIDE = int(os.getenv('THUMBNAIL_MAX_SIDE', '320'))
+    THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '70'))
+    THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'webp')
+
+    # Images sent to vision LLMs
+    VISION_MAX_SIDE = int(os.getenv('VISION_MAX_SIDE', '768'))
+    VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', '85'))
+    VISION_DETAIL = os.getenv('VISION_DETAIL', 'auto')
+    VISION_PAYLOAD_CACHE_SIZE = int(os.getenv('VISION_PAYLOAD_CACHE_SIZE', '512'))
+
+    # Question answers from OCR / count metadata at or above this confidence replace the vision answer (the match is still validated)
+    METADATA_ANSWER_MIN_CONFIDENCE = float(os.getenv('METADATA_ANSWER_MIN_CONFIDENCE', '0.7'))
+
+    # Local query classification (falls back to the LLM below the confidence threshold)
+    LOCAL_CLASSIFIER_ENABLED = os.getenv('LOCAL_CLASSIFIER_ENABLED', '1') == '1'
+    LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv('LOCAL_CLASSIFIER_MIN_CONFIDENCE', '0.75'))
+    CLASSIFICATION_LOG_PATH = os.getenv('CLASSIFICATION_LOG_PATH', 'logs/classifications.jsonl')
+
+    # Speculative retrieval on the raw query while classification and prompt crafting run
+    SPECULATIVE_SEARCH_ENABLED = os.getenv('SPECULATIVE_SEARCH_ENABLED', '1') == '1'
+    SPECULATIVE_MAX_QUERIES = int(os.getenv('SPECULATIVE_MAX_QUERIES', '4'))
+    SPECULATIVE_MERGE_WEIGHT = float(os.getenv('SPECULATIVE_MERGE_WEIGHT', '1.0'))
+    # Caption search costs one embedding API call per speculative query, so it is opt-in
+    SPECULATIVE_CAPTION_SEARCH = os.getenv('SPECULATIVE_CAPTION_SEARCH', '0') == '1'
+
+    # CLIP index storage: float32, or fp16 / sq8 / pq codes re-ranked with mmap'd fp16 vectors
+    FAISS_STORAGE_MODE = os.getenv('FAISS_STORAGE_MODE', 'float32')
+    FAISS_RERANK_K = int(os.getenv('FAISS_RERANK_K', '400'))
+
+    # One CLIP index shard per data part, searched in parallel (FAISS_SHARD_PARTS limits which are loaded)
+    FAISS_SHARDED = os.getenv('FAISS_SHARDED', '0') == '1'
+    FAISS_SHARD_PARTS = [part.strip() for part in os.getenv('FAISS_SHARD_PARTS', '').split(',') if part.strip()]
+    FAISS_SHARD_THREADS = int(os.getenv('FAISS_SHARD_THREADS', '4'))
+
+    # Query text encoder: full CLIP, text tower only, or int8 text tower on CPU (kept only above TEXT_ENCODER_MIN_COSINE)
+    TEXT_ENCODER_MODE = os.getenv('TEXT_ENCODER_MODE', 'int8')
+    TEXT_ENCODER_THREADS = int(os.getenv('TEXT_ENCODER_THREADS', '0'))
+    TEXT_ENCODER_MIN_COSINE = float(os.getenv('TEXT_ENCODER_MIN_COSINE', '0.99'))
+
+    # CLIP models searched together and rank-fused (e.g. ViT-B/16,ViT-L/14); empty or one model disables the ensemble
+    ENSEMBLE_MODELS = [name.strip() for name in os.getenv('ENSEMBLE_MODELS', '').split(',') if name.strip()]
+
+    # Rocchio feedback weights: pull towards selected frames, push away from deleted ones
+    ROCCHIO_ALPHA = float(os.getenv('ROCCHIO_ALPHA', '0.75'))
+    ROCCHIO_BETA = float(os.getenv('ROCCHIO_BETA', '0.25'))
+
+    # Grouping CLIP hits by video: frames searched before grouping and the width of a video's best time window
+    VIDEO_AGGREGATION_FRAMES = int(os.getenv('VIDEO_AGGREGATION_FRAMES', '1000'))
+    VIDEO_WINDOW_SECONDS = float(os.getenv('VIDEO_WINDOW_SECONDS', '10'))
+
     @classmethod
     def get_api_key(cls, provider):
         return getattr(cls, f"{provider.upper()}_API_KEY")
@@ -0,0 +1,141 @@
+# data_loaders/bitmap_index.py
+"""
+Bitmap index over global frame ids for object-class and object-count filters.
+
+Every object class and count term gets a packed bitset (np.packbits, one bit
+per frame id) stored as one row of a memory-mapped `{field}.npy` matrix.
+"frames containing person AND car AND 3 dogs" is the AND of three rows, so
+filters can run over the whole corpus instead of the current result page.
+
+Build (after the metadata store) with:
+    python -m data_loaders.bitmap_index
+"""
+import argparse
+import json
+import os
+import logging
+
+import numpy as np
+import streamlit as st
+
+from data_loaders.metadata_store import MetadataStore, METADATA_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+BITMAP_INDEX_DIR = "/content/drive/MyDrive/HCMC_AI/data/bitmap_index"
+
+FIELDS = ('objects', 'counts')
+
+
+class BitmapIndex:
+    def __init__(self, size, vocab, bits):
+        self.size = int(size)
+        self.vocab = vocab
+        self.bits = bits
+        self.term_rows = {field: {term: row for row, term in enumerate(vocab[field])} for field in FIELDS}
+        self.n_bytes = (self.size + 7) // 8
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def build(cls, store):
+        size = len(store)
+        n_bytes = (size + 7) // 8
+        bits = {}
+        for field in FIELDS:
+            offsets = np.asarray(store.offsets[field])
+            values = np.asarray(store.values[field])
+            frame_of_value = np.repeat(np.arange(size, dtype=np.int64), np.diff(offsets))
+            # Group the (term, frame) pairs by term, one bitset row per term
+            order = np.argsort(values, kind='stable')
+            boundaries = np.searchsorted(values[order], np.arange(len(store.vocab[field]) + 1))
+            rows = np.zeros((len(store.vocab[field]), n_bytes), dtype=np.uint8)
+            for term_id in range(len(store.vocab[field])):
+                frame_ids = frame_of_value[order[boundaries[term_id]:boundaries[term_id + 1]]]
+                rows[term_id] = cls.from_ids(frame_ids, size)
+            bits[field] = rows
+        return cls(size, {field: list(store.vocab[field]) for field in FIELDS}, bits)
+
+    @classmethod
+    def load(cls, index_dir=BITMAP_INDEX_DIR, mmap=True):
+        with open(os.path.join(index_dir, 'vocab.json'), "r") as f:
+            meta = json.load(f)
+        bits = {field: np.load(os.path.join(index_dir, f"{field}.npy"), mmap_mode='r' if mmap else None) for field in FIELDS}
+        return cls(meta['size'], meta['vocab'], bits)
+
+    def save(self, index_dir=BITMAP_INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        for field in FIELDS:
+            tmp_path = os.path.join(index_dir, f"{field}.tmp.npy")
+            np.save(tmp_path, np.asarray(self.bits[field]))
+            os.replace(tmp_path, os.path.join(index_dir, f"{field}.npy"))
+        # vocab.json last: it is the marker that the index is complete
+        tmp_path = os.path.join(index_dir, 'vocab.json.tmp')
+        with open(tmp_path, "w") as f:
+            json.dump({'size': self.size, 'vocab': self.vocab}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(index_dir, 'vocab.json'))
+
+    @staticmethod
+    def from_ids(frame_ids, size):
+        """Packed bitset with the bits of `frame_ids` set."""
+        mask = np.zeros(size, dtype=bool)
+        mask[np.asarray(frame_ids, dtype=np.int64)] = True
+        return np.packbits(mask)
+
+    def full(self):
+        return self.from_ids(np.arange(self.size), self.size)
+
+    def bitmap(self, field, term):
+        """Bitset of frames having `term` in `field` (empty for unknown terms)."""
+        row = self.term_rows[field].get(term)
+        if row is None:
+            return np.zeros(self.n_bytes, dtype=np.uint8)
+        return np.asarray(self.bits[field][row])
+
+    def query(self, objects=(), counts=()):
+        """AND of the bitsets of all `objects` and `counts` terms."""
+        result = self.full()
+        for field, terms in (('objects', objects), ('counts', counts)):
+            for term in terms:
+                result &= self.bitmap(field, term)
+        return result
+
+    def frame_ids(self, bitmap):
+        """Sorted frame ids set in `bitmap`."""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+    def count(self, bitmap):
+        return int(np.unpackbits(bitmap, count=self.size).sum())
+
+    def contains(self, bitmap, frame_ids):
+        """Boolean mask: is each of `frame_ids` set in `bitmap` (False for ids outside the index)."""
+        frame_ids = np.asarray(frame_ids, dtype=np.int64)
+        valid = (frame_ids >= 0) & (frame_ids < self.size)
+        safe_ids = np.where(valid, frame_ids, 0)
+        return valid & ((bitmap[safe_ids >> 3] >> (7 - (safe_ids & 7))) & 1).astype(bool)
+
+
+@st.cache_resource
+def load_bitmap_index(index_dir=BITMAP_INDEX_DIR):
+    if not os.path.exists(os.path.join(index_dir, 'vocab.json')):
+        logger.info(f"Bitmap index not found at {index_dir}, filtering per path")
+        return None
+    return BitmapIndex.load(index_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build object-class / object-count bitmaps from the metadata store")
+    parser.add_argument('--metadata-store', default=METADATA_STORE_DIR)
+    parser.add_argument('--output', default=BITMAP_INDEX_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = BitmapIndex.build(MetadataStore.load(args.metadata_store))
+    index.save(args.output)
+    logger.info(f"Wrote bitmaps for {len(index)} frames to {args.output} "
+                f"({', '.join(f'{len(index.vocab[field])} {field} terms' for field in FIELDS)})")
+
+
+if __name__ == '__main__':
+    main()
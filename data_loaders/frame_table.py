@@ -0,0 +1,211 @@
+# data_loaders/frame_table.py
+"""
+Global frame table built from id2img_fps.
+
+Maps every global frame id (the FAISS row) to its keyframe directory, video,
+file name and keyframe number, and keeps the frames of each directory sorted
+by keyframe number. Neighbour queries for temporal navigation are bisections
+on that sorted array instead of listdir + sort per call.
+
+Persist with:
+    python -m data_loaders.frame_table
+"""
+import argparse
+import json
+import os
+import logging
+
+import numpy as np
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+ID2IMG_FPS_PATH = "/content/drive/MyDrive/HCMC_AI/data/id2img_fps_mid_full.json"
+FRAME_TABLE_PATH = "/content/drive/MyDrive/HCMC_AI/data/frame_table.npz"
+
+# (directory code, keyframe number) packed as dir_code * KEY_STRIDE + number
+KEY_STRIDE = 1 << 32
+
+
+def video_name_for_dir(dir_path):
+    """Video name as used by map-keyframes and submissions, e.g. .../L01_extra/V001 -> L01_V001."""
+    parts = dir_path.rstrip('/').split('/')
+    return f"{parts[-2].split('_')[0]}_{parts[-1]}"
+
+
+class FrameTable:
+    def __init__(self, dirs, dir_codes, names, frame_numbers):
+        self.dirs = np.asarray(dirs).astype(str)
+        self.dir_codes = np.asarray(dir_codes, dtype=np.int32)
+        self.names = np.asarray(names).astype(str)
+        self.frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+        self.dir_lookup = {dir_path: code for code, dir_path in enumerate(self.dirs)}
+
+        # Videos can span several directories (e.g. L01 and L01_extra)
+        dir_videos = [video_name_for_dir(dir_path) for dir_path in self.dirs]
+        self.videos = np.array(sorted(set(dir_videos)), dtype=str)
+        video_lookup = {video: code for code, video in enumerate(self.videos)}
+        self.video_of_dir = np.array([video_lookup[video] for video in dir_videos], dtype=np.int32)
+        # Gaps in the id space have dir code -1, which picks the trailing -1 sentinel
+        self.video_codes = np.append(self.video_of_dir, -1).astype(np.int32)[self.dir_codes]
+
+        keys = self.dir_codes.astype(np.int64) * KEY_STRIDE + self.frame_numbers
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+        self.sorted_numbers = self.frame_numbers[self.order]
+        self.dir_offsets = np.searchsorted(self.sorted_keys, np.arange(len(self.dirs) + 1, dtype=np.int64) * KEY_STRIDE)
+
+    def __len__(self):
+        return len(self.frame_numbers)
+
+    @classmethod
+    def from_id2img_fps(cls, id2img_fps):
+        size = max((int(key) for key in id2img_fps), default=-1) + 1
+        dir_codes = np.full(size, -1, dtype=np.int32)
+        frame_numbers = np.zeros(size, dtype=np.int64)
+        names = [''] * size
+        dir_lookup = {}
+
+        for key, info in id2img_fps.items():
+            path = info.get('image_path', '') if isinstance(info, dict) else ''
+            if not path:
+                continue
+            frame_id = int(key)
+            dir_path, name = os.path.split(path)
+            dir_codes[frame_id] = dir_lookup.setdefault(dir_path, len(dir_lookup))
+            frame_numbers[frame_id] = int(name.split('.')[0])
+            names[frame_id] = name
+
+        dirs = sorted(dir_lookup, key=dir_lookup.get)
+        return cls(dirs, dir_codes, names, frame_numbers)
+
+    @classmethod
+    def load(cls, path=FRAME_TABLE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['dirs'], data['dir_codes'], data['names'], data['frame_numbers'])
+
+    def save(self, path=FRAME_TABLE_PATH):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, dirs=self.dirs, dir_codes=self.dir_codes, names=self.names, frame_numbers=self.frame_numbers)
+        os.replace(tmp_path, path)
+
+    def path(self, frame_id):
+        dir_code = self.dir_codes[frame_id]
+        if dir_code < 0:
+            return None
+        return os.path.join(self.dirs[dir_code], self.names[frame_id])
+
+    def paths(self, frame_ids):
+        return [self.path(frame_id) for frame_id in frame_ids]
+
+    def ids_of(self, image_paths):
+        """Global frame ids for `image_paths` (-1 for paths not in the table)."""
+        dir_codes = np.empty(len(image_paths), dtype=np.int64)
+        numbers = np.zeros(len(image_paths), dtype=np.int64)
+        for i, path in enumerate(image_paths):
+            dir_path, name = os.path.split(path)
+            dir_codes[i] = self.dir_lookup.get(dir_path, -1)
+            try:
+                numbers[i] = int(name.split('.')[0])
+            except ValueError:
+                dir_codes[i] = -1
+
+        ids = np.full(len(image_paths), -1, dtype=np.int64)
+        if len(self.sorted_keys) == 0:
+            return ids
+        keys = dir_codes * KEY_STRIDE + numbers
+        positions = np.minimum(np.searchsorted(self.sorted_keys, keys), len(self.sorted_keys) - 1)
+        found = (dir_codes >= 0) & (self.sorted_keys[positions] == keys)
+        ids[found] = self.order[positions[found]]
+        return ids
+
+    def id_of(self, image_path):
+        frame_id = self.ids_of([image_path])[0]
+        return int(frame_id) if frame_id >= 0 else None
+
+    def video_of(self, frame_ids):
+        """Video names for global frame ids."""
+        return self.videos[self.video_codes[np.asarray(frame_ids)]]
+
+    def neighbours_batch(self, image_paths, min_distance=25, temporal_range=5):
+        """
+        Surrounding keyframes for many anchors at once.
+
+        For each anchor, walks outwards through its directory's sorted
+        keyframes and keeps up to `temporal_range` frames on each side, each at
+        least `min_distance` keyframe numbers from the previously kept one
+        (same selection as the original listdir walk). Returns a list of path
+        lists, or None for anchors not in the table.
+        """
+        ids = self.ids_of(image_paths)
+        known = ids >= 0
+        if not known.any():
+            return [None] * len(image_paths)
+
+        safe_ids = np.where(known, ids, ids[known][0])
+        dir_codes = self.dir_codes[safe_ids].astype(np.int64)
+        anchor_numbers = self.frame_numbers[safe_ids]
+        anchor_positions = np.searchsorted(self.sorted_keys, dir_codes * KEY_STRIDE + anchor_numbers)
+        starts = self.dir_offsets[dir_codes]
+        ends = self.dir_offsets[dir_codes + 1]
+
+        before = [[] for _ in image_paths]
+        after = [[] for _ in image_paths]
+        last_position = len(self.sorted_keys) - 1
+
+        for direction, collected in ((-1, before), (1, after)):
+            active = known.copy()
+            last = anchor_numbers.copy()
+            previous = anchor_positions.copy()
+            for _ in range(temporal_range):
+                if direction < 0:
+                    candidates = np.searchsorted(self.sorted_keys, dir_codes * KEY_STRIDE + last - min_distance, side='right') - 1
+                    candidates = np.minimum(candidates, previous - 1)
+                    active &= candidates >= starts
+                else:
+                    candidates = np.searchsorted(self.sorted_keys, dir_codes * KEY_STRIDE + last + min_distance, side='left')
+                    candidates = np.maximum(candidates, previous + 1)
+                    active &= candidates < ends
+                if not active.any():
+                    break
+                candidates = np.clip(candidates, 0, last_position)
+                for i in np.flatnonzero(active):
+                    collected[i].append(int(self.order[candidates[i]]))
+                last = np.where(active, self.sorted_numbers[candidates], last)
+                previous = np.where(active, candidates, previous)
+
+        return [
+            self.paths(before[i][::-1] + after[i]) if known[i] else None
+            for i in range(len(image_paths))
+        ]
+
+    def neighbours(self, image_path, min_distance=25, temporal_range=5):
+        return self.neighbours_batch([image_path], min_distance, temporal_range)[0]
+
+
+@st.cache_resource
+def load_frame_table(path=FRAME_TABLE_PATH, id2img_fps_path=ID2IMG_FPS_PATH):
+    if os.path.exists(path):
+        return FrameTable.load(path)
+    if not os.path.exists(id2img_fps_path):
+        logger.info("No frame table or id2img_fps available")
+        return None
+    with open(id2img_fps_path, "r") as f:
+        return FrameTable.from_id2img_fps(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the global frame table from id2img_fps")
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--output', default=FRAME_TABLE_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.id2img_fps, "r") as f:
+        frame_table = FrameTable.from_id2img_fps(json.load(f))
+    frame_table.save(args.output)
+    logger.info(f"Wrote {len(frame_table)} frames in {len(frame_table.dirs)} directories to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# data_loaders/keyframe_index.py
+"""
+Consolidated keyframe-time index.
+
+All map-keyframes CSVs (`n,pts_time,fps,frame_idx`, one per video) are compiled
+into a single columnar .npz: fps per video plus concatenated, per-video sorted
+n / frame_idx / pts arrays. Lookups are vectorized with searchsorted, so a
+results grid or a submission needs no per-image CSV reads.
+
+Build with:
+    python -m data_loaders.keyframe_index
+"""
+import argparse
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+MAP_KEYFRAMES_DIR = "/content/drive/MyDrive/HCMC_AI/data/map-keyframes"
+KEYFRAME_INDEX_PATH = "/content/drive/MyDrive/HCMC_AI/data/keyframe_index.npz"
+
+
+class KeyframeIndex:
+    def __init__(self, videos, fps, offsets, n, frame_idx, pts):
+        self.videos = np.asarray(videos)
+        self.fps = np.asarray(fps, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.n = np.asarray(n, dtype=np.int64)
+        self.frame_idx = np.asarray(frame_idx, dtype=np.int64)
+        self.pts = np.asarray(pts, dtype=np.float64)
+        self.video_codes = {str(video): code for code, video in enumerate(self.videos)}
+
+        # (video code, n) packed into one sorted int64 key for vectorized lookups
+        codes = np.repeat(np.arange(len(self.videos), dtype=np.int64), np.diff(self.offsets))
+        self.keys = (codes << 32) | self.n
+
+    def __contains__(self, video_name):
+        return video_name in self.video_codes
+
+    def __len__(self):
+        return len(self.videos)
+
+    @classmethod
+    def build(cls, map_dir=MAP_KEYFRAMES_DIR):
+        videos, fps, offsets, ns, frame_idxs, ptss = [], [], [0], [], [], []
+        for file_name in sorted(os.listdir(map_dir)):
+            if not file_name.endswith('.csv'):
+                continue
+            try:
+                df = pd.read_csv(os.path.join(map_dir, file_name)).sort_values('n')
+            except Exception as e:
+                logger.warning(f"Skipping {file_name}: {e}")
+                continue
+            videos.append(file_name[:-len('.csv')])
+            fps.append(float(df['fps'].iloc[0]))
+            ns.append(df['n'].to_numpy(dtype=np.int64))
+            frame_idxs.append(df['frame_idx'].to_numpy(dtype=np.int64))
+            ptss.append(df['pts_time'].to_numpy(dtype=np.float64))
+            offsets.append(offsets[-1] + len(df))
+
+        def concat(arrays, dtype):
+            return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+        return cls(videos, fps, offsets, concat(ns, np.int64), concat(frame_idxs, np.int64), concat(ptss, np.float64))
+
+    @classmethod
+    def load(cls, path=KEYFRAME_INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['videos'], data['fps'], data['offsets'], data['n'], data['frame_idx'], data['pts'])
+
+    def save(self, path=KEYFRAME_INDEX_PATH):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, videos=self.videos.astype(str), fps=self.fps, offsets=self.offsets,
+                 n=self.n, frame_idx=self.frame_idx, pts=self.pts)
+        os.replace(tmp_path, path)
+
+    def get_fps(self, video_name):
+        return float(self.fps[self.video_codes[video_name]])
+
+    def codes_for(self, video_names):
+        return np.array([self.video_codes.get(video, -1) for video in video_names], dtype=np.int64)
+
+    def lookup_batch(self, video_names, frame_numbers):
+        """
+        Vectorized keyframe lookup.
+
+        Returns (frame_idx, pts, fps) arrays aligned with the inputs. Unknown
+        videos or keyframe numbers get frame_idx -1 and NaN pts/fps.
+        """
+        return self.lookup_codes(self.codes_for(video_names), frame_numbers)
+
+    def lookup_codes(self, codes, frame_numbers):
+        """`lookup_batch` for video codes (-1 for unknown videos) instead of names."""
+        codes = np.asarray(codes, dtype=np.int64)
+        frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+        frame_idx = np.full(len(codes), -1, dtype=np.int64)
+        pts = np.full(len(codes), np.nan)
+        fps = np.full(len(codes), np.nan)
+        if len(self.keys) == 0:
+            return frame_idx, pts, fps
+
+        known = codes >= 0
+        query_keys = (np.maximum(codes, 0) << 32) | frame_numbers
+        positions = np.minimum(np.searchsorted(self.keys, query_keys), len(self.keys) - 1)
+        found = known & (self.keys[positions] == query_keys)
+
+        frame_idx[found] = self.frame_idx[positions[found]]
+        pts[found] = self.pts[positions[found]]
+        fps[known] = self.fps[codes[known]]
+        return frame_idx, pts, fps
+
+    def lookup(self, video_name, frame_number):
+        """Single-keyframe lookup. Returns (frame_idx, pts) or (None, None) if unknown."""
+        frame_idx, pts, _ = self.lookup_batch([video_name], [frame_number])
+        if frame_idx[0] < 0:
+            return None, None
+        return int(frame_idx[0]), float(pts[0])
+
+    def video_keyframes(self, video_name):
+        """(n, frame_idx, pts) arrays of one video, sorted by n."""
+        code = self.video_codes[video_name]
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return self.n[start:end], self.frame_idx[start:end], self.pts[start:end]
+
+
+@st.cache_resource
+def load_keyframe_index(path=KEYFRAME_INDEX_PATH):
+    if not os.path.exists(path):
+        logger.info(f"Keyframe index not found at {path}, falling back to map-keyframes CSVs")
+        return None
+    return KeyframeIndex.load(path)
+
+
+def get_video_fps(video_name, keyframe_index=None):
+    if keyframe_index is None:
+        keyframe_index = load_keyframe_index()
+    if keyframe_index is not None and video_name in keyframe_index:
+        return keyframe_index.get_fps(video_name)
+    df = pd.read_csv(os.path.join(MAP_KEYFRAMES_DIR, f"{video_name}.csv"))
+    return df['fps'].iloc[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile map-keyframes CSVs into one keyframe-time index")
+    parser.add_argument('--map-dir', default=MAP_KEYFRAMES_DIR)
+    parser.add_argument('--output', default=KEYFRAME_INDEX_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    keyframe_index = KeyframeIndex.build(args.map_dir)
+    keyframe_index.save(args.output)
+    logger.info(f"Wrote {len(keyframe_index)} videos / {len(keyframe_index.n)} keyframes to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,73 +1,109 @@
 import os
-import json
 import streamlit as st
 
-@st.cache_data
-def load_ocr_data(image_paths):
-    ocr_keywords = set()
-    ocr_data = {}
-    for path in image_paths:
-        parts = path.split('/')
-        data_part = parts[-3]
-        video_id = parts[-2]
-        frame_number_str = parts[-1].split('.')[0]
+from data_loaders.frame_table import load_frame_table
+from data_loaders.metadata_store import load_metadata_store, read_frame_json, read_frame_lines, FIELDS
+from data_loaders.bitmap_index import load_bitmap_index
 
-        ocr_file = f"/content/drive/MyDrive/HCMC_AI/data/ocr/{data_part}/{video_id}.json"
-        if not os.path.exists(ocr_file):
-            continue
+# Frames fetched from the metadata store per vectorized gather
+CHUNK_SIZE = 4096
 
-        with open(ocr_file, "r") as file:
-            ocr_json = json.load(file)
-            ocr_data[path] = ocr_json.get(frame_number_str, [])
-            ocr_keywords.update(ocr_json.get(frame_number_str, []))
+def _load_field(field, image_paths, file_loader):
+    """(data, sorted terms) for `field`, from the metadata store when built, else the per-video files."""
+    store = load_metadata_store()
+    frame_table = load_frame_table() if store is not None else None
+    if frame_table is None:
+        return file_loader(image_paths)
 
-    return ocr_data, sorted(ocr_keywords)
+    image_paths = list(image_paths)
+    frame_ids = frame_table.ids_of(image_paths)
+    data, terms = {}, set()
+    for start in range(0, len(image_paths), CHUNK_SIZE):
+        values = store.get_batch(field, frame_ids[start:start + CHUNK_SIZE])
+        for path, tokens in zip(image_paths[start:start + CHUNK_SIZE], values):
+            if tokens:
+                data[path] = tokens
+                terms.update(tokens)
+
+    # Frames added after the store was built still come from their files
+    missing = [path for path, frame_id in zip(image_paths, frame_ids) if frame_id < 0 or frame_id >= len(store)]
+    if missing:
+        missing_data, missing_terms = file_loader(missing)
+        data.update(missing_data)
+        terms.update(missing_terms)
+    return data, sorted(terms)
+
+def load_ocr_data(image_paths):
+    return _load_field('ocr', image_paths, _load_ocr_data_from_files)
 
-@st.cache_data
 def load_object_data(image_paths):
-    object_classes = set()
-    object_data = {}
+    return _load_field('objects', image_paths, _load_object_data_from_files)
+
+def load_object_count_data(image_paths):
+    return _load_field('counts', image_paths, _load_object_count_data_from_files)
+
+def load_metadata_batch(image_paths):
+    """{path: {'ocr': [...], 'objects': [...], 'counts': [...]}} for all `image_paths`."""
+    image_paths = list(image_paths)
+    store = load_metadata_store()
+    frame_table = load_frame_table() if store is not None else None
+    frame_ids = frame_table.ids_of(image_paths) if frame_table is not None else None
+    if frame_ids is not None and ((frame_ids >= 0) & (frame_ids < len(store))).all():
+        metadata = {}
+        for start in range(0, len(image_paths), CHUNK_SIZE):
+            chunk_ids = frame_ids[start:start + CHUNK_SIZE]
+            values = {field: store.get_batch(field, chunk_ids) for field in FIELDS}
+            for i, path in enumerate(image_paths[start:start + CHUNK_SIZE]):
+                metadata[path] = {field: values[field][i] for field in FIELDS}
+        return metadata
+
+    loaded = {
+        'ocr': load_ocr_data(image_paths)[0],
+        'objects': load_object_data(image_paths)[0],
+        'counts': load_object_count_data(image_paths)[0],
+    }
+    return {path: {field: loaded[field].get(path, []) for field in FIELDS} for path in image_paths}
+
+def _load_frames_from_files(image_paths, source_for, reader):
+    """(data, sorted terms) read from per-video files; frames are matched on their parsed keyframe number."""
+    terms = set()
+    data = {}
+    frames_by_source = {}
     for path in image_paths:
         parts = path.split('/')
-        data_part = parts[-3]
-        video_id = parts[-2]
-        frame_number_str = parts[-1].split('.')[0]
-
-        object_file = f"/content/drive/MyDrive/HCMC_AI/data/context_encoded/classes_encoded/{data_part}/{video_id}.txt"
-        if not os.path.exists(object_file):
+        try:
+            frame_number = int(parts[-1].split('.')[0])
+        except ValueError:
             continue
 
-        with open(object_file, "r") as file:
-            for line in file:
-                if line.startswith(frame_number_str):
-                    objects = line.strip().split()[1:]
-                    object_data[path] = objects
-                    object_classes.update(objects)
-                    break
-    return object_data, sorted(object_classes)
+        source = source_for(parts[-3], parts[-2])
+        if source not in frames_by_source:
+            frames_by_source[source] = reader(source) if os.path.exists(source) else {}
+        tokens = frames_by_source[source].get(frame_number)
+        if tokens is not None:
+            data[path] = tokens
+            terms.update(tokens)
+    return data, sorted(terms)
 
 @st.cache_data
-def load_object_count_data(image_paths):
-    object_counts = set()
-    count_data = {}
-    for path in image_paths:
-        parts = path.split('/')
-        data_part = parts[-3]
-        video_id = parts[-2]
-        frame_number_str = parts[-1].split('.')[0]
+def _load_ocr_data_from_files(image_paths):
+    return _load_frames_from_files(
+        image_paths, lambda data_part, video_id: f"/content/drive/MyDrive/HCMC_AI/data/ocr/{data_part}/{video_id}.json",
+        read_frame_json)
 
-        count_file = f"/content/drive/MyDrive/HCMC_AI/data/context_encoded/number_encoded/{data_part}/{video_id}.txt"
-        if not os.path.exists(count_file):
-            continue
+@st.cache_data
+def _load_object_data_from_files(image_paths):
+    return _load_frames_from_files(
+        image_paths,
+        lambda data_part, video_id: f"/content/drive/MyDrive/HCMC_AI/data/context_encoded/classes_encoded/{data_part}/{video_id}.txt",
+        read_frame_lines)
 
-        with open(count_file, "r") as file:
-            for line in file:
-                if line.startswith(frame_number_str):
-                    counts = line.strip().split()[1:]
-                    count_data[path] = counts
-                    object_counts.update(counts)
-                    break
-    return count_data, sorted(object_counts)
+@st.cache_data
+def _load_object_count_data_from_files(image_paths):
+    return _load_frames_from_files(
+        image_paths,
+        lambda data_part, video_id: f"/content/drive/MyDrive/HCMC_AI/data/context_encoded/number_encoded/{data_part}/{video_id}.txt",
+        read_frame_lines)
 
 # Filter images by OCR
 def filter_images_by_ocr(image_paths, ocr_data, selected_ocr_keywords):
@@ -78,10 +114,32 @@ def filter_images_by_ocr(image_paths, ocr_data, selected_ocr_keywords):
             filtered_paths.append(path)
     return filtered_paths
 
+def match_mask_from_bitmaps(image_paths, selected_objects, selected_numbers):
+    """
+    Per-path booleans for "has all selected objects and counts" from the bitmap
+    index, or None if it is not built. Paths unknown to the index get None.
+    """
+    bitmap_index = load_bitmap_index()
+    frame_table = load_frame_table() if bitmap_index is not None else None
+    if frame_table is None:
+        return None
+    frame_ids = frame_table.ids_of(list(image_paths))
+    matches = bitmap_index.contains(bitmap_index.query(selected_objects, selected_numbers), frame_ids)
+    known = (frame_ids >= 0) & (frame_ids < len(bitmap_index))
+    return [bool(match) if is_known else None for match, is_known in zip(matches, known)]
+
 # Filter images by object metadata
 def filter_images_by_metadata(image_paths, object_metadata, number_metadata, selected_objects, selected_numbers):
+    if not selected_objects and not selected_numbers:
+        return list(image_paths)
+    matches = match_mask_from_bitmaps(image_paths, selected_objects, selected_numbers) or [None] * len(image_paths)
+
     filtered_paths = []
-    for path in image_paths:
+    for path, match in zip(image_paths, matches):
+        if match is not None:
+            if match:
+                filtered_paths.append(path)
+            continue
         objects = object_metadata.get(path, [])
         numbers = number_metadata.get(path, [])
 
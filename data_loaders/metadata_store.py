@@ -0,0 +1,208 @@
+# data_loaders/metadata_store.py
+"""
+Columnar metadata store indexed by global frame id.
+
+OCR texts, object classes and object counts for every frame are compiled
+offline into CSR arrays (`{field}_offsets.npy` / `{field}_values.npy`) plus a
+per-field vocabulary. The arrays are memory-mapped at load time, so fetching
+metadata for thousands of frames is a vectorized gather that only touches the
+rows it needs.
+
+Build (after the frame table) with:
+    python -m data_loaders.metadata_store
+"""
+import argparse
+import json
+import os
+import shutil
+import logging
+
+import numpy as np
+import streamlit as st
+
+from data_loaders.frame_table import FrameTable, FRAME_TABLE_PATH, ID2IMG_FPS_PATH
+
+logger = logging.getLogger(__name__)
+
+OCR_DIR = "/content/drive/MyDrive/HCMC_AI/data/ocr"
+CLASSES_DIR = "/content/drive/MyDrive/HCMC_AI/data/context_encoded/classes_encoded"
+COUNTS_DIR = "/content/drive/MyDrive/HCMC_AI/data/context_encoded/number_encoded"
+METADATA_STORE_DIR = "/content/drive/MyDrive/HCMC_AI/data/metadata_store"
+
+FIELDS = ('ocr', 'objects', 'counts')
+
+
+def read_frame_json(path):
+    """OCR file: {"<frame>": [texts]} keyed by keyframe number."""
+    with open(path, "r") as f:
+        return {int(frame): texts for frame, texts in json.load(f).items()}
+
+
+def read_frame_lines(path):
+    """Encoded context file: one `<frame> token token ...` line per keyframe."""
+    frames = {}
+    with open(path, "r") as f:
+        for line in f:
+            tokens = line.split()
+            if tokens:
+                frames[int(tokens[0])] = tokens[1:]
+    return frames
+
+
+class MetadataStore:
+    def __init__(self, vocab, offsets, values):
+        self.vocab = {field: np.array(vocab[field], dtype=object) for field in FIELDS}
+        self.offsets = offsets
+        self.values = values
+        self.term_ids = {}
+
+    def __len__(self):
+        return len(self.offsets[FIELDS[0]]) - 1
+
+    @classmethod
+    def empty(cls):
+        return cls({field: [] for field in FIELDS},
+                   {field: np.zeros(1, dtype=np.int64) for field in FIELDS},
+                   {field: np.zeros(0, dtype=np.int32) for field in FIELDS})
+
+    @classmethod
+    def build(cls, frame_table, ocr_dir=OCR_DIR, classes_dir=CLASSES_DIR, counts_dir=COUNTS_DIR):
+        return cls.empty().extend(frame_table, ocr_dir, classes_dir, counts_dir)
+
+    def extend(self, frame_table, ocr_dir=OCR_DIR, classes_dir=CLASSES_DIR, counts_dir=COUNTS_DIR):
+        """
+        Store covering every frame of `frame_table`, keeping this store's rows
+        and term ids and reading metadata files only for the frame ids past
+        its end (frames appended by ingestion).
+        """
+        sources = {
+            'ocr': (ocr_dir, '.json', read_frame_json),
+            'objects': (classes_dir, '.txt', read_frame_lines),
+            'counts': (counts_dir, '.txt', read_frame_lines),
+        }
+        start, size = len(self), len(frame_table)
+        vocab = {field: {word: i for i, word in enumerate(self.vocab[field])} for field in FIELDS}
+        lengths = {field: np.zeros(max(size - start, 0), dtype=np.int64) for field in FIELDS}
+        rows = {field: [] for field in FIELDS}
+
+        new_dir_codes = np.unique(frame_table.dir_codes[start:])
+        for dir_code in new_dir_codes[new_dir_codes >= 0]:
+            data_part, video_id = frame_table.dirs[dir_code].rstrip('/').split('/')[-2:]
+            frame_ids = frame_table.order[frame_table.dir_offsets[dir_code]:frame_table.dir_offsets[dir_code + 1]]
+            frame_ids = frame_ids[frame_ids >= start]
+            for field, (root, extension, reader) in sources.items():
+                source = os.path.join(root, data_part, f"{video_id}{extension}")
+                if not os.path.exists(source):
+                    continue
+                try:
+                    frames = reader(source)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping {source}: {e}")
+                    continue
+                words = vocab[field]
+                for frame_id in frame_ids:
+                    tokens = frames.get(int(frame_table.frame_numbers[frame_id]))
+                    if tokens:
+                        lengths[field][frame_id - start] = len(tokens)
+                        rows[field].append((frame_id - start, [words.setdefault(token, len(words)) for token in tokens]))
+
+        offsets, values = {}, {}
+        for field in FIELDS:
+            old_offsets = np.asarray(self.offsets[field])
+            new_offsets = np.concatenate([[0], np.cumsum(lengths[field])]).astype(np.int64)
+            new_values = np.zeros(new_offsets[-1], dtype=np.int32)
+            for row, term_ids in rows[field]:
+                new_values[new_offsets[row]:new_offsets[row] + len(term_ids)] = term_ids
+            offsets[field] = np.concatenate([old_offsets, old_offsets[-1] + new_offsets[1:]])
+            values[field] = np.concatenate([np.asarray(self.values[field]), new_values])
+        return MetadataStore({field: list(vocab[field]) for field in FIELDS}, offsets, values)
+
+    @classmethod
+    def load(cls, store_dir=METADATA_STORE_DIR, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(store_dir, 'vocab.json'), "r") as f:
+            vocab = json.load(f)
+        offsets = {field: np.load(os.path.join(store_dir, f"{field}_offsets.npy"), mmap_mode=mmap_mode) for field in FIELDS}
+        values = {field: np.load(os.path.join(store_dir, f"{field}_values.npy"), mmap_mode=mmap_mode) for field in FIELDS}
+        return cls(vocab, offsets, values)
+
+    def save(self, store_dir=METADATA_STORE_DIR):
+        # Write a complete copy next to the target, then swap directories
+        tmp_dir = f"{store_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for field in FIELDS:
+            np.save(os.path.join(tmp_dir, f"{field}_offsets.npy"), np.asarray(self.offsets[field]))
+            np.save(os.path.join(tmp_dir, f"{field}_values.npy"), np.asarray(self.values[field]))
+        with open(os.path.join(tmp_dir, 'vocab.json'), "w") as f:
+            json.dump({field: list(self.vocab[field]) for field in FIELDS}, f, ensure_ascii=False)
+
+        old_dir = f"{store_dir}.old"
+        if os.path.exists(store_dir):
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(store_dir, old_dir)
+        os.replace(tmp_dir, store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def term_id(self, field, term):
+        """Vocabulary id of `term` in `field`, or None if it never occurs."""
+        if field not in self.term_ids:
+            self.term_ids[field] = {word: i for i, word in enumerate(self.vocab[field])}
+        return self.term_ids[field].get(term)
+
+    def _gather(self, field, frame_ids):
+        """Positions in `values[field]` for `frame_ids`, plus per-frame lengths (unknown ids are empty)."""
+        frame_ids = np.asarray(frame_ids, dtype=np.int64)
+        offsets = self.offsets[field]
+        valid = (frame_ids >= 0) & (frame_ids < len(offsets) - 1)
+        safe_ids = np.where(valid, frame_ids, 0)
+        starts = np.where(valid, offsets[safe_ids], 0)
+        lengths = np.where(valid, offsets[safe_ids + 1] - starts, 0)
+        run_starts = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - run_starts, lengths) + np.arange(lengths.sum())
+        return positions, lengths
+
+    def get_batch(self, field, frame_ids):
+        """Lists of `field` values for each of `frame_ids`."""
+        if len(frame_ids) == 0:
+            return []
+        positions, lengths = self._gather(field, frame_ids)
+        words = self.vocab[field][np.asarray(self.values[field][positions])]
+        return [list(chunk) for chunk in np.split(words, np.cumsum(lengths)[:-1])]
+
+    def terms(self, field, frame_ids):
+        """Sorted distinct `field` values occurring in `frame_ids`."""
+        positions, _ = self._gather(field, frame_ids)
+        term_ids = np.unique(np.asarray(self.values[field][positions]))
+        return sorted(self.vocab[field][term_ids])
+
+
+@st.cache_resource
+def load_metadata_store(store_dir=METADATA_STORE_DIR):
+    if not os.path.exists(os.path.join(store_dir, 'vocab.json')):
+        logger.info(f"Metadata store not found at {store_dir}, falling back to per-video files")
+        return None
+    return MetadataStore.load(store_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile OCR and object metadata into a columnar store")
+    parser.add_argument('--frame-table', default=FRAME_TABLE_PATH)
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--output', default=METADATA_STORE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if os.path.exists(args.frame_table):
+        frame_table = FrameTable.load(args.frame_table)
+    else:
+        with open(args.id2img_fps, "r") as f:
+            frame_table = FrameTable.from_id2img_fps(json.load(f))
+    store = MetadataStore.build(frame_table)
+    store.save(args.output)
+    logger.info(f"Wrote metadata for {len(store)} frames to {args.output} "
+                f"({', '.join(f'{len(store.vocab[field])} {field} terms' for field in FIELDS)})")
+
+
+if __name__ == '__main__':
+    main()
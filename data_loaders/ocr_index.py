@@ -0,0 +1,192 @@
+# data_loaders/ocr_index.py
+"""
+BM25 full-text index over keyframe OCR text.
+
+Text is folded (Unicode NFD, combining marks dropped, đ -> d, lower case) and
+split into padded character n-grams, so "Khai mạc", "khai mac" and noisy OCR
+like "khal mac" still share most of their tokens. Postings are compiled
+offline into one .npz (term -> frame ids and term frequencies) and scored with
+BM25 at query time.
+
+Build (after the metadata store, or from the frame table and OCR JSON) with:
+    python -m data_loaders.ocr_index
+"""
+import argparse
+import json
+import os
+import re
+import unicodedata
+import logging
+from collections import Counter
+
+import numpy as np
+import streamlit as st
+
+from data_loaders.frame_table import FrameTable, FRAME_TABLE_PATH, ID2IMG_FPS_PATH
+from data_loaders.metadata_store import MetadataStore, METADATA_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+OCR_INDEX_PATH = "/content/drive/MyDrive/HCMC_AI/data/ocr_index.npz"
+
+NGRAM_SIZE = 3
+# Text in straight or curly quotes; apostrophes inside words ("man's") do not open a quote
+QUOTED_TEXT = re.compile(r'(?<!\w)["\'“‘]([^"\'“”‘’]+?)["\'”’](?!\w)')
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def fold_text(text):
+    """Lower-case, diacritic-free text with punctuation turned into spaces."""
+    text = unicodedata.normalize('NFD', text.replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return re.sub(r'[\W_]+', ' ', text.lower()).strip()
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    """Character n-grams of each folded word, padded with spaces at word boundaries."""
+    grams = []
+    for word in fold_text(text).split():
+        padded = f" {word} "
+        grams.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams
+
+
+
+def quoted_text(*texts):
+    """On-screen text quoted in `texts` (e.g. the sign 'GIẢM GIÁ 50%'), joined into one OCR query, or None."""
+    quotes, seen = [], set()
+    for text in texts:
+        for quote in QUOTED_TEXT.findall(text or ''):
+            folded = fold_text(quote)
+            if folded and folded not in seen:
+                seen.add(folded)
+                quotes.append(quote.strip())
+    return ' '.join(quotes) or None
+
+
+class OcrIndex:
+    def __init__(self, terms, offsets, postings, tfs, doc_lengths):
+        self.terms = np.asarray(terms).astype(str)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+
+        self.n_docs = int((self.doc_lengths > 0).sum())
+        self.avg_doc_length = float(self.doc_lengths[self.doc_lengths > 0].mean()) if self.n_docs else 1.0
+        doc_freqs = np.diff(self.offsets)
+        self.idf = np.log(1 + (self.n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, frame_texts, size):
+        """Index from (frame_id, [ocr texts]) pairs over a corpus of `size` frames."""
+        term_ids = {}
+        term_column, doc_column, tf_column = [], [], []
+        doc_lengths = np.zeros(size, dtype=np.float32)
+        for frame_id, texts in frame_texts:
+            counts = Counter(char_ngrams(' '.join(texts)))
+            if not counts:
+                continue
+            doc_lengths[frame_id] = sum(counts.values())
+            for gram, tf in counts.items():
+                term_column.append(term_ids.setdefault(gram, len(term_ids)))
+                doc_column.append(frame_id)
+                tf_column.append(tf)
+
+        terms = sorted(term_ids, key=term_ids.get)
+        term_column = np.asarray(term_column, dtype=np.int64)
+        order = np.lexsort((np.asarray(doc_column, dtype=np.int64), term_column))
+        offsets = np.searchsorted(term_column[order], np.arange(len(terms) + 1))
+        return cls(terms, offsets, np.asarray(doc_column, dtype=np.int32)[order],
+                   np.asarray(tf_column, dtype=np.float32)[order], doc_lengths)
+
+    @classmethod
+    def from_store(cls, store, chunk_size=4096):
+        """Index the OCR field of a MetadataStore."""
+        frame_ids = np.flatnonzero(np.diff(np.asarray(store.offsets['ocr'])) > 0)
+
+        def frame_texts():
+            for start in range(0, len(frame_ids), chunk_size):
+                chunk = frame_ids[start:start + chunk_size]
+                yield from zip(chunk.tolist(), store.get_batch('ocr', chunk))
+
+        return cls.build(frame_texts(), len(store))
+
+    @classmethod
+    def load(cls, path=OCR_INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['terms'], data['offsets'], data['postings'], data['tfs'], data['doc_lengths'])
+
+    def save(self, path=OCR_INDEX_PATH):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, terms=self.terms, offsets=self.offsets, postings=self.postings,
+                 tfs=self.tfs.astype(np.uint16), doc_lengths=self.doc_lengths)
+        os.replace(tmp_path, path)
+
+    def score(self, query):
+        """BM25 score of every frame for `query` (0 for frames sharing no n-gram)."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for gram, query_tf in Counter(char_ngrams(query)).items():
+            term_id = self.term_ids.get(gram)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs, tfs = self.postings[start:end], self.tfs[start:end]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[docs] / self.avg_doc_length)
+            scores[docs] += query_tf * self.idf[term_id] * tfs * (BM25_K1 + 1) / (tfs + norm)
+        return scores
+
+    def search(self, query, top_k, candidate_ids=None):
+        """Top `top_k` (frame_ids, scores) for `query`, best first, optionally limited to `candidate_ids`."""
+        scores = self.score(query)
+        if candidate_ids is not None:
+            allowed = np.zeros(len(self), dtype=bool)
+            candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+            allowed[candidate_ids[(candidate_ids >= 0) & (candidate_ids < len(self))]] = True
+            scores[~allowed] = 0
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > top_k > 0:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        order = np.lexsort((matched, -scores[matched]))[:top_k]
+        return matched[order], scores[matched[order]]
+
+
+@st.cache_resource
+def load_ocr_index(path=OCR_INDEX_PATH):
+    if not os.path.exists(path):
+        logger.info(f"OCR index not found at {path}, falling back to scanning OCR files")
+        return None
+    return OcrIndex.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 OCR index")
+    parser.add_argument('--metadata-store', default=METADATA_STORE_DIR)
+    parser.add_argument('--frame-table', default=FRAME_TABLE_PATH)
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--output', default=OCR_INDEX_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if os.path.exists(os.path.join(args.metadata_store, 'vocab.json')):
+        store = MetadataStore.load(args.metadata_store)
+    else:
+        if os.path.exists(args.frame_table):
+            frame_table = FrameTable.load(args.frame_table)
+        else:
+            with open(args.id2img_fps, "r") as f:
+                frame_table = FrameTable.from_id2img_fps(json.load(f))
+        store = MetadataStore.build(frame_table)
+
+    index = OcrIndex.from_store(store)
+    index.save(args.output)
+    logger.info(f"Indexed OCR text of {index.n_docs} frames ({len(index.terms)} n-grams) into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
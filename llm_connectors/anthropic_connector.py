@@ -1,8 +1,7 @@
 # anthropic_connector.py
-import base64
 import httpx
-import aiofiles
 from .base import LLMConnectorBase
+from .image_payload import prepare_image_payload
 
 class AnthropicConnector(LLMConnectorBase):
     def __init__(self, api_key, model="claude-3-sonnet-20240229"):
@@ -29,9 +28,7 @@ class AnthropicConnector(LLMConnectorBase):
 
     async def analyze_image(self, image_path, prompt, **kwargs):
         async with httpx.AsyncClient() as client:
-            async with aiofiles.open(image_path, "rb") as image_file:
-                image_data = await image_file.read()
-            base64_image = base64.b64encode(image_data).decode('utf-8')
+            image = await prepare_image_payload(image_path, 'anthropic', kwargs.get('payload_stats'))
 
             headers = {
                 "Content-Type": "application/json",
@@ -49,8 +46,8 @@ class AnthropicConnector(LLMConnectorBase):
                                 "type": "image",
                                 "source": {
                                     "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": base64_image
+                                    "media_type": image.media_type,
+                                    "data": image.data
                                 }
                             },
                             {
@@ -0,0 +1,192 @@
+# llm_connectors/image_payload.py
+"""
+Shared image preparation for vision LLM calls.
+
+Keyframes are downscaled to VISION_MAX_SIDE, re-encoded as JPEG at
+VISION_JPEG_QUALITY and base64-encoded once. Prepared payloads live in an LRU
+cache keyed by the file's content hash and the settings, so repeat validations
+and temporal hops over the same frames reuse them. Running totals of bytes and
+estimated vision tokens saved are available from `get_payload_stats`; a
+`PayloadStats` passed to `prepare_image_payload` counts one run on its own.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedImage:
+    def __init__(self, data, media_type, width, height, original_width, original_height, original_bytes):
+        self.data = data
+        self.media_type = media_type
+        self.width = width
+        self.height = height
+        self.original_width = original_width
+        self.original_height = original_height
+        self.original_bytes = original_bytes
+
+    @property
+    def encoded_bytes(self):
+        return len(self.data)
+
+    @property
+    def data_url(self):
+        return f"data:{self.media_type};base64,{self.data}"
+
+
+def estimate_image_tokens(provider, width, height, detail='auto'):
+    """Approximate vision tokens billed for an image of the given size."""
+    if provider == 'openai':
+        if detail == 'low':
+            return 85
+        # Fit in 2048x2048, then scale the shortest side down to 768, count 512px tiles
+        scale = min(1.0, 2048 / max(width, height))
+        width, height = width * scale, height * scale
+        scale = min(1.0, 768 / min(width, height))
+        width, height = width * scale, height * scale
+        return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+    if provider == 'anthropic':
+        scale = min(1.0, 1568 / max(width, height))
+        return int(width * scale * height * scale / 750)
+    return 258
+
+
+class PayloadStats:
+    """Thread-safe counters of prepared image payloads: requests, cache hits, bytes and estimated tokens."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {
+            'requests': 0,
+            'cache_hits': 0,
+            'original_bytes': 0,
+            'sent_bytes': 0,
+            'original_tokens': 0,
+            'sent_tokens': 0,
+        }
+
+    def record(self, prepared, provider, detail, cache_hit):
+        original_tokens = estimate_image_tokens(provider, prepared.original_width, prepared.original_height, detail)
+        sent_tokens = estimate_image_tokens(provider, prepared.width, prepared.height, detail)
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts['cache_hits'] += int(cache_hit)
+            self.counts['original_bytes'] += prepared.original_bytes
+            self.counts['sent_bytes'] += prepared.encoded_bytes
+            self.counts['original_tokens'] += original_tokens
+            self.counts['sent_tokens'] += sent_tokens
+
+    def as_dict(self):
+        with self.lock:
+            stats = dict(self.counts)
+        stats['bytes_saved'] = stats['original_bytes'] - stats['sent_bytes']
+        stats['tokens_saved'] = stats['original_tokens'] - stats['sent_tokens']
+        return stats
+
+
+class ImagePayloadCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.payloads = OrderedDict()
+        self.digests = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = PayloadStats()
+
+    def _file_digest(self, image_path):
+        # (path, mtime, size) memo avoids re-reading and re-hashing unchanged files; LRU-bounded like the payloads
+        stat = os.stat(image_path)
+        memo_key = (image_path, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            digest = self.digests.get(memo_key)
+            if digest is not None:
+                self.digests.move_to_end(memo_key)
+                return digest, None
+        with open(image_path, "rb") as image_file:
+            image_data = image_file.read()
+        digest = hashlib.blake2b(image_data, digest_size=16).hexdigest()
+        with self.lock:
+            self.digests[memo_key] = digest
+            while len(self.digests) > self.max_entries:
+                self.digests.popitem(last=False)
+        return digest, image_data
+
+    def prepare(self, image_path, provider, max_side=None, quality=None, detail=None, stats=None):
+        """Prepared payload, counted in the cache totals and in `stats` (a per-run PayloadStats) if given."""
+        detail = detail or Config.VISION_DETAIL
+        prepared, cache_hit = self._get(image_path, max_side or Config.VISION_MAX_SIDE, quality or Config.VISION_JPEG_QUALITY)
+        for counter in (self.stats, stats):
+            if counter is not None:
+                counter.record(prepared, provider, detail, cache_hit)
+        return prepared
+
+    def warm(self, image_path, max_side=None, quality=None):
+        """Encode `image_path` ahead of a likely vision request without counting it as sent."""
+        self._get(image_path, max_side or Config.VISION_MAX_SIDE, quality or Config.VISION_JPEG_QUALITY)
+
+    def _get(self, image_path, max_side, quality):
+        digest, image_data = self._file_digest(image_path)
+        key = (digest, max_side, quality)
+        with self.lock:
+            prepared = self.payloads.get(key)
+            if prepared is not None:
+                self.payloads.move_to_end(key)
+                return prepared, True
+
+        if image_data is None:
+            with open(image_path, "rb") as image_file:
+                image_data = image_file.read()
+        prepared = self._encode(image_data, max_side, quality)
+        with self.lock:
+            self.payloads[key] = prepared
+            while len(self.payloads) > self.max_entries:
+                self.payloads.popitem(last=False)
+        return prepared, False
+
+    def _encode(self, image_data, max_side, quality):
+        with Image.open(io.BytesIO(image_data)) as image:
+            original_width, original_height = image.size
+            image = image.convert('RGB')
+            image.thumbnail((max_side, max_side))
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=quality)
+        data = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        return PreparedImage(data, 'image/jpeg', image.width, image.height,
+                             original_width, original_height, len(base64.b64encode(image_data)))
+
+    def get_stats(self):
+        return self.stats.as_dict()
+
+
+payload_cache = ImagePayloadCache(Config.VISION_PAYLOAD_CACHE_SIZE)
+
+
+async def prepare_image_payload(image_path, provider, stats=None, **kwargs):
+    """Prepared (downscaled, base64) image for `provider`, also counted in `stats`; resizing runs off the event loop."""
+    return await asyncio.to_thread(payload_cache.prepare, image_path, provider, stats=stats, **kwargs)
+
+
+async def warm_image_payloads(image_paths):
+    """Prepare payloads for `image_paths` in the background; unreadable images are skipped."""
+    def warm_all():
+        for image_path in image_paths:
+            try:
+                payload_cache.warm(image_path)
+            except (OSError, ValueError) as e:
+                logger.debug(f"Could not warm image payload for {image_path}: {e}")
+    await asyncio.to_thread(warm_all)
+
+
+def get_payload_stats():
+    return payload_cache.get_stats()
+
@@ -1,10 +1,10 @@
 # openai_connector.py
 import openai
-import base64
 import aiohttp
 import asyncio
-import aiofiles
 from .base import LLMConnectorBase
+from .image_payload import prepare_image_payload
+from config import Config
 
 class OpenAIConnector(LLMConnectorBase):
     def __init__(self, api_key, model="gpt-4o"):
@@ -35,15 +35,14 @@ class OpenAIConnector(LLMConnectorBase):
                 return response['choices'][0]['message']['content']
 
     async def analyze_image(self, image_path, prompt, **kwargs):
-        # Asynchronously read the image file
-        async with aiofiles.open(image_path, "rb") as image_file:
-            image_data = await image_file.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        # Downscaled, cached payload shared across validations
+        detail = kwargs.get('detail', Config.VISION_DETAIL)
+        image = await prepare_image_payload(image_path, 'openai', kwargs.get('payload_stats'), detail=detail)
 
         # Prepare the message content
         message_content = [
             {"type": "text", "text": prompt},
-            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+            {"type": "image_url", "image_url": {"url": image.data_url, "detail": detail}}
         ]
 
         # Asynchronously call the OpenAI API
@@ -0,0 +1,205 @@
+# scripts/batch_runner.py
+"""
+Offline batch mode: run a file of competition queries end-to-end into
+Submission/query-{x}-{y}.csv files.
+
+Input is JSONL or CSV with the columns:
+    query_id   -> x in the submission file name
+    type       -> y, "kis" or "qa"
+    text       -> the competition prompt
+    method     -> optional, "Agent" (default), "CLIP", "Captioning" or "OCR"
+    top_k      -> optional, defaults to --top-k
+
+Completed queries are appended to Submission/batch_manifest.jsonl; rerunning
+the same command skips them, so a crashed run resumes where it stopped.
+
+    python -m scripts.batch_runner queries.jsonl --concurrency 4 --provider openai
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+
+from config import Config
+from llm_connectors.llm_connector import LLMConnector
+from services.agent_search_service import AgentSearchService
+from services.search_service import perform_search
+from agents.agent_orchestrator import AgentOrchestrator, create_local_classifier
+from agents.run_budget import RunBudget
+from utilities.csv_utils import create_csv_file
+from utilities.model_utils import load_model, load_faiss_index, load_id2img_fps
+from utilities.video_utils import get_video_and_frame_idx
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_DIR = "Submission"
+MANIFEST_PATH = os.path.join(SUBMISSION_DIR, "batch_manifest.jsonl")
+CATEGORY_ORDER = {'Exact Match': 0, 'Near Match': 1, 'Weak Match': 2, 'Unvalidated': 3}
+
+
+def read_queries(path, default_top_k):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    queries = []
+    for row in rows:
+        queries.append({
+            'query_id': str(row['query_id']),
+            'type': row.get('type', 'kis').strip().lower(),
+            'text': row['text'],
+            'method': row.get('method') or 'Agent',
+            'top_k': int(row.get('top_k') or default_top_k),
+        })
+    return queries
+
+
+def read_manifest(path=MANIFEST_PATH):
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line
+                continue
+            if entry.get('status') == 'done':
+                done[(entry['query_id'], entry['type'])] = entry
+    return done
+
+
+def append_manifest(entry, path=MANIFEST_PATH):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def submission_path(query):
+    return os.path.join(SUBMISSION_DIR, f"query-{query['query_id']}-{query['type']}.csv")
+
+
+def best_agent_result(results):
+    candidates = [res for res in results if res['match_assessment']['category'] in CATEGORY_ORDER]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda res: (CATEGORY_ORDER[res['match_assessment']['category']],
+                                            -res['match_assessment']['confidence']))
+
+
+def format_base_time(time_in_seconds):
+    return f"{int(time_in_seconds // 60)}:{int(time_in_seconds % 60):02d}"
+
+
+class BatchRunner:
+    def __init__(self, provider_name, concurrency):
+        # Model, index and frame table are loaded once and shared by every query
+        self.model, _ = load_model()
+        self.index = load_faiss_index()
+        self.id2img_fps = load_id2img_fps()
+        self.search_service = AgentSearchService(self.model, self.index, self.id2img_fps)
+        self.local_classifier = create_local_classifier(self.model)
+        self.llm_connector = LLMConnector(provider_name=provider_name, api_key=Config.get_api_key(provider_name))
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_query(self, query):
+        timings = {}
+        start = time.perf_counter()
+        answer = None
+
+        if query['method'] == 'Agent':
+            orchestrator = AgentOrchestrator(self.llm_connector, self.search_service, self.local_classifier)
+            results = await orchestrator.process_query(query['text'], query['top_k'], budget=RunBudget.from_config())
+            timings['agent_seconds'] = round(time.perf_counter() - start, 3)
+            best = best_agent_result(results)
+            image_path = best['image_path'] if best else None
+            if best and query['type'] == 'qa':
+                answer = (best.get('question_answer') or {}).get('answer')
+        else:
+            image_paths = await asyncio.to_thread(
+                perform_search, query['method'], self.model, self.index, query['text'],
+                query['top_k'], set(), self.id2img_fps
+            )
+            timings['search_seconds'] = round(time.perf_counter() - start, 3)
+            image_path = image_paths[0] if image_paths else None
+
+        if not image_path:
+            raise ValueError("No results for query")
+
+        video_name, time_in_seconds, _, _ = get_video_and_frame_idx(image_path, self.id2img_fps)
+        csv_content, file_path = create_csv_file(query['query_id'], query['type'], video_name,
+                                                 format_base_time(time_in_seconds), answer)
+        if file_path is None:
+            raise ValueError(f"Could not write submission for video {video_name}")
+
+        timings['total_seconds'] = round(time.perf_counter() - start, 3)
+        return {
+            'image_path': image_path,
+            'video': video_name,
+            'time_seconds': float(time_in_seconds),
+            'answer': answer,
+            'file_path': file_path,
+            'timings': timings,
+        }
+
+    async def run_one(self, query):
+        async with self.semaphore:
+            logger.info(f"Running query {query['query_id']} ({query['type']}, {query['method']})")
+            entry = {'query_id': query['query_id'], 'type': query['type'], 'method': query['method']}
+            try:
+                entry.update(await self.run_query(query))
+                entry['status'] = 'done'
+            except Exception as e:
+                logger.error(f"Query {query['query_id']} failed: {e}", exc_info=True)
+                entry.update({'status': 'failed', 'error': str(e)})
+            append_manifest(entry)
+            return entry
+
+    async def run(self, queries):
+        return await asyncio.gather(*(self.run_one(query) for query in queries))
+
+
+def print_report(entries):
+    print(f"{'query':>8} {'type':>4} {'status':>7} {'seconds':>8}  video / error")
+    for entry in entries:
+        seconds = entry.get('timings', {}).get('total_seconds', 0.0)
+        detail = entry.get('video') or entry.get('error', '')
+        print(f"{entry['query_id']:>8} {entry['type']:>4} {entry['status']:>7} {seconds:>8.2f}  {detail}")
+    done = [entry for entry in entries if entry['status'] == 'done']
+    if done:
+        total = sum(entry['timings']['total_seconds'] for entry in done)
+        print(f"{len(done)}/{len(entries)} done, mean {total / len(done):.2f}s per query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of queries into submission CSVs")
+    parser.add_argument('queries', help="JSONL or CSV file of queries")
+    parser.add_argument('--provider', default='openai')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--force', action='store_true', help="rerun queries already in the manifest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    os.makedirs(SUBMISSION_DIR, exist_ok=True)
+
+    queries = read_queries(args.queries, args.top_k)
+    done = {} if args.force else read_manifest()
+    pending = [q for q in queries
+               if (q['query_id'], q['type']) not in done or not os.path.exists(submission_path(q))]
+    logger.info(f"{len(queries)} queries, {len(queries) - len(pending)} already done, {len(pending)} to run")
+
+    runner = BatchRunner(args.provider, args.concurrency)
+    entries = asyncio.run(runner.run(pending))
+    print_report(entries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# scripts/benchmark_index.py
+"""
+Compare compressed CLIP index tiers against the float32 index.
+
+Queries are database vectors with a little Gaussian noise (no CLIP model
+needed), so the float32 top-k serves as ground truth. For every built tier
+the report gives resident memory of the searchable codes, per-query latency
+(mean / p95) and recall@k against float32.
+
+    python -m scripts.benchmark_index --modes sq8 pq --queries 500 --top-k 100
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import faiss
+import numpy as np
+
+from utilities.compressed_index import (
+    FLOAT32_INDEX_PATH, RERANK_K, STORAGE_MODES, compressed_index_dir, load_compressed_index
+)
+
+logger = logging.getLogger(__name__)
+
+
+def sample_queries(index, n_queries, noise=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.sort(rng.choice(index.ntotal, size=min(n_queries, index.ntotal), replace=False))
+    queries = index.reconstruct_batch(ids) + rng.normal(scale=noise, size=(len(ids), index.d)).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def time_searches(index, queries, top_k):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, I = index.search(query[None, :], top_k)
+        latencies.append(time.perf_counter() - started)
+        results.append(I[0])
+    return np.asarray(latencies) * 1000, np.vstack(results)
+
+
+def recall_at_k(results, truth):
+    return float(np.mean([len(np.intersect1d(row, truth_row)) / len(truth_row) for row, truth_row in zip(results, truth)]))
+
+
+def benchmark(index, tiers, queries, top_k):
+    """Report rows for the float32 `index` and each (mode, compressed index) in `tiers`."""
+    latencies, truth = time_searches(index, queries, top_k)
+    rows = [{'mode': 'float32', 'memory_mib': round(index.ntotal * index.d * 4 / 2**20, 1),
+             'mean_ms': round(float(latencies.mean()), 2), 'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+             f'recall@{top_k}': 1.0}]
+    for mode, compressed in tiers:
+        latencies, results = time_searches(compressed, queries, top_k)
+        rows.append({'mode': mode, 'memory_mib': round(compressed.memory_bytes() / 2**20, 1),
+                     'mean_ms': round(float(latencies.mean()), 2), 'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+                     f'recall@{top_k}': round(recall_at_k(results, truth), 4)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory, latency and recall of compressed CLIP index tiers")
+    parser.add_argument('--index', default=FLOAT32_INDEX_PATH)
+    parser.add_argument('--modes', nargs='+', choices=STORAGE_MODES[1:], default=['fp16', 'sq8', 'pq'])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top-k', type=int, default=100)
+    parser.add_argument('--rerank-k', type=int, default=RERANK_K)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = faiss.read_index(args.index)
+    tiers = []
+    for mode in args.modes:
+        index_dir = compressed_index_dir(mode, os.path.dirname(args.index))
+        if not os.path.exists(os.path.join(index_dir, 'meta.json')):
+            logger.warning(f"Skipping {mode}: build it with python -m utilities.compressed_index --mode {mode}")
+            continue
+        tiers.append((mode, load_compressed_index(index_dir, args.rerank_k)))
+
+    for row in benchmark(index, tiers, sample_queries(index, args.queries), args.top_k):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# scripts/benchmark_text_encoder.py
+"""
+Compare the query text encoder modes (full CLIP, text tower, int8 text tower).
+
+Each mode is loaded in its own process so resident memory is not shared
+between them. The report gives RSS after loading, per-query latency
+(mean / p95) and the minimum cosine similarity of its embeddings to the
+full float32 model on the reference queries.
+
+    python -m scripts.benchmark_text_encoder --threads 4 --runs 200
+"""
+import argparse
+import gc
+import json
+import logging
+import subprocess
+import sys
+import time
+
+import clip
+import numpy as np
+import torch
+
+from utilities.text_encoder import REFERENCE_QUERIES, TEXT_ENCODER_MODES, encoder_cosines, load_text_encoder
+
+logger = logging.getLogger(__name__)
+
+
+def resident_mib():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def time_queries(encoder, device, runs):
+    latencies = []
+    with torch.no_grad():
+        for run in range(runs):
+            tokens = clip.tokenize([REFERENCE_QUERIES[run % len(REFERENCE_QUERIES)]]).to(device)
+            started = time.perf_counter()
+            encoder.encode_text(tokens)
+            latencies.append(time.perf_counter() - started)
+    return np.asarray(latencies) * 1000
+
+
+def benchmark_mode(mode, device, threads, runs, min_cosine):
+    encoder, _ = load_text_encoder(mode, device, threads, min_cosine)
+    gc.collect()
+    rss = resident_mib()
+    latencies = time_queries(encoder, device, runs)
+    reference, _ = load_text_encoder('full', device, threads)
+    return {'mode': mode, 'device': device, 'threads': torch.get_num_threads(), 'rss_mib': round(rss, 1),
+            'mean_ms': round(float(latencies.mean()), 2), 'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'min_cosine': round(float(encoder_cosines(encoder, reference, device).min()), 5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, memory and fidelity of the CLIP query text encoder modes")
+    parser.add_argument('--modes', nargs='+', choices=TEXT_ENCODER_MODES, default=list(TEXT_ENCODER_MODES))
+    parser.add_argument('--device', default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument('--threads', type=int, default=0, help="intra-op threads (0 keeps the torch default)")
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--min-cosine', type=float, default=0.99)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(args.modes) == 1:
+        print(json.dumps(benchmark_mode(args.modes[0], args.device, args.threads, args.runs, args.min_cosine)))
+        return
+    for mode in args.modes:
+        subprocess.run([sys.executable, '-m', 'scripts.benchmark_text_encoder', '--modes', mode, '--device', args.device,
+                        '--threads', str(args.threads), '--runs', str(args.runs), '--min-cosine', str(args.min_cosine)],
+                       check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# scripts/build_model_index.py
+"""
+Build the FAISS index of another CLIP model for the search ensemble.
+
+Every frame in id2img_fps is encoded with `--model` in frame id order, so
+row i of the new index is global frame id i, as in the ViT-B/16 index. The
+partial index is written after every chunk and a rerun resumes from it;
+the finished index is moved to faiss_clip_<model>.bin next to the ViT-B/16
+index. Enable it with ENSEMBLE_MODELS=ViT-B/16,<model>.
+
+    python -m scripts.build_model_index --model ViT-L/14 --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+
+import clip
+import faiss
+import torch
+
+from data_loaders.frame_table import ID2IMG_FPS_PATH
+from scripts.ingest import encode_frames, write_index
+from utilities.compressed_index import COMPRESSED_INDEX_ROOT, model_index_path
+
+logger = logging.getLogger(__name__)
+
+
+def frame_paths(id2img_fps):
+    """Image paths ordered by global frame id, which must be contiguous from 0."""
+    return [id2img_fps[str(frame_id)]['image_path'] for frame_id in range(len(id2img_fps))]
+
+
+def build_model_index(image_paths, model, preprocess, device, output_path, chunk_size=20000, batch_size=256, workers=4):
+    partial_path = f"{output_path}.partial"
+    index = faiss.read_index(partial_path) if os.path.exists(partial_path) else None
+    start = index.ntotal if index is not None else 0
+    if start:
+        logger.info(f"Resuming from {partial_path} at frame {start}")
+    for chunk_start in range(start, len(image_paths), chunk_size):
+        vectors = encode_frames(image_paths[chunk_start:chunk_start + chunk_size], model, preprocess, device, batch_size, workers)
+        if index is None:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        write_index(index, partial_path)
+        logger.info(f"Indexed {index.ntotal}/{len(image_paths)} frames")
+    os.replace(partial_path, output_path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode every indexed frame with another CLIP model for the ensemble")
+    parser.add_argument('--model', required=True, choices=clip.available_models())
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--output', help="defaults to faiss_clip_<model>.bin next to the ViT-B/16 index")
+    parser.add_argument('--chunk-size', type=int, default=20000, help="frames encoded between checkpoints")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=4, help="image decoding processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.id2img_fps, "r") as f:
+        image_paths = frame_paths(json.load(f))
+    output_path = args.output or model_index_path(args.model, COMPRESSED_INDEX_ROOT)
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model, preprocess = clip.load(args.model, device=device)
+    index = build_model_index(image_paths, model, preprocess, device, output_path, args.chunk_size, args.batch_size, args.workers)
+    logger.info(f"Wrote {index.ntotal} {args.model} vectors to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# scripts/eval_query_classifier.py
+"""
+Evaluate the local query classifier against logged LLM classifications.
+
+Every LLM classification is appended to CLASSIFICATION_LOG_PATH; this replays
+the logged queries through LocalQueryClassifier and reports how many it would
+handle at the confidence threshold (coverage) and how often those agree with
+the LLM on the temporal / question / scene-count flags.
+
+    python -m scripts.eval_query_classifier --min-confidence 0.75
+"""
+import argparse
+import json
+import logging
+
+from config import Config
+from agents.local_query_classifier import (
+    LocalQueryClassifier, read_classification_log, compare_classifications, summarize_agreement
+)
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate(entries, classifier):
+    rows, disagreements = [], []
+    for entry in entries:
+        classification, confidence = classifier.classify(entry['query'])
+        agreement = compare_classifications(classification, entry['classification'])
+        confident = classifier.is_confident(confidence)
+        rows.append((confidence, confident, agreement))
+        if confident and not all(agreement.values()):
+            disagreements.append({'query': entry['query'], 'confidence': confidence,
+                                  'mismatched': [field for field, agrees in agreement.items() if not agrees]})
+    return summarize_agreement(rows), disagreements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the local query classifier with logged LLM classifications")
+    parser.add_argument('--log', default=Config.CLASSIFICATION_LOG_PATH)
+    parser.add_argument('--min-confidence', type=float, default=Config.LOCAL_CLASSIFIER_MIN_CONFIDENCE)
+    parser.add_argument('--show-disagreements', type=int, default=10, help="number of confidently wrong queries to print")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    entries = read_classification_log(args.log, source='llm')
+    if not entries:
+        logger.error(f"No LLM classifications logged in {args.log}")
+        return
+
+    summary, disagreements = evaluate(entries, LocalQueryClassifier(min_confidence=args.min_confidence))
+    print(json.dumps(summary, indent=2))
+    for row in disagreements[:args.show_disagreements]:
+        print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+# scripts/extract_keyframes.py
+"""
+Keyframe extraction for AIC_Video in the Mid_Frames / map-keyframes layout.
+
+Every video (AIC_Video/Videos_L01/[video/]L01_V001.mp4) is one job in a
+process pool:
+
+  1. ffmpeg decodes the video downscaled to --analysis-size as raw RGB, which
+     is streamed through a ShotDetector in chunks;
+  2. the middle frame of each shot (one per --max-shot-seconds segment for
+     long shots) is written by a second ffmpeg pass to
+     Mid_Frames/L01/V001/001.jpg, 002.jpg, ...;
+  3. map-keyframes/L01_V001.csv gets the `n,pts_time,fps,frame_idx` rows.
+
+Keyframes are written to a temporary folder that replaces the final one, and
+the CSV is written last, so a video with a CSV is complete: rerunning skips
+it and an interrupted run resumes with the unfinished videos. A throughput
+report (decoded frames/s, real-time factor) is logged per video and overall.
+
+    python -m scripts.extract_keyframes --parts L25 L26 --workers 4
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fractions import Fraction
+
+import numpy as np
+
+from data_loaders.keyframe_index import MAP_KEYFRAMES_DIR
+from utilities.shot_detection import ShotDetector, shot_keyframes, HISTOGRAM_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+VIDEO_ROOT = "/content/drive/MyDrive/HCMC_AI/AIC_Video"
+FRAMES_ROOT = "/content/drive/MyDrive/HCMC_AI/data/Mid_Frames"
+ANALYSIS_SIZE = (64, 36)
+CHUNK_FRAMES = 512
+
+
+def find_videos(video_root=VIDEO_ROOT, parts=None):
+    """(video_name, path) for every .mp4 under Videos_* folders, e.g. ('L01_V001', .../L01_V001.mp4)."""
+    videos = []
+    for root, _, files in os.walk(video_root):
+        for name in files:
+            video_name, extension = os.path.splitext(name)
+            if extension.lower() != '.mp4' or '_' not in video_name:
+                continue
+            if parts and video_name.split('_')[0] not in parts:
+                continue
+            videos.append((video_name, os.path.join(root, name)))
+    return sorted(videos)
+
+
+def keyframe_paths(video_name, frames_root=FRAMES_ROOT, map_dir=MAP_KEYFRAMES_DIR):
+    """Keyframe folder and map-keyframes CSV for a video, in the layout the app reads."""
+    data_part, video_id = video_name.split('_', 1)
+    return os.path.join(frames_root, data_part, video_id), os.path.join(map_dir, f"{video_name}.csv")
+
+
+def probe_fps(video_path):
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=avg_frame_rate",
+         "-of", "default=noprint_wrappers=1:nokey=1", video_path],
+        check=True, capture_output=True, text=True
+    ).stdout.strip()
+    return float(Fraction(output))
+
+
+def detect_shots(video_path, detector, size=ANALYSIS_SIZE, threads=1):
+    """Stream downscaled frames from ffmpeg into `detector`; returns the number of decoded frames."""
+    width, height = size
+    frame_bytes = width * height * 3
+    command = ["ffmpeg", "-v", "error", "-threads", str(threads), "-i", video_path,
+               "-vf", f"scale={width}:{height}", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        while True:
+            data = process.stdout.read(frame_bytes * CHUNK_FRAMES)
+            if not data:
+                break
+            n_frames = len(data) // frame_bytes
+            detector.update(np.frombuffer(data[:n_frames * frame_bytes], dtype=np.uint8).reshape(n_frames, height, width, 3))
+        stderr = process.stderr.read().decode('utf-8', errors='replace')
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {video_path}: {stderr}")
+    return detector.n_frames
+
+
+def write_keyframes(video_path, frame_indices, output_dir, threads=1):
+    """Write the frames at `frame_indices` as 001.jpg, 002.jpg, ... into `output_dir`."""
+    os.makedirs(output_dir, exist_ok=True)
+    select = '+'.join(f"eq(n\\,{index})" for index in frame_indices)
+    command = ["ffmpeg", "-v", "error", "-y", "-threads", str(threads), "-i", video_path,
+               "-vf", f"select='{select}'", "-vsync", "0", "-q:v", "2", os.path.join(output_dir, "%03d.jpg")]
+    subprocess.run(command, check=True, capture_output=True, text=True)
+
+
+def write_map_csv(csv_path, frame_indices, fps):
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(['n', 'pts_time', 'fps', 'frame_idx'])
+        for n, frame_idx in enumerate(frame_indices, start=1):
+            writer.writerow([n, round(frame_idx / fps, 3), fps, frame_idx])
+    os.replace(tmp_path, csv_path)
+
+
+def extract_video(video_name, video_path, frames_root, map_dir, histogram_threshold, min_shot_seconds, max_shot_seconds, threads):
+    """One resumable job: detect shots, write keyframes, then the CSV. Returns throughput stats."""
+    started = time.perf_counter()
+    keyframe_dir, csv_path = keyframe_paths(video_name, frames_root, map_dir)
+    fps = probe_fps(video_path)
+
+    detector = ShotDetector(histogram_threshold=histogram_threshold)
+    n_frames = detect_shots(video_path, detector, threads=threads)
+    decode_seconds = time.perf_counter() - started
+    shot_starts = detector.boundaries(min_shot_frames=max(1, int(min_shot_seconds * fps)))
+    frame_indices = shot_keyframes(shot_starts, n_frames, max_shot_frames=int(max_shot_seconds * fps) or None)
+
+    tmp_dir = f"{keyframe_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    write_keyframes(video_path, frame_indices, tmp_dir, threads)
+    written = len([name for name in os.listdir(tmp_dir) if name.endswith('.jpg')])
+    if written != len(frame_indices):
+        raise RuntimeError(f"Expected {len(frame_indices)} keyframes for {video_name}, ffmpeg wrote {written}")
+    shutil.rmtree(keyframe_dir, ignore_errors=True)
+    os.replace(tmp_dir, keyframe_dir)
+    os.makedirs(map_dir, exist_ok=True)
+    write_map_csv(csv_path, frame_indices, fps)
+
+    seconds = time.perf_counter() - started
+    return {
+        'video': video_name,
+        'frames': n_frames,
+        'shots': len(shot_starts),
+        'keyframes': len(frame_indices),
+        'video_seconds': round(n_frames / fps, 1),
+        'seconds': round(seconds, 2),
+        'decode_fps': round(n_frames / decode_seconds, 1) if decode_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract shot keyframes and map-keyframes CSVs from AIC_Video")
+    parser.add_argument('--video-root', default=VIDEO_ROOT)
+    parser.add_argument('--frames-root', default=FRAMES_ROOT)
+    parser.add_argument('--map-dir', default=MAP_KEYFRAMES_DIR)
+    parser.add_argument('--parts', nargs='*', help="only these data parts, e.g. L25 L26")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--ffmpeg-threads', type=int, default=1, help="decoder threads per video job")
+    parser.add_argument('--threshold', type=float, default=HISTOGRAM_THRESHOLD, help="histogram distance of a cut")
+    parser.add_argument('--min-shot-seconds', type=float, default=0.5)
+    parser.add_argument('--max-shot-seconds', type=float, default=10.0, help="long shots get a keyframe per segment")
+    parser.add_argument('--force', action='store_true', help="re-extract videos that already have a CSV")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    videos = find_videos(args.video_root, args.parts)
+    pending = [(name, path) for name, path in videos
+               if args.force or not os.path.exists(keyframe_paths(name, args.frames_root, args.map_dir)[1])]
+    logger.info(f"{len(pending)} of {len(videos)} videos to extract with {args.workers} workers")
+
+    started = time.perf_counter()
+    reports, failed = [], []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(extract_video, name, path, args.frames_root, args.map_dir, args.threshold,
+                            args.min_shot_seconds, args.max_shot_seconds, args.ffmpeg_threads): name
+            for name, path in pending
+        }
+        for future in as_completed(futures):
+            try:
+                report = future.result()
+            except Exception as e:
+                logger.error(f"Failed to extract {futures[future]}: {e}")
+                failed.append(futures[future])
+                continue
+            reports.append(report)
+            logger.info(json.dumps(report))
+
+    elapsed = time.perf_counter() - started
+    frames = sum(report['frames'] for report in reports)
+    video_seconds = sum(report['video_seconds'] for report in reports)
+    logger.info(
+        f"Extracted {len(reports)} videos ({len(failed)} failed): {sum(report['keyframes'] for report in reports)} keyframes, "
+        f"{frames / elapsed if elapsed else 0:.0f} frames/s, {video_seconds / elapsed if elapsed else 0:.1f}x real time"
+    )
+
+
+if __name__ == '__main__':
+    main()
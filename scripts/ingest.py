@@ -0,0 +1,317 @@
+# scripts/ingest.py
+"""
+Incremental ingestion of new keyframe batches.
+
+Takes one or more keyframe folders (a data part like Mid_Frames/L25 holding
+video folders, or a single video folder), encodes every frame not yet in
+id2img_fps with the same CLIP ViT-B/16 model, and appends the vectors to the
+FAISS index. New frames get the next global frame ids, so existing ids and
+every derived structure stay valid; the frame table, metadata store, bitmap
+index, OCR index and keyframe index are then extended or rebuilt (each only if
+it already exists), as are any compressed index tiers, the shards of the data
+parts that received frames and the indexes of --ensemble-models, all written
+with tmp + replace.
+
+Each run is recorded in data/ingest_manifest.jsonl. Frames already in
+id2img_fps (same directory and keyframe number) are skipped, so rerunning the
+same command is a no-op, and a run that crashed between writing the index and
+id2img_fps is repaired by trimming the unreferenced vectors. The derived
+structures (by the frame count each records) and the --ensemble-models
+indexes are reconciled against id2img_fps on every run, so one that missed a
+batch after a crash catches up on the next run.
+
+    python -m scripts.ingest /content/drive/MyDrive/HCMC_AI/data/Mid_Frames/L25 --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import clip
+import faiss
+import numpy as np
+import torch
+from PIL import Image
+
+from data_loaders.frame_table import FrameTable, FRAME_TABLE_PATH, ID2IMG_FPS_PATH
+from data_loaders.metadata_store import MetadataStore, METADATA_STORE_DIR
+from data_loaders.bitmap_index import BitmapIndex, BITMAP_INDEX_DIR
+from data_loaders.ocr_index import OcrIndex, OCR_INDEX_PATH
+from data_loaders.keyframe_index import KeyframeIndex, KEYFRAME_INDEX_PATH, MAP_KEYFRAMES_DIR
+from utilities.compressed_index import (
+    FLOAT32_INDEX_PATH, STORAGE_MODES, compressed_index_dir, model_index_path, rebuild_compressed_index
+)
+from utilities.sharded_index import SHARDED_INDEX_DIR, build_sharded_index, data_part_of_dir
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = "/content/drive/MyDrive/HCMC_AI/data/ingest_manifest.jsonl"
+CLIP_MODEL_NAME = "ViT-B/16"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class FrameDataset(torch.utils.data.Dataset):
+    """Decodes and preprocesses keyframes in DataLoader worker processes."""
+
+    def __init__(self, image_paths, preprocess):
+        self.image_paths = image_paths
+        self.preprocess = preprocess
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, i):
+        with Image.open(self.image_paths[i]) as image:
+            return self.preprocess(image.convert('RGB'))
+
+
+def find_frames(folders):
+    """Keyframe paths under `folders`, sorted by directory then keyframe number."""
+    frames = []
+    for folder in folders:
+        for root, _, files in os.walk(os.path.abspath(folder)):
+            for name in files:
+                stem, extension = os.path.splitext(name)
+                if extension.lower() in IMAGE_EXTENSIONS and stem.isdigit():
+                    frames.append((root, int(stem), os.path.join(root, name)))
+    frames.sort()
+    return [path for _, _, path in frames]
+
+
+def new_frames(image_paths, id2img_fps):
+    """`image_paths` whose (directory, keyframe number) is not in id2img_fps, so '7.jpg' matches a known '007.jpg'."""
+    known = FrameTable.from_id2img_fps({
+        key: {'image_path': os.path.abspath(info['image_path'])}
+        for key, info in id2img_fps.items() if isinstance(info, dict) and info.get('image_path')
+    })
+    frame_ids = known.ids_of([os.path.abspath(path) for path in image_paths])
+    return [path for path, frame_id in zip(image_paths, frame_ids) if frame_id < 0]
+
+
+def next_frame_id(id2img_fps):
+    return max((int(key) for key in id2img_fps), default=-1) + 1
+
+
+def reconcile_index(index, next_id):
+    """Trim vectors left past `next_id` by a run that crashed before updating id2img_fps."""
+    if index.ntotal == next_id:
+        return
+    if index.ntotal < next_id:
+        raise RuntimeError(f"FAISS index has {index.ntotal} vectors but id2img_fps references {next_id} frame ids")
+    logger.warning(f"Removing {index.ntotal - next_id} vectors without id2img_fps entries (interrupted ingestion)")
+    index.remove_ids(faiss.IDSelectorRange(next_id, index.ntotal))
+
+
+def encode_frames(image_paths, model, preprocess, device, batch_size=256, workers=4):
+    """L2-normalized float32 CLIP image embeddings for `image_paths`, in order."""
+    loader = torch.utils.data.DataLoader(
+        FrameDataset(image_paths, preprocess), batch_size=batch_size, num_workers=workers, pin_memory=device == 'cuda'
+    )
+    batches = []
+    started = time.perf_counter()
+    with torch.no_grad():
+        for images in loader:
+            features = model.encode_image(images.to(device)).float()
+            features /= features.norm(dim=-1, keepdim=True)
+            batches.append(features.cpu().numpy())
+            done = sum(len(batch) for batch in batches)
+            logger.info(f"Encoded {done}/{len(image_paths)} frames ({done / (time.perf_counter() - started):.1f} frames/s)")
+    return np.concatenate(batches).astype(np.float32) if batches else np.zeros((0, 0), dtype=np.float32)
+
+
+def write_index(index, path):
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_id2img_fps(id2img_fps, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(id2img_fps, f)
+    os.replace(tmp_path, path)
+
+
+def append_manifest(entry, path=MANIFEST_PATH):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def commit_frames(index, id2img_fps, image_paths, vectors, index_path, id2img_fps_path):
+    """Append `vectors` as the next frame ids, writing the index before the id map that references it."""
+    first_id = next_frame_id(id2img_fps)
+    reconcile_index(index, first_id)
+    index.add(vectors)
+    for offset, path in enumerate(image_paths):
+        id2img_fps[str(first_id + offset)] = {'image_path': path}
+    write_index(index, index_path)
+    write_id2img_fps(id2img_fps, id2img_fps_path)
+    return first_id
+
+
+def frames_missing_from(index, id2img_fps):
+    """Paths of the frame ids `index` lacks, after trimming vectors past the last id2img_fps entry."""
+    next_id = next_frame_id(id2img_fps)
+    if index.ntotal > next_id:
+        reconcile_index(index, next_id)
+    return [id2img_fps[str(frame_id)]['image_path'] for frame_id in range(index.ntotal, next_id)]
+
+
+def sync_model_indexes(model_names, id2img_fps, device, args):
+    """
+    Bring the already-built indexes of other (ensemble) CLIP models up to
+    id2img_fps. Runs on every ingestion, so an index left behind by a failed
+    run catches up even when there are no new frames.
+    """
+    for model_name in model_names:
+        index_path = model_index_path(model_name, os.path.dirname(args.index))
+        if not os.path.exists(index_path):
+            continue
+        index = faiss.read_index(index_path)
+        ntotal = index.ntotal
+        image_paths = frames_missing_from(index, id2img_fps)
+        if image_paths:
+            model, preprocess = clip.load(model_name, device=device)
+            index.add(encode_frames(image_paths, model, preprocess, device, args.batch_size, args.workers))
+        if index.ntotal != ntotal:
+            write_index(index, index_path)
+            logger.info(f"Synced the {model_name} index: {ntotal} -> {index.ntotal} frames")
+
+
+def covered_frames(args):
+    """Number of frames each already-built derived structure covers, by name."""
+    # The frame table is always maintained, the other structures only once built
+    covered = {'frame_table': len(FrameTable.load(args.frame_table)) if os.path.exists(args.frame_table) else 0}
+    for mode in STORAGE_MODES[1:]:
+        meta_path = os.path.join(compressed_index_dir(mode, os.path.dirname(args.index)), 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                covered[mode] = json.load(f)['ntotal']
+    if os.path.exists(os.path.join(args.sharded_index, 'meta.json')):
+        with open(os.path.join(args.sharded_index, 'meta.json'), "r") as f:
+            covered['sharded_index'] = json.load(f)['ntotal']
+    if os.path.exists(os.path.join(args.metadata_store, 'vocab.json')):
+        covered['metadata_store'] = len(MetadataStore.load(args.metadata_store))
+    if os.path.exists(os.path.join(args.bitmap_index, 'vocab.json')):
+        with open(os.path.join(args.bitmap_index, 'vocab.json'), "r") as f:
+            covered['bitmap_index'] = json.load(f)['size']
+    if os.path.exists(args.ocr_index):
+        with np.load(args.ocr_index, allow_pickle=False) as data:
+            covered['ocr_index'] = len(data['doc_lengths'])
+    return covered
+
+
+def keyframe_index_stale(args):
+    """Whether the keyframe index is older than a map-keyframes CSV (it does not depend on frame ids)."""
+    if not os.path.exists(args.keyframe_index) or not os.path.isdir(args.map_dir):
+        return False
+    built = os.path.getmtime(args.keyframe_index)
+    return any(os.path.getmtime(os.path.join(args.map_dir, name)) > built
+               for name in os.listdir(args.map_dir) if name.endswith('.csv'))
+
+
+def update_derived_stores(id2img_fps, args, index=None):
+    """
+    Extend or rebuild every already-built derived structure that covers fewer
+    frames than id2img_fps. Runs on every ingestion, so structures left
+    behind by a run that crashed after writing id2img_fps are repaired even
+    when there are no new frames; up-to-date structures are left alone.
+    """
+    size = next_frame_id(id2img_fps)
+    covered = covered_frames(args)
+    stale = {name for name, count in covered.items() if count < size}
+    if not stale and not keyframe_index_stale(args):
+        return
+    logger.info(f"Updating derived structures behind id2img_fps ({size} frames): {', '.join(sorted(stale)) or 'keyframe_index'}")
+
+    frame_table = FrameTable.from_id2img_fps(id2img_fps)
+    if 'frame_table' in stale:
+        frame_table.save(args.frame_table)
+        logger.info(f"Frame table now covers {len(frame_table)} frames")
+
+    if index is None and stale & {*STORAGE_MODES[1:], 'sharded_index'}:
+        index = faiss.read_index(args.index)
+        reconcile_index(index, size)
+    for mode in STORAGE_MODES[1:]:
+        if mode in stale:
+            rebuild_compressed_index(index, compressed_index_dir(mode, os.path.dirname(args.index)))
+            logger.info(f"Rebuilt the {mode} index tier")
+
+    if 'sharded_index' in stale:
+        # Only the shards of data parts with frames past the shards' end change
+        dir_codes = np.unique(frame_table.dir_codes[covered['sharded_index']:])
+        build_sharded_index(index, frame_table, args.sharded_index,
+                            parts={data_part_of_dir(frame_table.dirs[code]) for code in dir_codes[dir_codes >= 0]})
+
+    if 'metadata_store' in covered and stale & {'metadata_store', 'bitmap_index', 'ocr_index'}:
+        store = MetadataStore.load(args.metadata_store, mmap=False)
+        if 'metadata_store' in stale:
+            store = store.extend(frame_table)
+            store.save(args.metadata_store)
+            logger.info(f"Metadata store now covers {len(store)} frames")
+        if 'bitmap_index' in stale:
+            BitmapIndex.build(store).save(args.bitmap_index)
+        if 'ocr_index' in stale:
+            OcrIndex.from_store(store).save(args.ocr_index)
+
+    if os.path.exists(args.keyframe_index):
+        KeyframeIndex.build(args.map_dir).save(args.keyframe_index)
+
+
+def ingest_frames(image_paths, id2img_fps, device, args):
+    model, preprocess = clip.load(CLIP_MODEL_NAME, device=device)
+    started = time.perf_counter()
+    vectors = encode_frames(image_paths, model, preprocess, device, args.batch_size, args.workers)
+    encode_seconds = time.perf_counter() - started
+
+    index = faiss.read_index(args.index)
+    first_id = commit_frames(index, id2img_fps, image_paths, vectors, args.index, args.id2img_fps)
+    append_manifest({
+        'timestamp': time.time(),
+        'folders': args.folders,
+        'model': CLIP_MODEL_NAME,
+        'first_id': first_id,
+        'count': len(image_paths),
+        'encode_seconds': round(encode_seconds, 1),
+    }, args.manifest)
+    logger.info(f"Appended frames {first_id}..{first_id + len(image_paths) - 1} to {args.index}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode new keyframe folders and append them to the search index")
+    parser.add_argument('folders', nargs='+', help="data part or video folders of keyframes")
+    parser.add_argument('--index', default=FLOAT32_INDEX_PATH)
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--frame-table', default=FRAME_TABLE_PATH)
+    parser.add_argument('--sharded-index', default=SHARDED_INDEX_DIR)
+    parser.add_argument('--metadata-store', default=METADATA_STORE_DIR)
+    parser.add_argument('--bitmap-index', default=BITMAP_INDEX_DIR)
+    parser.add_argument('--ocr-index', default=OCR_INDEX_PATH)
+    parser.add_argument('--keyframe-index', default=KEYFRAME_INDEX_PATH)
+    parser.add_argument('--map-dir', default=MAP_KEYFRAMES_DIR)
+    parser.add_argument('--ensemble-models', nargs='*', default=[], help="other CLIP models whose indexes to extend too")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=4, help="image decoding processes")
+    parser.add_argument('--dry-run', action='store_true', help="only report which frames would be ingested")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.id2img_fps, "r") as f:
+        id2img_fps = json.load(f)
+
+    image_paths = new_frames(find_frames(args.folders), id2img_fps)
+    logger.info(f"{len(image_paths)} new frames in {', '.join(args.folders)}")
+    if args.dry_run:
+        return
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    index = ingest_frames(image_paths, id2img_fps, device, args) if image_paths else None
+    update_derived_stores(id2img_fps, args, index)
+    sync_model_indexes([name for name in args.ensemble_models if name != CLIP_MODEL_NAME], id2img_fps, device, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# server/client.py
+import httpx
+
+
+class SearchClient:
+    """Thin synchronous client used by the Streamlit app to talk to the search server."""
+
+    def __init__(self, base_url, timeout=300.0):
+        self.base_url = base_url.rstrip('/')
+        self.client = httpx.Client(base_url=self.base_url, timeout=timeout)
+
+    def _post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def health(self):
+        response = self.client.get('/health')
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, search_method, text_query, top_k, deleted_images=(), filters=None):
+        payload = {
+            'search_method': search_method,
+            'text_query': text_query,
+            'top_k': top_k,
+            'deleted_images': list(deleted_images),
+            'filters': filters
+        }
+        return self._post('/search', payload)['image_paths']
+
+    def classify(self, query, provider='openai'):
+        return self._post('/classify', {'query': query, 'provider': provider})['classification']
+
+    def agent_search(self, query, top_k, provider='openai', classification=None):
+        """Run the full agent pipeline remotely. Returns (results, run_summary)."""
+        payload = {
+            'query': query,
+            'top_k': top_k,
+            'provider': provider,
+            'classification': classification
+        }
+        response = self._post('/agent', payload)
+        return response['results'], response['summary']
@@ -0,0 +1,91 @@
+# server/load_test.py
+"""
+Local load test for the search server.
+
+Fires `--requests` search calls at `--concurrency` in flight and reports
+throughput (queries per second) and latency percentiles.
+
+    python -m server.load_test --url http://localhost:8080 --concurrency 16 --requests 500
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+import aiohttp
+
+DEFAULT_QUERIES = [
+    "a man in a red shirt riding a motorbike",
+    "a news anchor in a studio",
+    "fireworks over a river at night",
+    "a crowd of people at a football match",
+    "a woman cooking in a kitchen",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+async def run_load_test(url, concurrency, total_requests, search_method, top_k, queries):
+    latencies = []
+    errors = 0
+    query_cycle = itertools.cycle(queries)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def one_request(query):
+            nonlocal errors
+            payload = {'search_method': search_method, 'text_query': query, 'top_k': top_k}
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(f"{url.rstrip('/')}/search", json=payload) as resp:
+                        await resp.read()
+                        if resp.status != 200:
+                            errors += 1
+                            return
+                except aiohttp.ClientError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request(next(query_cycle)) for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'errors': errors,
+        'elapsed_seconds': elapsed,
+        'qps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the search server")
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--search-method', default='CLIP')
+    parser.add_argument('--top-k', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'qps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for concurrency in args.concurrency:
+        stats = asyncio.run(run_load_test(args.url, concurrency, args.requests,
+                                          args.search_method, args.top_k, DEFAULT_QUERIES))
+        print(f"{stats['concurrency']:>11} {stats['qps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
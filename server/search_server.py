@@ -0,0 +1,119 @@
+# server/search_server.py
+"""
+Async HTTP backend for search and agent runs.
+
+The CLIP model, FAISS index and id2img_fps table are loaded once at startup and
+shared by every request. CPU-bound search runs on a bounded thread pool so the
+event loop keeps serving other users while an agent run waits on the LLM.
+
+Run with:
+    python -m server.search_server
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from config import Config
+from llm_connectors.llm_connector import LLMConnector
+from services.agent_search_service import AgentSearchService
+from services.search_service import perform_search
+from agents.agent_orchestrator import AgentOrchestrator, create_local_classifier
+from agents.run_budget import RunBudget
+from utilities.model_utils import load_model, load_faiss_index, load_id2img_fps
+
+logger = logging.getLogger(__name__)
+
+routes = web.RouteTableDef()
+
+
+async def load_resources(app):
+    logger.info("Loading CLIP model, FAISS index and id2img_fps")
+    app['executor'] = ThreadPoolExecutor(max_workers=Config.SEARCH_SERVER_WORKERS)
+    loop = asyncio.get_running_loop()
+    app['model'], app['preprocess'] = await loop.run_in_executor(app['executor'], load_model)
+    app['index'] = await loop.run_in_executor(app['executor'], load_faiss_index)
+    app['id2img_fps'] = await loop.run_in_executor(app['executor'], load_id2img_fps)
+    app['agent_search_service'] = AgentSearchService(app['model'], app['index'], app['id2img_fps'])
+    # One local classifier for every request, so logged examples are encoded once per process
+    app['local_classifier'] = create_local_classifier(app['model'])
+    logger.info("Search resources loaded")
+
+
+async def release_resources(app):
+    app['executor'].shutdown(wait=False)
+
+
+def get_orchestrator(app, provider_name):
+    llm_connector = LLMConnector(provider_name=provider_name, api_key=Config.get_api_key(provider_name))
+    return AgentOrchestrator(llm_connector, app['agent_search_service'], app['local_classifier'])
+
+
+@routes.get('/health')
+async def health(request):
+    return web.json_response({'status': 'ok'})
+
+
+@routes.post('/search')
+async def search(request):
+    body = await request.json()
+    app = request.app
+    try:
+        image_paths = await asyncio.get_running_loop().run_in_executor(
+            app['executor'],
+            lambda: perform_search(
+                search_method=body['search_method'],
+                model=app['model'],
+                index=app['index'],
+                text_query=body['text_query'],
+                top_k=int(body.get('top_k', 10)),
+                deleted_images=set(body.get('deleted_images', [])),
+                id2img_fps=app['id2img_fps'],
+                filters=body.get('filters')
+            )
+        )
+    except (KeyError, ValueError) as e:
+        raise web.HTTPBadRequest(text=str(e))
+    return web.json_response({'image_paths': image_paths})
+
+
+@routes.post('/classify')
+async def classify(request):
+    body = await request.json()
+    try:
+        query = body['query']
+        orchestrator = get_orchestrator(request.app, body.get('provider', 'openai'))
+    except (KeyError, ValueError) as e:
+        raise web.HTTPBadRequest(text=str(e))
+    classification = await orchestrator.query_classifier.classify_query(query)
+    return web.json_response({'classification': classification})
+
+
+@routes.post('/agent')
+async def agent(request):
+    body = await request.json()
+    try:
+        query, top_k = body['query'], int(body.get('top_k', 10))
+        orchestrator = get_orchestrator(request.app, body.get('provider', 'openai'))
+    except (KeyError, ValueError) as e:
+        raise web.HTTPBadRequest(text=str(e))
+    budget = RunBudget.from_config()
+    try:
+        results = await orchestrator.process_query(query, top_k, body.get('classification'), budget)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    return web.json_response({'results': results, 'summary': budget.summary()})
+
+
+def create_app():
+    app = web.Application()
+    app.add_routes(routes)
+    app.on_startup.append(load_resources)
+    app.on_cleanup.append(release_resources)
+    return app
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    web.run_app(create_app(), host=Config.SEARCH_SERVER_HOST, port=Config.SEARCH_SERVER_PORT)
@@ -2,30 +2,62 @@
 
 import asyncio
 import os
-from utilities.model_utils import search_image_by_text, search_image_by_text_with_captioning, get_image_paths, search_images_by_ocr
-from data_loaders.metadata_loader import load_ocr_data, load_object_data, load_object_count_data
-from utilities.video_utils import get_temporal_frames
+from utilities.model_utils import search_image_by_text, search_image_by_text_with_captioning, get_image_paths, search_images_by_ocr, search_images_by_ocr_ranked
+from utilities.rank_fusion import reciprocal_rank_fusion
+from data_loaders.metadata_loader import load_metadata_batch
+from utilities.video_utils import get_temporal_frames, get_temporal_frames_batch
+from services.search_filters import compile_search_filter
 
 class AgentSearchService:
-    def __init__(self, model, index, id2img_fps):
+    def __init__(self, model, index, id2img_fps, ensemble=None, ensemble_models=None):
         self.model = model
         self.index = index
         self.id2img_fps = id2img_fps
+        # With an EnsembleSearchService, CLIP search fuses `ensemble_models` (all by default)
+        self.ensemble = ensemble
+        self.ensemble_models = ensemble_models
 
-    async def agent_search(self, clip_prompt, caption_prompt, top_k):
+    async def agent_search(self, clip_prompt, caption_prompt, top_k, ocr_query=None):
         clip_results = await self.clip_search(clip_prompt, top_k)
         caption_results = await self.caption_search(caption_prompt, top_k)
+        if not ocr_query:
+            return self.combine_results(clip_results, caption_results)
 
-        combined_results = self.combine_results(clip_results, caption_results)
-        return combined_results
+        # With text to look for, rank-fuse OCR hits in with the visual results
+        ocr_results = await self.ocr_search(ocr_query, top_k)
+        return reciprocal_rank_fusion([clip_results, caption_results, ocr_results])[:top_k]
 
-    async def clip_search(self, prompt, top_k):
-        image_indices, distances = search_image_by_text(self.model, self.index, prompt, top_k)
+    async def query_search(self, query, top_k, captions=True):
+        """
+        CLIP, caption and (if the index is built) ranked OCR search on one
+        free-text query, rank-fused. Caption search costs an embedding API
+        call; `captions=False` leaves it out.
+        """
+        clip_results, caption_results, ocr_ranked = await asyncio.gather(
+            self.clip_search(query, top_k),
+            self.caption_search(query, top_k) if captions else asyncio.sleep(0, result=[]),
+            asyncio.to_thread(search_images_by_ocr_ranked, query, top_k)
+        )
+        ranked_lists = [clip_results, caption_results]
+        if ocr_ranked:
+            ranked_lists.append([{'image_path': path, 'ocr_score': score} for path, score in ocr_ranked])
+        return reciprocal_rank_fusion(ranked_lists)[:top_k]
+
+    async def multi_query_search(self, queries, top_k, captions=True):
+        """`query_search` results for each of `queries`, searched concurrently."""
+        return await asyncio.gather(*(self.query_search(query, top_k, captions) for query in queries))
+
+    async def clip_search(self, prompt, top_k, filters=None):
+        # Encoding and FAISS search are CPU-bound, keep them off the event loop
+        candidate_ids = await asyncio.to_thread(compile_search_filter, filters)
+        if self.ensemble is not None:
+            return await asyncio.to_thread(self.ensemble.search, prompt, top_k, self.ensemble_models, candidate_ids)
+        image_indices, distances = await asyncio.to_thread(search_image_by_text, self.model, self.index, prompt, top_k, candidate_ids)
         image_paths = get_image_paths(image_indices, self.id2img_fps)
-        return [{'image_path': path, 'distance': dist} for path, dist in zip(image_paths, distances[0])]
+        return [{'image_path': path, 'distance': float(dist)} for path, dist in zip(image_paths, distances[0])]
 
     async def caption_search(self, prompt, top_k):
-        image_paths = search_image_by_text_with_captioning(prompt, top_k)
+        image_paths = await asyncio.to_thread(search_image_by_text_with_captioning, prompt, top_k)
         return [{'image_path': path} for path in image_paths]
 
     def combine_results(self, clip_results, caption_results):
@@ -41,20 +73,16 @@ class AgentSearchService:
         surrounding_frames = get_temporal_frames(image_path, min_distance=1, temporal_range=num_frames)
         return [{'image_path': frame} for frame in surrounding_frames]
 
+    async def get_next_frames_batch(self, image_paths, num_frames):
+        surrounding_frames = get_temporal_frames_batch(image_paths, min_distance=1, temporal_range=num_frames)
+        return [[{'image_path': frame} for frame in frames] for frames in surrounding_frames]
+
     async def ocr_search(self, text_query, top_p):
-        image_paths = search_images_by_ocr(text_query, top_p)
+        ranked = await asyncio.to_thread(search_images_by_ocr_ranked, text_query, top_p)
+        if ranked is not None:
+            return [{'image_path': path, 'ocr_score': score} for path, score in ranked]
+        image_paths = await asyncio.to_thread(search_images_by_ocr, text_query, top_p)
         return [{'image_path': path} for path in image_paths]
 
     async def load_metadata(self, image_paths):
-        ocr_data, _ = load_ocr_data(image_paths)
-        object_data, _ = load_object_data(image_paths)
-        count_data, _ = load_object_count_data(image_paths)
-
-        metadata = {}
-        for path in image_paths:
-            metadata[path] = {
-                'ocr': ocr_data.get(path, []),
-                'objects': object_data.get(path, []),
-                'counts': count_data.get(path, [])
-            }
-        return metadata
+        return await asyncio.to_thread(load_metadata_batch, image_paths)
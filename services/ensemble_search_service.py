@@ -0,0 +1,86 @@
+# services/ensemble_search_service.py
+"""
+CLIP search over several CLIP-family indexes at once.
+
+Each member pairs a query text encoder with the FAISS index of the same
+model (e.g. ViT-B/16 and ViT-L/14); every index row is the same global frame
+id. A query is encoded and searched by all selected members concurrently
+(torch and FAISS release the GIL) and the per-model rankings are fused with
+reciprocal rank fusion, so frames that several embedding spaces agree on
+come first. The latency of each member's encode + search is kept for the
+last LATENCY_WINDOW queries.
+
+Build the index of another model with:
+    python -m scripts.build_model_index --model ViT-L/14
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utilities.model_utils import search_image_by_text
+from utilities.rank_fusion import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+
+
+class EnsembleSearchService:
+    def __init__(self, members, id2img_fps, weights=None):
+        """`members` maps model name -> (text encoder, FAISS index); `weights` optionally maps model name -> RRF weight."""
+        self.members = dict(members)
+        self.id2img_fps = id2img_fps
+        self.weights = weights or {}
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.members), 1), thread_name_prefix="ensemble")
+        self.latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in self.members}
+        self.lock = threading.Lock()
+
+    @property
+    def model_names(self):
+        return list(self.members)
+
+    def _search_member(self, name, text_query, top_k, candidate_ids):
+        encoder, index = self.members[name]
+        started = time.perf_counter()
+        image_indices, distances = search_image_by_text(encoder, index, text_query, top_k, candidate_ids)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[name].append(elapsed)
+        logger.debug(f"{name} search took {elapsed * 1000:.1f} ms")
+
+        results = []
+        for frame_id, distance in zip(image_indices[0], distances[0]):
+            image_info = self.id2img_fps.get(str(frame_id)) if frame_id >= 0 else None
+            if image_info and image_info.get('image_path'):
+                results.append({'image_path': image_info['image_path'], f'distance_{name}': float(distance)})
+        return results
+
+    def search(self, text_query, top_k, models=None, candidate_ids=None):
+        """Fused top_k result dicts over `models` (all members by default)."""
+        names = [name for name in (models or self.members) if name in self.members]
+        if not names:
+            raise ValueError(f"No ensemble model selected (available: {', '.join(self.model_names)})")
+        futures = [self.executor.submit(self._search_member, name, text_query, top_k, candidate_ids) for name in names]
+        ranked_lists = [future.result() for future in futures]
+        if len(ranked_lists) == 1:
+            return ranked_lists[0][:top_k]
+        return reciprocal_rank_fusion(ranked_lists, weights=[self.weights.get(name, 1.0) for name in names])[:top_k]
+
+    def search_paths(self, text_query, top_k, models=None, candidate_ids=None):
+        return [result['image_path'] for result in self.search(text_query, top_k, models, candidate_ids)]
+
+    def latency_summary(self):
+        """Per-model {'searches', 'mean_ms', 'p95_ms'} over the recent window."""
+        summary = {}
+        with self.lock:
+            latencies = {name: list(window) for name, window in self.latencies.items()}
+        for name, window in latencies.items():
+            if window:
+                milliseconds = np.asarray(window) * 1000
+                summary[name] = {'searches': len(milliseconds), 'mean_ms': round(float(milliseconds.mean()), 2),
+                                 'p95_ms': round(float(np.percentile(milliseconds, 95)), 2)}
+        return summary
@@ -3,6 +3,7 @@ from data_loaders.metadata_loader import (
     load_ocr_data,
     load_object_data,
     load_object_count_data,
+    filter_images_by_metadata,
 )
 
 def apply_metadata_filters(image_paths, ocr_keywords, object_names, object_counts):
@@ -32,10 +33,6 @@ def apply_metadata_filters(image_paths, ocr_keywords, object_names, object_count
 
     # Apply object name and count filters
     if object_names or object_counts:
-        image_paths = [
-            path for path in image_paths
-            if (all(obj in object_data.get(path, []) for obj in object_names) and
-                all(cnt in count_data.get(path, []) for cnt in object_counts))
-        ]
+        image_paths = filter_images_by_metadata(image_paths, object_data, count_data, object_names, object_counts)
 
     return image_paths, available_ocr_keywords, available_objects, available_object_counts
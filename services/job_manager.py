@@ -0,0 +1,129 @@
+# services/job_manager.py
+import asyncio
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class Job:
+    def __init__(self, job_id, description, key=None):
+        self.id = job_id
+        self.description = description
+        self.key = key
+        self.status = PENDING
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def report_progress(self, stage, message=''):
+        self.events.append({'time': time.time(), 'stage': stage, 'message': message})
+
+    def latest_event(self):
+        return self.events[-1] if self.events else None
+
+
+class JobManager:
+    """
+    Runs agent searches as background jobs on one persistent event loop thread.
+
+    A job is submitted as a coroutine factory taking a `progress(stage, message)`
+    callback. Jobs outlive Streamlit reruns: the UI keeps only the job id and
+    reattaches to the stored result. Cancelling a job cancels its asyncio task,
+    which aborts any in-flight LLM request.
+    """
+
+    def __init__(self, max_jobs=50):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="agent-job-loop", daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro_factory, description='', key=None):
+        """Start a job and return its id. `coro_factory(progress)` must return a coroutine."""
+        job = Job(uuid.uuid4().hex[:12], description, key)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job, coro_factory), self.loop)
+        logger.info(f"Submitted job {job.id}: {description}")
+        return job.id
+
+    async def _run(self, job, coro_factory):
+        job.status = RUNNING
+        job.report_progress('started')
+        try:
+            job.result = await coro_factory(job.report_progress)
+            job.status = DONE
+            job.report_progress('done')
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            job.report_progress('cancelled')
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}", exc_info=True)
+            job.status = FAILED
+            job.error = str(e)
+            job.report_progress('failed', str(e))
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def find_finished(self, key):
+        """Most recent successful job submitted with `key`, for reusing identical runs."""
+        with self.lock:
+            for job in reversed(self.jobs.values()):
+                if job.key == key and job.status == DONE:
+                    return job
+        return None
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        # Cancelling the concurrent future cancels the task inside the loop thread
+        job.future.cancel()
+        if job.status == PENDING:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def list_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def _prune(self):
+        # Drop the oldest finished jobs once over capacity; running jobs are kept
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        while len(self.jobs) > self.max_jobs and finished:
+            del self.jobs[finished.pop(0)]
+
+    def shutdown(self):
+        for job in self.list_jobs():
+            self.cancel(job.id)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
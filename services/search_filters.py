@@ -0,0 +1,138 @@
+# services/search_filters.py
+"""
+Search filter expressions compiled into frame-id candidate sets.
+
+A filter is a plain dict (so it travels unchanged through the search server):
+
+    {
+        "parts": ["L01", "L02"],              # any of these data parts
+        "videos": ["L01_V001", "L02_V013"],   # any of these videos
+        "time_range": [30, 95],               # seconds into the video, inclusive
+        "objects": ["person", "bus"],         # all of these object classes
+        "counts": ["2person"],                # all of these object count terms
+        "ocr": ["khai mac"]                   # OCR text containing any keyword
+    }
+
+All given conditions must hold. `compile_filter` turns the expression into a
+sorted array of global frame ids (FAISS rows) which vector search then uses as
+its candidate set; with a sharded index, only the shards holding candidates
+are searched.
+"""
+import logging
+
+import numpy as np
+
+from data_loaders.frame_table import load_frame_table
+from data_loaders.keyframe_index import load_keyframe_index
+from data_loaders.metadata_store import load_metadata_store
+from data_loaders.bitmap_index import load_bitmap_index
+from data_loaders.ocr_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ('parts', 'videos', 'time_range', 'objects', 'counts', 'ocr')
+
+
+def is_empty_filter(filters):
+    return not filters or not any(filters.get(key) for key in FILTER_KEYS)
+
+
+def frame_times(frame_table, keyframe_index, frame_ids):
+    """Seconds into the video for `frame_ids` (NaN where unknown), as used for submissions."""
+    dir_codes = frame_table.dir_codes[frame_ids]
+    video_codes = keyframe_index.codes_for(frame_table.videos)[frame_table.video_of_dir[dir_codes]]
+    frame_numbers = frame_table.frame_numbers[frame_ids]
+    frame_idx, _, fps = keyframe_index.lookup_codes(video_codes, frame_numbers)
+
+    # Extra frames are named by their frame index rather than keyframe number
+    dir_is_extra = np.array(['extra' in dir_path.rstrip('/').split('/')[-2] for dir_path in frame_table.dirs], dtype=bool)
+    frame_idx = np.where(dir_is_extra[dir_codes], frame_numbers, frame_idx)
+    resolved = (frame_idx >= 0) & ~np.isnan(fps)
+    return np.where(resolved, frame_idx / np.where(resolved, fps, 1.0), np.nan)
+
+
+def ocr_mask(metadata_store, size, keywords):
+    """Frames whose OCR text contains any of `keywords` (case- and diacritic-insensitive)."""
+    keywords = [fold_text(keyword) for keyword in keywords]
+    vocab = metadata_store.vocab['ocr']
+    term_ids = [i for i, text in enumerate(vocab) if any(keyword in fold_text(text) for keyword in keywords)]
+    offsets = np.asarray(metadata_store.offsets['ocr'])
+    has_term = np.isin(np.asarray(metadata_store.values['ocr']), term_ids)
+    frame_of_value = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+    mask = np.zeros(size, dtype=bool)
+    matched = frame_of_value[has_term]
+    mask[matched[matched < size]] = True
+    return mask
+
+
+def compile_filter(filters, frame_table, keyframe_index=None, metadata_store=None, bitmap_index=None):
+    """
+    Sorted global frame ids satisfying `filters`, or None for an empty filter.
+
+    Raises ValueError if the filter needs a data structure that is not built
+    (time ranges need the keyframe index, OCR the metadata store, objects and
+    counts the bitmap index).
+    """
+    unknown = set(filters or {}) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unsupported filter keys: {sorted(unknown)}")
+    if is_empty_filter(filters):
+        return None
+
+    size = len(frame_table)
+    mask = frame_table.dir_codes >= 0
+
+    if filters.get('parts'):
+        # Videos are named <part>_<video>, e.g. L01_V001 (also covers L01_extra frames)
+        parts = set(filters['parts'])
+        codes = [code for code, video in enumerate(frame_table.videos) if video.split('_')[0] in parts]
+        mask &= np.isin(frame_table.video_codes, codes)
+
+    if filters.get('videos'):
+        video_lookup = {video: code for code, video in enumerate(frame_table.videos)}
+        codes = [video_lookup[video] for video in filters['videos'] if video in video_lookup]
+        mask &= np.isin(frame_table.video_codes, codes)
+
+    if filters.get('time_range'):
+        if keyframe_index is None:
+            raise ValueError("Time-range filters need the keyframe index (python -m data_loaders.keyframe_index)")
+        start, end = (float(value) for value in filters['time_range'])
+        frame_ids = np.flatnonzero(mask)
+        times = frame_times(frame_table, keyframe_index, frame_ids)
+        mask[frame_ids[~((times >= start) & (times <= end))]] = False
+
+    if filters.get('objects') or filters.get('counts'):
+        if bitmap_index is None:
+            raise ValueError("Object filters need the bitmap index (python -m data_loaders.bitmap_index)")
+        bits = np.unpackbits(bitmap_index.query(filters.get('objects', []), filters.get('counts', [])), count=len(bitmap_index))
+        object_mask = np.zeros(size, dtype=bool)
+        object_mask[:min(size, len(bits))] = bits[:size].astype(bool)
+        mask &= object_mask
+
+    if filters.get('ocr'):
+        if metadata_store is None:
+            raise ValueError("OCR filters need the metadata store (python -m data_loaders.metadata_store)")
+        mask &= ocr_mask(metadata_store, size, filters['ocr'])
+
+    candidate_ids = np.flatnonzero(mask)
+    logger.debug(f"Filter {filters} matched {len(candidate_ids)} frames")
+    return candidate_ids
+
+
+def compile_search_filter(filters):
+    """`compile_filter` against the loaded frame table, keyframe index, metadata store and bitmaps."""
+    if is_empty_filter(filters):
+        return None
+    frame_table = load_frame_table()
+    if frame_table is None:
+        raise ValueError("Search filters need the frame table (python -m data_loaders.frame_table)")
+    return compile_filter(filters, frame_table, load_keyframe_index(), load_metadata_store(), load_bitmap_index())
+
+
+def filter_paths(image_paths, candidate_ids):
+    """Keep the paths whose frame id is in `candidate_ids` (for searches that cannot take a candidate set)."""
+    if candidate_ids is None:
+        return image_paths
+    frame_ids = load_frame_table().ids_of(image_paths)
+    keep = np.isin(frame_ids, candidate_ids)
+    return [path for path, kept in zip(image_paths, keep) if kept]
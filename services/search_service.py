@@ -1,12 +1,42 @@
 # services/search_service.py
+import logging
+
+import faiss
+import numpy as np
+
+from config import Config
 from utilities.model_utils import (
     search_image_by_text,
+    search_image_by_text_with_feedback,
     search_image_by_text_with_captioning,
     search_images_by_ocr,
+    search_images_by_ocr_ranked,
     get_image_paths,
 )
+from services.search_filters import compile_search_filter, filter_paths
+from data_loaders.frame_table import load_frame_table
+from data_loaders.keyframe_index import load_keyframe_index
+from services.video_aggregation import rank_videos
+from utilities.query_by_example import search_by_example
+
+logger = logging.getLogger(__name__)
+
+def feedback_frame_ids(positive_paths, negative_paths):
+    """(positive ids, negative ids) of the feedback frames in the index, or None without usable feedback."""
+    if not positive_paths and not negative_paths:
+        return None
+    frame_table = load_frame_table()
+    if frame_table is None:
+        logger.warning("Relevance feedback needs the frame table, searching without it")
+        return None
+    positive_ids, negative_ids = (frame_table.ids_of(list(paths or [])) for paths in (positive_paths, negative_paths))
+    positive_ids, negative_ids = positive_ids[positive_ids >= 0], negative_ids[negative_ids >= 0]
+    if len(positive_ids) == 0 and len(negative_ids) == 0:
+        return None
+    return positive_ids, negative_ids
 
-def perform_search(search_method, model, index, text_query, top_k, deleted_images, id2img_fps):
+def perform_search(search_method, model, index, text_query, top_k, deleted_images, id2img_fps, filters=None,
+                   ensemble=None, models=None, positive_paths=None, negative_paths=None):
     """
     Perform image search based on the selected method.
 
@@ -18,17 +48,41 @@ def perform_search(search_method, model, index, text_query, top_k, deleted_image
         top_k (int): Number of top results to retrieve.
         deleted_images (set): Set of image paths marked as deleted.
         id2img_fps (dict): Mapping from IDs to image file paths.
+        filters (dict, optional): Filter expression (see services.search_filters).
+            CLIP and indexed OCR search only rank frames that satisfy it;
+            Captioning results are filtered afterwards.
+        ensemble (EnsembleSearchService, optional): CLIP search fuses the
+            rankings of its models instead of searching `index` alone.
+        models (list, optional): Ensemble models to use for this query (all by default).
+        positive_paths, negative_paths (list, optional): Relevance feedback for CLIP
+            search (e.g. selected and deleted frames); the query embedding is
+            moved towards the former and away from the latter (Rocchio) and
+            `index` is searched with it.
 
     Returns:
         list: List of image paths matching the search criteria.
     """
-    if search_method == "CLIP":
-        image_indices, distances = search_image_by_text(model, index, text_query, top_k + len(deleted_images))
+    candidate_ids = compile_search_filter(filters)
+    feedback = feedback_frame_ids(positive_paths, negative_paths) if search_method == "CLIP" else None
+
+    if feedback is not None:
+        image_indices, distances = search_image_by_text_with_feedback(
+            model, index, text_query, top_k + len(deleted_images), *feedback, candidate_ids
+        )
+        image_paths = get_image_paths(image_indices, id2img_fps)
+    elif search_method == "CLIP" and ensemble is not None:
+        image_paths = ensemble.search_paths(text_query, top_k + len(deleted_images), models, candidate_ids)
+    elif search_method == "CLIP":
+        image_indices, distances = search_image_by_text(model, index, text_query, top_k + len(deleted_images), candidate_ids)
         image_paths = get_image_paths(image_indices, id2img_fps)
     elif search_method == "Captioning":
-        image_paths = search_image_by_text_with_captioning(text_query, top_k)
+        image_paths = filter_paths(search_image_by_text_with_captioning(text_query, top_k), candidate_ids)
     elif search_method == "OCR":
-        image_paths = search_images_by_ocr(text_query, top_k)
+        ranked = search_images_by_ocr_ranked(text_query, top_k, candidate_ids)
+        if ranked is not None:
+            image_paths = [path for path, _ in ranked]
+        else:
+            image_paths = filter_paths(search_images_by_ocr(text_query, top_k), candidate_ids)
     else:
         raise ValueError(f"Unsupported search method: {search_method}")
 
@@ -36,3 +90,67 @@ def perform_search(search_method, model, index, text_query, top_k, deleted_image
     image_paths = [path for path in image_paths if path not in deleted_images]
 
     return image_paths
+
+def search_similar(index, example_paths, top_k, deleted_images, id2img_fps, exclude_same_video=False, filters=None):
+    """
+    Frames most similar to the example frames (query-by-example).
+
+    Args:
+        index: The FAISS index the example vectors are read back from.
+        example_paths (list): Image paths of one or more frames already in the index; their vectors are averaged.
+        top_k (int): Number of top results to retrieve.
+        deleted_images (set): Set of image paths marked as deleted.
+        id2img_fps (dict): Mapping from IDs to image file paths.
+        exclude_same_video (bool): Leave out every frame of the examples' videos.
+        filters (dict, optional): Filter expression (see services.search_filters).
+
+    Returns:
+        list: List of image paths, without the examples themselves.
+    """
+    frame_table = load_frame_table()
+    if frame_table is None:
+        raise ValueError("Similar-frame search needs the frame table (python -m data_loaders.frame_table)")
+    frame_ids = frame_table.ids_of(example_paths)
+    frame_ids = frame_ids[frame_ids >= 0]
+    if len(frame_ids) == 0:
+        raise ValueError("None of the example frames are in the index")
+
+    video_codes = frame_table.video_codes if exclude_same_video else None
+    distances, image_indices = search_by_example(index, frame_ids, top_k + len(deleted_images), video_codes,
+                                                 compile_search_filter(filters))
+    image_paths = get_image_paths(image_indices[:, image_indices[0] >= 0], id2img_fps)
+    return [path for path in image_paths if path not in deleted_images][:top_k]
+
+def search_videos(model, index, text_query, top_videos, deleted_images, mode='max', filters=None,
+                  frame_top_k=None, window_seconds=None):
+    """
+    CLIP search ranked by video instead of by frame.
+
+    Args:
+        model: The loaded CLIP model.
+        index: The FAISS index.
+        text_query (str): The user's search query.
+        top_videos (int): Number of videos to return.
+        deleted_images (set): Set of image paths marked as deleted; they do not count as hits.
+        mode (str): Video score, "max", "sum" or "density" (see services.video_aggregation).
+        filters (dict, optional): Filter expression (see services.search_filters).
+        frame_top_k (int, optional): Frame hits grouped (VIDEO_AGGREGATION_FRAMES by default).
+        window_seconds (float, optional): Width of the best time window (VIDEO_WINDOW_SECONDS by default).
+
+    Returns:
+        list: One dict per video with its score, hit count, best frame and best time window.
+    """
+    frame_table = load_frame_table()
+    if frame_table is None:
+        raise ValueError("Video ranking needs the frame table (python -m data_loaders.frame_table)")
+    frame_top_k = frame_top_k or Config.VIDEO_AGGREGATION_FRAMES
+    image_indices, distances = search_image_by_text(model, index, text_query, frame_top_k, compile_search_filter(filters))
+    frame_ids, distances = image_indices[0], distances[0]
+    # Scores must grow with similarity; squared L2 between unit vectors is 2 - 2 * cosine
+    scores = distances if index.metric_type == faiss.METRIC_INNER_PRODUCT else 1 - distances / 2
+    if deleted_images:
+        deleted_ids = frame_table.ids_of(list(deleted_images))
+        keep = ~np.isin(frame_ids, deleted_ids[deleted_ids >= 0])
+        frame_ids, scores = frame_ids[keep], scores[keep]
+    return rank_videos(frame_table, load_keyframe_index(), frame_ids, scores, mode, top_videos,
+                       window_seconds or Config.VIDEO_WINDOW_SECONDS)
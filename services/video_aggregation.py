@@ -0,0 +1,125 @@
+# services/video_aggregation.py
+"""
+Video-level ranking of frame hits.
+
+A large frame top-k is grouped by video with array operations over the
+frame table (video code and keyframe number per global frame id) and the
+keyframe index (time per keyframe), so no hit path is parsed. Videos are
+scored by:
+
+    max      best frame score
+    sum      total score of all hits (many good hits beat one great hit)
+    density  score of the densest window_seconds span of hits
+
+and every video is returned with its best time window: the window_seconds
+span holding the highest total hit score.
+"""
+import numpy as np
+
+AGGREGATION_MODES = ('max', 'sum', 'density')
+WINDOW_SECONDS = 10.0
+
+
+def frame_times(frame_table, keyframe_index, frame_ids):
+    """Time in seconds of each global frame id (NaN where it cannot be resolved)."""
+    frame_ids = np.asarray(frame_ids, dtype=np.int64)
+    times = np.full(len(frame_ids), np.nan)
+    if keyframe_index is None or len(frame_ids) == 0:
+        return times
+    video_codes = frame_table.video_codes[frame_ids]
+    numbers = frame_table.frame_numbers[frame_ids]
+    known = video_codes >= 0
+    # Frame table video code -> keyframe index video code, computed once per call for all videos
+    keyframe_codes = np.append(keyframe_index.codes_for(frame_table.videos), -1)
+    frame_idx, _, fps = keyframe_index.lookup_codes(keyframe_codes[np.where(known, video_codes, -1)], numbers)
+    # Extra frames are named by their frame index rather than keyframe number
+    is_extra_dir = np.append(np.char.find(frame_table.dirs, 'extra') >= 0, False)
+    frame_idx = np.where(is_extra_dir[frame_table.dir_codes[frame_ids]], numbers, frame_idx)
+    resolved = known & (frame_idx >= 0) & ~np.isnan(fps)
+    times[resolved] = frame_idx[resolved] / fps[resolved]
+    return times
+
+
+def aggregate_by_video(video_codes, times, scores, mode='max', window_seconds=WINDOW_SECONDS):
+    """
+    Group hits by video. Returns a dict of arrays, one row per video, sorted
+    by descending video score: 'video_code', 'score', 'hits', 'best_hit'
+    (position of the best-scoring hit), 'window_start', 'window_end' (NaN if
+    no hit time is known) and 'window_hits'.
+    """
+    if mode not in AGGREGATION_MODES:
+        raise ValueError(f"Unsupported aggregation mode: {mode} (expected one of {AGGREGATION_MODES})")
+    video_codes = np.asarray(video_codes, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    hit_positions = np.flatnonzero(video_codes >= 0)
+    videos, inverse = np.unique(video_codes[hit_positions], return_inverse=True)
+    hit_scores = scores[hit_positions]
+
+    best_score = np.full(len(videos), -np.inf)
+    np.maximum.at(best_score, inverse, hit_scores)
+    total_score = np.bincount(inverse, weights=hit_scores, minlength=len(videos))
+    hits = np.bincount(inverse, minlength=len(videos))
+    # Best hit per video: the first hit of each video once sorted by (video, -score)
+    by_score = np.lexsort((-hit_scores, inverse))
+    best_hit = hit_positions[by_score[np.searchsorted(inverse[by_score], np.arange(len(videos)))]]
+
+    # Hits without a time get their own far-apart slot so they only form single-hit windows
+    hit_times = times[hit_positions]
+    untimed = np.isnan(hit_times)
+    span = (np.nanmax(hit_times) if not untimed.all() else 0.0) + window_seconds + 1
+    slot_times = np.where(untimed, span + np.arange(len(hit_times)) * (window_seconds + 1), hit_times)
+    stride = slot_times.max(initial=0.0) + window_seconds + 1
+
+    # Sliding window: hits sorted by (video, time), each window starts at a hit
+    order = np.lexsort((slot_times, inverse))
+    keys = inverse[order] * stride + slot_times[order]
+    window_end = np.searchsorted(keys, keys + window_seconds, side='right')
+    cumulative = np.concatenate(([0.0], np.cumsum(hit_scores[order])))
+    window_scores = cumulative[window_end] - cumulative[np.arange(len(order))]
+    # Best window per video: the first window of each video once sorted by (video, -window score)
+    by_window = np.lexsort((-window_scores, inverse[order]))
+    best_window = by_window[np.searchsorted(inverse[order][by_window], np.arange(len(videos)))]
+    start_times = hit_times[order][best_window]
+    end_times = hit_times[order][window_end[best_window] - 1]
+    window_hits = window_end[best_window] - best_window
+    density_score = window_scores[best_window]
+
+    video_score = {'max': best_score, 'sum': total_score, 'density': density_score}[mode]
+    ranking = np.lexsort((-best_score, -video_score))
+    return {
+        'video_code': videos[ranking],
+        'score': video_score[ranking],
+        'hits': hits[ranking],
+        'best_hit': best_hit[ranking],
+        'window_start': start_times[ranking],
+        'window_end': end_times[ranking],
+        'window_hits': window_hits[ranking],
+    }
+
+
+def rank_videos(frame_table, keyframe_index, frame_ids, scores, mode='max', top_n=20, window_seconds=WINDOW_SECONDS):
+    """Top `top_n` videos for ranked frame hits (`scores`: higher is better), with their best time windows."""
+    frame_ids = np.asarray(frame_ids, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = (frame_ids >= 0) & (frame_ids < len(frame_table))
+    frame_ids, scores = frame_ids[valid], scores[valid]
+    video_codes = frame_table.video_codes[frame_ids]
+    grouped = aggregate_by_video(video_codes, frame_times(frame_table, keyframe_index, frame_ids), scores, mode,
+                                 window_seconds)
+
+    results = []
+    for row in range(min(top_n, len(grouped['video_code']))):
+        window_start, window_end = grouped['window_start'][row], grouped['window_end'][row]
+        best_frame_id = int(frame_ids[grouped['best_hit'][row]])
+        results.append({
+            'video': str(frame_table.videos[grouped['video_code'][row]]),
+            'score': float(grouped['score'][row]),
+            'hits': int(grouped['hits'][row]),
+            'image_path': frame_table.path(best_frame_id),
+            'frame_id': best_frame_id,
+            'window_start': None if np.isnan(window_start) else float(window_start),
+            'window_end': None if np.isnan(window_end) else float(window_end),
+            'window_hits': int(grouped['window_hits'][row]),
+        })
+    return results
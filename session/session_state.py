@@ -1,18 +1,30 @@
 import streamlit as st
 
-# Toggle selection of an image
-def toggle_select(image_info):
+# Toggle selection of an image (its path is kept too, as relevance feedback)
+def toggle_select(image_info, image_path=None):
+    selected_paths = st.session_state.setdefault('selected_image_paths', [])
     if image_info in st.session_state.selected_images:
         st.session_state.selected_images.remove(image_info)
+        if image_path in selected_paths:
+            selected_paths.remove(image_path)
     else:
         st.session_state.selected_images.append(image_info)
+        if image_path:
+            selected_paths.append(image_path)
 
 # Toggle deletion of an image
 def toggle_delete(image_path):
-    if image_path in st.session_state.marked_for_deletion:
-        st.session_state.marked_for_deletion.remove(image_path)
+    if image_path in st.session_state.deleted_images:
+        st.session_state.deleted_images.remove(image_path)
     else:
-        st.session_state.marked_for_deletion.add(image_path)
+        st.session_state.deleted_images.add(image_path)
+
+# Toggle an image as an example for similar-frame search
+def toggle_example(image_path):
+    if image_path in st.session_state.example_images:
+        st.session_state.example_images.remove(image_path)
+    else:
+        st.session_state.example_images.append(image_path)
 
 # Filter out deleted images from the results
 def filter_out_deleted(image_paths):
@@ -0,0 +1,137 @@
+# tests/test_agents/test_agent_orchestrator.py
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+from agents.agent_orchestrator import AgentOrchestrator, RunContext
+from agents.local_query_classifier import LocalQueryClassifier
+from agents.run_budget import RunBudget
+
+CLASSIFICATION = {'temporal': False, 'question': False, 'number_of_scenes': 1,
+                  'scenes': [{'scene': 1, 'description': 'a red bus', 'question': False, 'specific_question': None}]}
+PROMPTS = {'clip_prompts': [{'scene': 1, 'prompt': 'a red bus'}],
+           'caption_prompts': [{'scene': 1, 'prompt': 'xe buýt đỏ'}], 'question': None}
+
+QUESTION_CLASSIFICATION = {'temporal': False, 'question': True, 'number_of_scenes': 1,
+                           'scenes': [{'scene': 1, 'description': 'a red bus', 'question': True,
+                                       'specific_question': 'What is the bus number?'}]}
+
+class FakeLLM:
+    def __init__(self):
+        self.images = []
+
+    async def generate_text(self, prompt, **kwargs):
+        await asyncio.sleep(0.01)
+        return json.dumps(PROMPTS)
+
+    async def analyze_image(self, image_path, prompt, **kwargs):
+        self.images.append(image_path)
+        await asyncio.sleep(0.01)
+        return json.dumps({'image_path': image_path, 'match_assessment': {'category': 'Near Match', 'confidence': 0.7},
+                           'justification': 'red bus'})
+
+class FakeSearch:
+    speculative_delay = 0
+
+    async def agent_search(self, clip_prompt, caption_prompt, top_k, ocr_query=None):
+        return [{'image_path': f'/data/L01/V001/{i:03d}.jpg', 'distance': 1.0 - i / 10} for i in range(top_k)]
+
+    async def multi_query_search(self, queries, top_k, captions=True):
+        await asyncio.sleep(self.speculative_delay)
+        return [[{'image_path': f'/data/{query}/{i:03d}.jpg'} for i in range(top_k)] for query in queries]
+
+    async def load_metadata(self, image_paths):
+        # The first candidate shows its bus number on screen
+        return {path: {'ocr': ['Tuyến 36']} for path in image_paths if path.endswith('000.jpg')}
+
+class TestAgentOrchestrator(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple('config.Config', SPECULATIVE_SEARCH_ENABLED=False, LOCAL_CLASSIFIER_ENABLED=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.llm = FakeLLM()
+        self.orchestrator = AgentOrchestrator(self.llm, FakeSearch())
+
+    def test_concurrent_runs_keep_their_own_budget(self):
+        async def run_both():
+            return await asyncio.gather(
+                self.orchestrator.process_query('a red bus', 2, CLASSIFICATION, first),
+                self.orchestrator.process_query('a red bus', 5, CLASSIFICATION, second),
+            )
+
+        first, second = RunBudget(), RunBudget()
+        first_results, second_results = asyncio.run(run_both())
+        self.assertEqual((len(first_results), len(second_results)), (2, 5))
+        # One prompt-crafting call plus one validation per candidate, counted on each run's own budget
+        self.assertEqual((first.summary()['llm_calls'], second.summary()['llm_calls']), (3, 6))
+
+    def test_orchestrators_share_a_local_classifier(self):
+        classifier = LocalQueryClassifier()
+        orchestrators = [AgentOrchestrator(FakeLLM(), FakeSearch(), classifier) for _ in range(2)]
+        self.assertTrue(all(orchestrator.query_classifier.local_classifier is classifier for orchestrator in orchestrators))
+
+    def test_metadata_answers_skip_vision_calls(self):
+        budget = RunBudget()
+        results = asyncio.run(self.orchestrator.process_query('what number is the red bus', 3, QUESTION_CLASSIFICATION, budget))
+        answered = results[0]
+        self.assertEqual(answered['image_path'], '/data/L01/V001/000.jpg')
+        self.assertEqual(answered['question_answer']['answer'], '36')
+        self.assertNotIn('/data/L01/V001/000.jpg', self.llm.images)
+        self.assertEqual(len(self.llm.images), 2)
+        self.assertEqual(budget.summary()['llm_calls_avoided'], {'validation': 1})
+
+class TestSpeculativeSearch(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple('config.Config', SPECULATIVE_SEARCH_ENABLED=True, SPECULATIVE_MAX_QUERIES=4,
+                                 SPECULATIVE_CAPTION_SEARCH=False, LOCAL_CLASSIFIER_ENABLED=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.search = FakeSearch()
+        self.orchestrator = AgentOrchestrator(FakeLLM(), self.search)
+
+    def candidates(self, query, scene_index, number_of_scenes, budget=None):
+        async def run_speculation():
+            run = RunContext(budget or RunBudget())
+            self.orchestrator.start_speculative_search(run, query, 2)
+            return await self.orchestrator.speculative_candidates(run, scene_index, number_of_scenes), run
+        return asyncio.run(run_speculation())
+
+    def test_single_scene_fuses_every_query(self):
+        candidates, run = self.candidates('A bus. A car.', 0, 1)
+        self.assertEqual(run.speculative_queries, ['A bus. A car.', 'A bus.', 'A car.'])
+        self.assertEqual(len(candidates), 6)
+
+    def test_sentence_per_scene(self):
+        candidates, _ = self.candidates('A bus. A car.', 1, 2)
+        self.assertEqual([result['image_path'] for result in candidates], ['/data/A car./000.jpg', '/data/A car./001.jpg'])
+
+    def test_sentence_scene_mismatch(self):
+        candidates, _ = self.candidates('A bus. A car. A boat.', 0, 2)
+        self.assertEqual(candidates, [])
+
+    def test_wait_is_bounded_by_the_deadline(self):
+        self.search.speculative_delay = 5
+        budget = RunBudget(deadline_seconds=0.05)
+        candidates, _ = self.candidates('A bus', 0, 1, budget)
+        self.assertEqual(candidates, [])
+        self.assertLess(budget.elapsed_seconds, 1)
+        self.assertEqual(budget.summary()['skipped'], [{'stage': 'speculative_search', 'reason': 'deadline', 'count': 1}])
+
+    def test_caption_embedding_calls_are_counted(self):
+        budget = RunBudget()
+        with patch('config.Config.SPECULATIVE_CAPTION_SEARCH', True):
+            self.candidates('A bus. A car.', 0, 1, budget)
+        self.assertEqual(budget.summary()['embedding_calls'], 3)
+
+    def test_merge_does_not_grow_the_candidates(self):
+        search_results = [{'image_path': 'a.jpg', 'distance': 0.9}, {'image_path': 'b.jpg', 'distance': 0.8}]
+        speculative = [{'image_path': path} for path in ('c.jpg', 'a.jpg', 'd.jpg')]
+        merged = self.orchestrator.merge_speculative(search_results, speculative)
+        # A strong speculative hit can displace a crafted one, but the count stays the same
+        self.assertEqual([result['image_path'] for result in merged], ['a.jpg', 'c.jpg'])
+        self.assertEqual(merged[0]['distance'], 0.9)
+        self.assertIs(self.orchestrator.merge_speculative(search_results, []), search_results)
+
+if __name__ == '__main__':
+    unittest.main()
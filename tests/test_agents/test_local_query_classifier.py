@@ -0,0 +1,129 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+
+from agents.local_query_classifier import (LocalQueryClassifier, read_classification_log, summarize_agreement,
+                                           compare_classifications, log_classification, single_scene)
+from agents.query_classifier_agent import QueryClassifierAgent
+
+class TestLocalQueryClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = LocalQueryClassifier(min_confidence=0.75)
+
+    def test_simple_description_is_confident(self):
+        classification, confidence = self.classifier.classify("A red bus parked next to a máy bay on the runway")
+        self.assertTrue(self.classifier.is_confident(confidence))
+        self.assertEqual(classification['number_of_scenes'], 1)
+        self.assertFalse(classification['temporal'])
+        self.assertFalse(classification['question'])
+
+    def test_single_question_splits_description(self):
+        classification, confidence = self.classifier.classify("A man holds a sign at the market. What is written on the sign?")
+        self.assertTrue(self.classifier.is_confident(confidence))
+        scene = classification['scenes'][0]
+        self.assertEqual(scene['description'], "A man holds a sign at the market.")
+        self.assertEqual(scene['specific_question'], "What is written on the sign?")
+
+        classification, _ = self.classifier.classify("Có bao nhiêu người trên sân khấu")
+        self.assertTrue(classification['question'])
+
+    def test_descriptions_are_not_questions(self):
+        for query in ["Đó là một buổi lễ khai mạc với nhiều người tham dự.",
+                      "Đồ ăn được bày trên bàn.",
+                      "When the sun sets, a fisherman pulls a net"]:
+            classification, confidence = self.classifier.classify(query)
+            self.assertFalse(classification['question'], query)
+            self.assertIsNone(classification['scenes'][0]['specific_question'], query)
+
+        for query in ["When does the parade start", "Người đàn ông cầm cái gì", "is there a dog on the bench"]:
+            classification, _ = self.classifier.classify(query)
+            self.assertTrue(classification['question'], query)
+
+    def test_ambiguous_queries_fall_back(self):
+        for query in ["A woman opens the door, then a dog runs out",
+                      "Cảnh người đàn ông đi bộ, sau đó lên xe",
+                      "A man who wears a hat. How old is he? What is he holding?",
+                      "The place where the festival is held"]:
+            _, confidence = self.classifier.classify(query)
+            self.assertFalse(self.classifier.is_confident(confidence), query)
+
+    def test_summarize_agreement(self):
+        reference = {'temporal': False, 'question': True, 'number_of_scenes': 1}
+        local, _ = self.classifier.classify("A red bus")
+        rows = [(0.9, True, compare_classifications(local, reference)), (0.3, False, compare_classifications(local, local))]
+        summary = summarize_agreement(rows)
+        self.assertEqual((summary['handled_locally'], summary['coverage']), (1, 0.5))
+        self.assertEqual((summary['temporal_agreement'], summary['question_agreement'], summary['full_agreement']), (1.0, 0.0, 0.0))
+
+class TestQueryClassifierFastPath(unittest.TestCase):
+    def setUp(self):
+        self.log_path = os.path.join(tempfile.mkdtemp(), 'classifications.jsonl')
+        self.patcher = patch('config.Config.CLASSIFICATION_LOG_PATH', self.log_path)
+        self.patcher.start()
+        self.llm = MagicMock()
+        self.llm.generate_text = AsyncMock(return_value='{"temporal": true, "question": false, "number_of_scenes": 2, "scenes": []}')
+        self.agent = QueryClassifierAgent(self.llm, LocalQueryClassifier(min_confidence=0.75))
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_local_and_llm_paths_are_logged(self):
+        budget = MagicMock()
+        asyncio.run(self.agent.classify_query("A red bus on a bridge", budget))
+        self.llm.generate_text.assert_not_called()
+        budget.record_avoided.assert_called_once_with('classification')
+
+        classification = asyncio.run(self.agent.classify_query("A woman opens the door, then a dog runs out"))
+        self.llm.generate_text.assert_called_once()
+        self.assertTrue(classification['temporal'])
+
+        self.assertEqual([entry['source'] for entry in read_classification_log(self.log_path, source=None)], ['local', 'llm'])
+
+    def test_examples_are_encoded_once_off_the_event_loop(self):
+        encode = MagicMock(side_effect=lambda text: np.ones(4, dtype=np.float32) / 2)
+        self.agent.local_classifier = LocalQueryClassifier(encode=encode, min_confidence=0.75)
+        for query in ["A red bus", "A blue bus"]:
+            log_classification(query, single_scene(query), 'llm')
+
+        with patch('asyncio.to_thread', wraps=asyncio.to_thread) as to_thread:
+            asyncio.run(self.agent.classify_query("The place where the festival is held"))
+            asyncio.run(self.agent.classify_query("The street where the parade passes"))
+        self.assertEqual(to_thread.call_args_list[0].args[0], self.agent.local_classifier.load_examples)
+        self.assertEqual(len(self.agent.local_classifier.example_vectors), 2)
+        # Two logged examples plus one encode per ambiguous query; no LLM call for a near-identical example
+        self.assertEqual(encode.call_count, 4)
+        self.llm.generate_text.assert_not_called()
+
+    def test_example_vectors_are_cached_across_instances(self):
+        vectors_path = os.path.join(os.path.dirname(self.log_path), 'vectors.npz')
+        encode = MagicMock(side_effect=lambda text: np.ones(4, dtype=np.float32) / 2)
+        for query in ["A red bus", "A blue bus"]:
+            log_classification(query, single_scene(query), 'llm')
+        LocalQueryClassifier(encode=encode, vectors_path=vectors_path, encoder_name='int8').load_examples()
+        self.assertEqual(encode.call_count, 2)
+
+        log_classification("A green bus", single_scene("A green bus"), 'llm')
+        restarted = LocalQueryClassifier(encode=encode, vectors_path=vectors_path, encoder_name='int8')
+        restarted.load_examples()
+        # Only the query logged since the cache was written is encoded
+        self.assertEqual(encode.call_args_list[-1].args[0], "A green bus")
+        self.assertEqual(encode.call_count, 3)
+        self.assertEqual(len(restarted.example_vectors), 3)
+
+        # Vectors of another encoder are not reused
+        LocalQueryClassifier(encode=encode, vectors_path=vectors_path, encoder_name='full').load_examples()
+        self.assertEqual(encode.call_count, 6)
+
+    def test_budget_refusal_falls_back_to_single_scene(self):
+        budget = MagicMock()
+        budget.try_acquire.return_value = False
+        query = "A woman opens the door, then a dog runs out"
+        self.assertEqual(asyncio.run(self.agent.classify_query(query, budget)), single_scene(query))
+        self.llm.generate_text.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from agents.metadata_answer_agent import MetadataAnswerAgent
+
+class TestMetadataAnswerAgent(unittest.TestCase):
+    def setUp(self):
+        self.agent = MetadataAnswerAgent(min_confidence=0.7)
+
+    def test_count_questions(self):
+        answer = self.agent.answer("How many dogs are in the yard?", {'counts': ['3dog', '1person'], 'objects': ['dog']})
+        self.assertEqual((answer['answer'], answer['source']), ('3', 'object count'))
+        self.assertTrue(self.agent.is_confident(answer))
+
+        answer = self.agent.answer("Có bao nhiêu người trên sân khấu?", {'counts': ['person:4']})
+        self.assertEqual(answer['answer'], '4')
+
+        # Repeated detections alone are not confident enough
+        answer = self.agent.answer("How many people are there?", {'objects': ['person', 'person']})
+        self.assertEqual(answer['answer'], '2')
+        self.assertFalse(self.agent.is_confident(answer))
+
+    def test_ocr_questions(self):
+        answer = self.agent.answer("What is the license plate number?", {'ocr': ['51A-123.45']})
+        self.assertEqual(answer['answer'], '51A-123.45')
+        self.assertTrue(self.agent.is_confident(answer))
+        self.assertFalse(self.agent.is_confident(self.agent.answer("What year is shown?", {'ocr': ['2019', '2020']})))
+
+        answer = self.agent.answer("What is the name of the bakery on the sign?", {'ocr': ['VTV1', 'Tiệm bánh BAKERY Hồng Phát']})
+        self.assertEqual(answer['answer'], 'Tiệm bánh BAKERY Hồng Phát')
+        self.assertTrue(self.agent.is_confident(answer))
+
+    def test_no_answer(self):
+        self.assertIsNone(self.agent.answer("Is the man happy?", {'ocr': ['SALE']}))
+        self.assertIsNone(self.agent.answer("What number is on the shirt?", {'ocr': []}))
+        self.assertIsNone(self.agent.answer(None, {}))
+
+    def test_ignores_logos_and_timestamps(self):
+        self.assertIsNone(self.agent.answer("What is the price of gasoline shown?", {'ocr': ['VTV24']}))
+        self.assertIsNone(self.agent.answer("What is the price shown?", {'ocr': ['HTV7 12:30']}))
+        self.assertIsNone(self.agent.answer("What number is on the box?", {'ocr': ['ABC123', '08:15:02']}))
+
+        answer = self.agent.answer("What is the price of gasoline shown?", {'ocr': ['VTV1 10:45', 'Xăng RON95 23.450']})
+        self.assertEqual(answer['answer'], '23.450')
+        self.assertTrue(self.agent.is_confident(answer))
+
+    def test_answered_result(self):
+        answer = self.agent.answer("How many dogs?", {'counts': ['2dog']})
+        result = self.agent.answered_result({'image_path': 'a.jpg', 'distance': 0.3}, answer)
+        self.assertEqual(result['question_answer']['answer'], '2')
+        self.assertEqual(result['match_assessment'], {'category': 'Near Match', 'confidence': 0.8})
+        self.assertEqual(result['distance'], 0.3)
+
+if __name__ == '__main__':
+    unittest.main()
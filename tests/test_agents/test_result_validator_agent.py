@@ -1,6 +1,8 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from agents.result_validator_agent import ResultValidatorAgent
+from agents.run_budget import RunBudget
 
 class TestResultValidatorAgent(unittest.TestCase):
     def setUp(self):
@@ -36,5 +38,15 @@ class TestResultValidatorAgent(unittest.TestCase):
         self.assertEqual(validated_results[0]['category'], 'No Match')
         self.assertEqual(validated_results[0]['confidence_score'], 0)
 
+class TestValidatorRetryBudget(unittest.TestCase):
+    def test_retries_count_against_max_llm_calls(self):
+        llm_connector = MagicMock()
+        llm_connector.analyze_image = AsyncMock(side_effect=RuntimeError("rate limited"))
+        budget = RunBudget(max_llm_calls=1)
+        result = asyncio.run(ResultValidatorAgent(llm_connector).validate_single_result({'image_path': 'a.jpg'}, 'a bus', budget=budget))
+        self.assertEqual(llm_connector.analyze_image.await_count, 1)
+        self.assertEqual(result['match_assessment']['category'], 'Unvalidated')
+        self.assertEqual(budget.summary()['skipped'], [{'stage': 'validation', 'reason': 'max_llm_calls', 'count': 1}])
+
 if __name__ == '__main__':
     unittest.main()
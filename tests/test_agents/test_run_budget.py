@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+from agents.run_budget import RunBudget
+from agents.query_classifier_agent import QueryClassifierAgent
+from agents.prompt_crafter_agent import PromptCrafterAgent
+
+class TestRunBudget(unittest.TestCase):
+    def test_max_llm_calls(self):
+        budget = RunBudget(max_llm_calls=2)
+        self.assertTrue(budget.try_acquire('validation'))
+        self.assertTrue(budget.try_acquire('validation'))
+        self.assertFalse(budget.try_acquire('validation'))
+        self.assertFalse(budget.try_acquire('validation'))
+
+        summary = budget.summary()
+        self.assertEqual(summary['llm_calls'], 2)
+        self.assertEqual(summary['skipped'], [{'stage': 'validation', 'reason': 'max_llm_calls', 'count': 2}])
+
+    def test_max_cost(self):
+        budget = RunBudget(max_cost=0.01, cost_per_1k_tokens=0.01)
+        self.assertTrue(budget.try_acquire('classification', 600))
+        self.assertEqual(budget.exhausted_reason(600), 'max_cost')
+
+    def test_deadline(self):
+        with patch('agents.run_budget.time.monotonic', side_effect=[100.0, 105.0, 111.0]):
+            budget = RunBudget(deadline_seconds=10)
+            self.assertFalse(budget.deadline_passed())
+            self.assertTrue(budget.deadline_passed())
+
+    def test_disabled_limits(self):
+        budget = RunBudget(deadline_seconds=0, max_llm_calls=0, max_tokens=0, max_cost=0)
+        self.assertIsNone(budget.remaining_seconds())
+        self.assertIsNone(budget.exhausted_reason(10 ** 9))
+
+class TestDeadlineFallbacks(unittest.TestCase):
+    def setUp(self):
+        async def slow_generate_text(prompt, **kwargs):
+            await asyncio.sleep(5)
+        self.llm = MagicMock()
+        self.llm.generate_text = slow_generate_text
+
+    def test_slow_llm_calls_fall_back_at_the_deadline(self):
+        budget = RunBudget(deadline_seconds=0.05)
+        classifier = QueryClassifierAgent(self.llm)
+        # Always ask the LLM
+        classifier.local_classifier = None
+        classification = asyncio.run(classifier.classify_query("A dog. Then a cat.", budget))
+        self.assertEqual(classification['scenes'][0]['description'], "A dog. Then a cat.")
+
+        budget = RunBudget(deadline_seconds=0.05)
+        prompts = asyncio.run(PromptCrafterAgent(self.llm).craft_prompts(classification, budget))
+        self.assertEqual(prompts['clip_prompts'], [{'scene': 1, 'prompt': "A dog. Then a cat."}])
+        self.assertEqual(budget.summary()['skipped'], [{'stage': 'prompt_crafting', 'reason': 'deadline', 'count': 1}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from data_loaders.bitmap_index import BitmapIndex
+from data_loaders.metadata_store import MetadataStore
+
+class TestBitmapIndex(unittest.TestCase):
+    def setUp(self):
+        random.seed(3)
+        self.objects = [random.sample(['person', 'car', 'dog', 'bus'], random.randint(0, 3)) for _ in range(101)]
+        self.counts = [random.sample(['1person', '2person', '3dog'], random.randint(0, 2)) for _ in range(101)]
+        self.store = self.make_store(self.objects, self.counts)
+        self.index = BitmapIndex.build(self.store)
+
+    @staticmethod
+    def make_store(objects, counts):
+        vocab, offsets, values = {'ocr': []}, {'ocr': np.zeros(len(objects) + 1, dtype=np.int64)}, {'ocr': np.zeros(0, dtype=np.int32)}
+        for field, rows in (('objects', objects), ('counts', counts)):
+            vocab[field] = sorted({term for row in rows for term in row})
+            offsets[field] = np.concatenate([[0], np.cumsum([len(row) for row in rows])])
+            values[field] = np.array([vocab[field].index(term) for row in rows for term in row], dtype=np.int32)
+        return MetadataStore(vocab, offsets, values)
+
+    def expected(self, objects, counts):
+        return [frame_id for frame_id in range(101)
+                if all(obj in self.objects[frame_id] for obj in objects)
+                and all(cnt in self.counts[frame_id] for cnt in counts)]
+
+    def test_query_matches_brute_force(self):
+        for objects, counts in ((['person'], []), (['person', 'car'], []), (['dog'], ['3dog']), ([], []), (['cat'], [])):
+            bitmap = self.index.query(objects, counts)
+            expected = self.expected(objects, counts)
+            self.assertEqual(list(self.index.frame_ids(bitmap)), expected)
+            self.assertEqual(self.index.count(bitmap), len(expected))
+
+    def test_contains(self):
+        bitmap = self.index.query(['person'])
+        mask = self.index.contains(bitmap, [-1, 500] + list(range(101)))
+        self.assertEqual(list(mask[:2]), [False, False])
+        self.assertEqual(list(np.flatnonzero(mask[2:])), self.expected(['person'], []))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = os.path.join(tmp, 'bitmap_index')
+            self.index.save(index_dir)
+            loaded = BitmapIndex.load(index_dir)
+            self.assertEqual(len(loaded), 101)
+            self.assertTrue(np.array_equal(loaded.query(['car'], ['1person']), self.index.query(['car'], ['1person'])))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from data_loaders.frame_table import FrameTable
+from utilities.video_utils import get_temporal_frames_from_listdir
+
+class TestFrameTable(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        random.seed(7)
+        id2img_fps = {}
+        frame_id = 0
+        for video_id, count in (('V001', 60), ('V002', 5)):
+            video_dir = os.path.join(self.tmp.name, 'Mid_Frames', 'L01', video_id)
+            os.makedirs(video_dir)
+            for number in sorted(random.sample(range(1, 5000), count)):
+                name = f"{number:04d}.jpg"
+                open(os.path.join(video_dir, name), 'w').close()
+                id2img_fps[str(frame_id)] = {'image_path': os.path.join(video_dir, name)}
+                frame_id += 1
+        self.id2img_fps = id2img_fps
+        self.table = FrameTable.from_id2img_fps(id2img_fps)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ids_and_videos(self):
+        path = self.id2img_fps['61']['image_path']
+        self.assertEqual(self.table.id_of(path), 61)
+        self.assertEqual(self.table.path(61), path)
+        self.assertIsNone(self.table.id_of('/missing/L01/V001/0001.jpg'))
+        self.assertEqual(list(self.table.video_of([0, 61])), ['L01_V001', 'L01_V002'])
+
+    def test_neighbours_match_listdir_walk(self):
+        anchors = [info['image_path'] for info in self.id2img_fps.values()]
+        for min_distance, temporal_range in ((1, 3), (50, 5), (400, 2)):
+            batch = self.table.neighbours_batch(anchors, min_distance, temporal_range)
+            for anchor, frames in zip(anchors, batch):
+                self.assertEqual(frames, get_temporal_frames_from_listdir(anchor, min_distance, temporal_range))
+
+    def test_unknown_anchor(self):
+        self.assertIsNone(self.table.neighbours('/missing/L01/V009/0001.jpg'))
+
+    def test_save_and_load_round_trip(self):
+        path = os.path.join(self.tmp.name, 'frame_table.npz')
+        self.table.save(path)
+        loaded = FrameTable.load(path)
+        np.testing.assert_array_equal(loaded.frame_numbers, self.table.frame_numbers)
+        self.assertEqual(loaded.path(3), self.table.path(3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from data_loaders.keyframe_index import KeyframeIndex
+
+def write_map_csv(directory, video_name, rows, fps=25.0):
+    with open(os.path.join(directory, f"{video_name}.csv"), "w") as f:
+        f.write("n,pts_time,fps,frame_idx\n")
+        for n, frame_idx in rows:
+            f.write(f"{n},{frame_idx / fps},{fps},{frame_idx}\n")
+
+class TestKeyframeIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_map_csv(self.tmp.name, "L01_V001", [(2, 50), (1, 0), (3, 125)])
+        write_map_csv(self.tmp.name, "L01_V002", [(1, 10), (2, 300)], fps=30.0)
+        self.index = KeyframeIndex.build(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookup_batch(self):
+        frame_idx, pts, fps = self.index.lookup_batch(
+            ["L01_V001", "L01_V002", "L01_V001", "L09_V999"], [3, 2, 7, 1])
+        np.testing.assert_array_equal(frame_idx, [125, 300, -1, -1])
+        self.assertAlmostEqual(pts[0], 5.0)
+        self.assertTrue(np.isnan(pts[2]))
+        np.testing.assert_array_equal(fps[:3], [25.0, 30.0, 25.0])
+        self.assertTrue(np.isnan(fps[3]))
+
+    def test_lookup_single_and_fps(self):
+        self.assertEqual(self.index.lookup("L01_V001", 2), (50, 2.0))
+        self.assertEqual(self.index.lookup("L01_V001", 9), (None, None))
+        self.assertEqual(self.index.get_fps("L01_V002"), 30.0)
+        self.assertIn("L01_V002", self.index)
+
+    def test_save_and_load_round_trip(self):
+        path = os.path.join(self.tmp.name, "keyframe_index.npz")
+        self.index.save(path)
+        loaded = KeyframeIndex.load(path)
+        n, frame_idx, _ = loaded.video_keyframes("L01_V001")
+        np.testing.assert_array_equal(n, [1, 2, 3])
+        np.testing.assert_array_equal(frame_idx, [0, 50, 125])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import json
+import os
+import tempfile
 import unittest
-from unittest.mock import patch, mock_open
-from data_loaders.metadata_loader import load_ocr_data
+from unittest.mock import MagicMock, patch, mock_open
+from data_loaders.frame_table import FrameTable
+from data_loaders.metadata_store import MetadataStore, read_frame_json, read_frame_lines
+from data_loaders.metadata_loader import load_ocr_data, load_object_data, load_metadata_batch, _load_frames_from_files
 
 class TestMetadataLoader(unittest.TestCase):
     @patch('builtins.open', new_callable=mock_open, read_data='{"1": ["text"]}')
@@ -12,5 +17,42 @@ class TestMetadataLoader(unittest.TestCase):
         self.assertIn('/path/to/image1.jpg', ocr_data)
         self.assertEqual(keywords, ['text'])
 
+class TestMetadataFileFallback(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, 'L01'))
+        with open(os.path.join(root, 'L01', 'V001.txt'), 'w') as f:
+            f.write("120 car\n1234 bus\n12 dog\n")
+        with open(os.path.join(root, 'L01', 'V001.json'), 'w') as f:
+            json.dump({"120": ["SALE"], "012": ["HA NOI"]}, f)
+        self.paths = [f"/data/Mid_Frames/L01/V001/{name}" for name in ('012.jpg', '120.jpg', '005.jpg')]
+        self.source_for = lambda extension: lambda data_part, video_id: os.path.join(root, data_part, video_id + extension)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_frames_match_exact_numbers(self):
+        data, terms = _load_frames_from_files(self.paths, self.source_for('.txt'), read_frame_lines)
+        self.assertEqual(data, {self.paths[0]: ['dog'], self.paths[1]: ['car']})
+        self.assertEqual(terms, ['car', 'dog'])
+        data, _ = _load_frames_from_files(self.paths, self.source_for('.json'), read_frame_json)
+        self.assertEqual(data, {self.paths[0]: ['HA NOI'], self.paths[1]: ['SALE']})
+
+    def test_frames_beyond_the_store_come_from_files(self):
+        table = FrameTable.from_id2img_fps({str(i): {'image_path': path} for i, path in enumerate(self.paths)})
+        # The store was built when only frame 0 existed
+        root = self.tmp.name
+        store = MetadataStore.build(FrameTable.from_id2img_fps({'0': {'image_path': self.paths[0]}}), root, root, root)
+        file_loader = MagicMock(return_value=({self.paths[2]: ['boat']}, ['boat']))
+        with patch('data_loaders.metadata_loader.load_metadata_store', return_value=store), \
+                patch('data_loaders.metadata_loader.load_frame_table', return_value=table), \
+                patch('data_loaders.metadata_loader._load_object_data_from_files', file_loader):
+            self.assertEqual(len(store), 1)
+            data, terms = load_object_data(self.paths)
+            self.assertEqual(file_loader.call_args.args[0], self.paths[1:])
+            self.assertEqual((data, terms), ({self.paths[0]: ['dog'], self.paths[2]: ['boat']}, ['boat', 'dog']))
+            self.assertEqual(load_metadata_batch(self.paths)[self.paths[2]]['objects'], ['boat'])
+
 if __name__ == '__main__':
     unittest.main()
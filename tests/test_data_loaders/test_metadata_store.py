@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+from data_loaders.frame_table import FrameTable
+from data_loaders.metadata_store import MetadataStore
+
+class TestMetadataStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        frames = os.path.join(root, 'Mid_Frames', 'L01', 'V001')
+        self.paths = [os.path.join(frames, name) for name in ('001.jpg', '010.jpg', '100.jpg')]
+        self.table = FrameTable.from_id2img_fps({str(i): {'image_path': path} for i, path in enumerate(self.paths)})
+
+        roots = {name: os.path.join(root, name) for name in ('ocr', 'classes', 'counts')}
+        for path in roots.values():
+            os.makedirs(os.path.join(path, 'L01'))
+        with open(os.path.join(roots['ocr'], 'L01', 'V001.json'), 'w') as f:
+            json.dump({"001": ["HA NOI"], "100": ["SALE", "HA NOI"]}, f)
+        with open(os.path.join(roots['classes'], 'L01', 'V001.txt'), 'w') as f:
+            f.write("10 person car\n1 dog\n")
+        with open(os.path.join(roots['counts'], 'L01', 'V001.txt'), 'w') as f:
+            f.write("010 2person 1car\n")
+        self.roots = roots
+        self.store = MetadataStore.build(self.table, roots['ocr'], roots['classes'], roots['counts'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_matches_exact_frame_numbers(self):
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.get_batch('objects', [0, 1, 2]), [['dog'], ['person', 'car'], []])
+        self.assertEqual(self.store.get_batch('counts', [1]), [['2person', '1car']])
+        self.assertEqual(self.store.get_batch('ocr', [2, 0]), [['SALE', 'HA NOI'], ['HA NOI']])
+
+    def test_unknown_ids_and_terms(self):
+        self.assertEqual(self.store.get_batch('objects', [-1, 7, 1]), [[], [], ['person', 'car']])
+        self.assertEqual(self.store.get_batch('objects', []), [])
+        self.assertEqual(self.store.terms('ocr', [0, 1, 2]), ['HA NOI', 'SALE'])
+        self.assertEqual(self.store.term_id('objects', 'car'), 2)
+        self.assertIsNone(self.store.term_id('objects', 'cat'))
+
+    def test_save_and_mmap_load(self):
+        store_dir = os.path.join(self.tmp.name, 'metadata_store')
+        self.store.save(store_dir)
+        self.store.save(store_dir)
+        loaded = MetadataStore.load(store_dir)
+        self.assertEqual(loaded.get_batch('objects', [0, 1, 2]), self.store.get_batch('objects', [0, 1, 2]))
+        self.assertEqual(loaded.get_batch('ocr', [2]), [['SALE', 'HA NOI']])
+        self.assertFalse(os.path.exists(f"{store_dir}.tmp"))
+
+    def test_extend_appends_new_frames_only(self):
+        os.makedirs(os.path.join(self.roots['classes'], 'L02'))
+        with open(os.path.join(self.roots['classes'], 'L02', 'V001.txt'), 'w') as f:
+            f.write("5 bus car\n")
+        new_path = os.path.join(self.tmp.name, 'Mid_Frames', 'L02', 'V001', '005.jpg')
+        table = FrameTable.from_id2img_fps({str(i): {'image_path': path} for i, path in enumerate(self.paths + [new_path])})
+
+        extended = self.store.extend(table, self.roots['ocr'], self.roots['classes'], self.roots['counts'])
+        self.assertEqual(len(extended), 4)
+        self.assertEqual(extended.get_batch('objects', [0, 1, 3]), [['dog'], ['person', 'car'], ['bus', 'car']])
+        # Existing term ids are kept, new terms are appended
+        self.assertEqual(extended.term_id('objects', 'car'), 2)
+        self.assertEqual(extended.term_id('objects', 'bus'), 3)
+        self.assertEqual(extended.get_batch('ocr', [2, 3]), [['SALE', 'HA NOI'], []])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from data_loaders.ocr_index import OcrIndex, fold_text, char_ngrams, quoted_text
+
+class TestOcrIndex(unittest.TestCase):
+    def setUp(self):
+        self.texts = {
+            0: ["LỄ KHAI MẠC", "Đà Nẵng"],
+            2: ["khai truong cua hang"],
+            3: ["Bản tin thời sự"],
+            5: ["KHAL MAC 2023"],
+        }
+        self.index = OcrIndex.build(self.texts.items(), size=7)
+
+    def test_fold_text(self):
+        self.assertEqual(fold_text("Lễ Khai Mạc, Đà Nẵng!"), "le khai mac da nang")
+        self.assertEqual(char_ngrams("Ăn"), [" an", "an "])
+
+    def test_quoted_text(self):
+        self.assertEqual(quoted_text("A man's sign reads 'GIẢM GIÁ'", 'Tấm biển ghi “giảm giá” và "50%"', None), "GIẢM GIÁ 50%")
+        self.assertIsNone(quoted_text("A man's dog and the boys' bikes", None))
+
+    def test_diacritic_insensitive_ranking(self):
+        frame_ids, scores = self.index.search("khai mạc", 3)
+        self.assertEqual(list(frame_ids[:2]), [0, 5])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+        frame_ids, _ = self.index.search("da nang", 5)
+        self.assertEqual(frame_ids[0], 0)
+        frame_ids, _ = self.index.search("xyz", 5)
+        self.assertEqual(len(frame_ids), 0)
+
+    def test_candidate_ids_and_save_load(self):
+        frame_ids, _ = self.index.search("khai", 5, candidate_ids=[2, 3])
+        self.assertEqual(list(frame_ids), [2])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ocr_index.npz')
+            self.index.save(path)
+            loaded = OcrIndex.load(path)
+        np.testing.assert_allclose(loaded.score("thoi su"), self.index.score("thoi su"))
+
+if __name__ == '__main__':
+    unittest.main()
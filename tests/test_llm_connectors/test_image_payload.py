@@ -0,0 +1,91 @@
+# tests/test_llm_connectors/test_image_payload.py
+import asyncio
+import base64
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from llm_connectors.image_payload import ImagePayloadCache, PayloadStats, estimate_image_tokens, prepare_image_payload, warm_image_payloads
+
+class TestImagePayload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image_path = os.path.join(self.tmp.name, '001.jpg')
+        Image.new('RGB', (1280, 720), 'blue').save(self.image_path, quality=95)
+        self.cache = ImagePayloadCache(max_entries=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prepare_downscales_and_reports_savings(self):
+        prepared = self.cache.prepare(self.image_path, 'openai', max_side=512, quality=80, detail='high')
+        self.assertEqual((prepared.width, prepared.height), (512, 288))
+        with Image.open(io.BytesIO(base64.b64decode(prepared.data))) as image:
+            self.assertEqual(image.size, (512, 288))
+        self.assertTrue(prepared.data_url.startswith('data:image/jpeg;base64,'))
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['tokens_saved'], 0)
+        self.assertGreater(stats['bytes_saved'], 0)
+
+    def test_repeat_calls_hit_cache_without_reencoding(self):
+        first = self.cache.prepare(self.image_path, 'anthropic', max_side=512, quality=80)
+        with patch.object(self.cache, '_encode') as encode:
+            second = self.cache.prepare(self.image_path, 'anthropic', max_side=512, quality=80)
+            encode.assert_not_called()
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.get_stats()['cache_hits'], 1)
+
+        # Different settings are cached separately
+        other = self.cache.prepare(self.image_path, 'anthropic', max_side=256, quality=80)
+        self.assertEqual(other.width, 256)
+        self.assertEqual(len(self.cache.payloads), 2)
+
+    def test_lru_eviction(self):
+        for max_side in (128, 256, 512):
+            self.cache.prepare(self.image_path, 'openai', max_side=max_side, quality=80)
+        self.assertEqual([key[1] for key in self.cache.payloads], [256, 512])
+
+    def test_estimate_image_tokens(self):
+        self.assertEqual(estimate_image_tokens('openai', 1280, 720, 'low'), 85)
+        self.assertEqual(estimate_image_tokens('openai', 1280, 720, 'high'), 85 + 170 * 6)
+        self.assertEqual(estimate_image_tokens('openai', 512, 288, 'high'), 85 + 170)
+        self.assertEqual(estimate_image_tokens('anthropic', 750, 100), 100)
+
+    def test_async_prepare(self):
+        with patch('llm_connectors.image_payload.payload_cache', self.cache):
+            prepared = asyncio.run(prepare_image_payload(self.image_path, 'openai', max_side=320))
+        self.assertEqual(prepared.width, 320)
+
+    def test_warm_fills_cache_without_counting_requests(self):
+        with patch('llm_connectors.image_payload.payload_cache', self.cache):
+            asyncio.run(warm_image_payloads([self.image_path, os.path.join(self.tmp.name, 'missing.jpg')]))
+        self.assertEqual(len(self.cache.payloads), 1)
+        self.assertEqual(self.cache.get_stats()['requests'], 0)
+        self.cache.prepare(self.image_path, 'openai')
+        self.assertEqual(self.cache.get_stats()['cache_hits'], 1)
+
+    def test_per_run_stats_are_separate(self):
+        first_run, second_run = PayloadStats(), PayloadStats()
+        with patch('llm_connectors.image_payload.payload_cache', self.cache):
+            asyncio.run(prepare_image_payload(self.image_path, 'openai', first_run, max_side=320))
+            asyncio.run(prepare_image_payload(self.image_path, 'openai', second_run, max_side=320))
+            asyncio.run(prepare_image_payload(self.image_path, 'openai', second_run, max_side=320))
+        self.assertEqual((first_run.as_dict()['requests'], first_run.as_dict()['cache_hits']), (1, 0))
+        self.assertEqual((second_run.as_dict()['requests'], second_run.as_dict()['cache_hits']), (2, 2))
+        self.assertEqual(self.cache.get_stats()['requests'], 3)
+        self.assertGreater(second_run.as_dict()['tokens_saved'], 0)
+
+    def test_digest_memo_is_bounded(self):
+        for i in range(4):
+            path = os.path.join(self.tmp.name, f'{i:03d}.png')
+            Image.new('RGB', (64, 64), (i, 0, 0)).save(path)
+            self.cache.warm(path)
+        self.assertEqual(len(self.cache.digests), 2)
+        self.assertEqual([key[0][-7:] for key in self.cache.digests], ['002.png', '003.png'])
+
+if __name__ == '__main__':
+    unittest.main()
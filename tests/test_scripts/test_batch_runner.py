@@ -0,0 +1,42 @@
+# tests/test_scripts/test_batch_runner.py
+import json
+import os
+import tempfile
+import unittest
+from scripts.batch_runner import read_queries, read_manifest, append_manifest, best_agent_result, format_base_time
+
+class TestBatchRunner(unittest.TestCase):
+    def test_read_queries_jsonl(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write(json.dumps({'query_id': 1, 'type': 'KIS', 'text': 'a red car'}) + '\n')
+            f.write(json.dumps({'query_id': 2, 'type': 'qa', 'text': 'how many people?', 'method': 'CLIP', 'top_k': 5}) + '\n')
+        queries = read_queries(f.name, default_top_k=20)
+        os.remove(f.name)
+
+        self.assertEqual(queries[0], {'query_id': '1', 'type': 'kis', 'text': 'a red car', 'method': 'Agent', 'top_k': 20})
+        self.assertEqual(queries[1]['method'], 'CLIP')
+        self.assertEqual(queries[1]['top_k'], 5)
+
+    def test_manifest_resume_ignores_failed_and_truncated_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'manifest.jsonl')
+            append_manifest({'query_id': '1', 'type': 'kis', 'status': 'done'}, path)
+            append_manifest({'query_id': '2', 'type': 'kis', 'status': 'failed'}, path)
+            with open(path, 'a') as f:
+                f.write('{"query_id": "3", "ty')
+            self.assertEqual(list(read_manifest(path)), [('1', 'kis')])
+
+    def test_best_agent_result(self):
+        results = [
+            {'image_path': 'a.jpg', 'match_assessment': {'category': 'Near Match', 'confidence': 0.9}},
+            {'image_path': 'b.jpg', 'match_assessment': {'category': 'Exact Match', 'confidence': 0.6}},
+            {'image_path': 'c.jpg', 'match_assessment': {'category': 'No Match', 'confidence': 1.0}},
+        ]
+        self.assertEqual(best_agent_result(results)['image_path'], 'b.jpg')
+        self.assertIsNone(best_agent_result(results[2:]))
+
+    def test_format_base_time(self):
+        self.assertEqual(format_base_time(75.4), '1:15')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# tests/test_scripts/test_ingest.py
+import argparse
+import json
+import os
+import tempfile
+import unittest
+
+import faiss
+import numpy as np
+
+from data_loaders.frame_table import FrameTable
+from scripts.ingest import (
+    find_frames, new_frames, commit_frames, next_frame_id, frames_missing_from, covered_frames, update_derived_stores
+)
+from utilities.sharded_index import build_sharded_index
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video_dir = os.path.join(self.tmp.name, 'Mid_Frames', 'L25', 'V001')
+        os.makedirs(self.video_dir)
+        for name in ('100.jpg', '020.jpg', '3.jpg', 'notes.txt', 'thumb_1.jpg'):
+            open(os.path.join(self.video_dir, name), 'w').close()
+        self.index_path = os.path.join(self.tmp.name, 'index.bin')
+        self.id2img_fps_path = os.path.join(self.tmp.name, 'id2img_fps.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_frames_sorted_by_keyframe_number(self):
+        frames = find_frames([os.path.join(self.tmp.name, 'Mid_Frames', 'L25')])
+        self.assertEqual([os.path.basename(path) for path in frames], ['3.jpg', '020.jpg', '100.jpg'])
+
+    def test_commit_appends_and_reruns_skip_known_frames(self):
+        index = faiss.IndexFlatIP(4)
+        index.add(np.eye(4, dtype=np.float32)[:2])
+        id2img_fps = {'0': {'image_path': 'a/1.jpg'}, '1': {'image_path': 'a/2.jpg'}}
+
+        frames = find_frames([self.video_dir])
+        vectors = np.eye(4, dtype=np.float32)[[2, 3, 3]]
+        first_id = commit_frames(index, id2img_fps, frames, vectors, self.index_path, self.id2img_fps_path)
+
+        self.assertEqual(first_id, 2)
+        self.assertEqual(faiss.read_index(self.index_path).ntotal, 5)
+        with open(self.id2img_fps_path) as f:
+            self.assertEqual(json.load(f)['2']['image_path'], frames[0])
+        self.assertEqual(new_frames(frames, id2img_fps), [])
+        self.assertEqual(next_frame_id(id2img_fps), 5)
+
+    def test_commit_trims_vectors_from_interrupted_run(self):
+        index = faiss.IndexFlatIP(4)
+        # Three vectors, but the crashed run never recorded id 2
+        index.add(np.eye(4, dtype=np.float32)[:3])
+        id2img_fps = {'0': {'image_path': 'a/1.jpg'}, '1': {'image_path': 'a/2.jpg'}}
+        commit_frames(index, id2img_fps, ['b/1.jpg'], np.eye(4, dtype=np.float32)[[3]], self.index_path, self.id2img_fps_path)
+        self.assertEqual(index.ntotal, 3)
+        _, I = index.search(np.eye(4, dtype=np.float32)[[3]], 1)
+        self.assertEqual(I[0][0], 2)
+
+    def test_new_frames_compare_directory_and_keyframe_number(self):
+        # Known under a non-normalized path and another zero padding
+        id2img_fps = {'0': {'image_path': os.path.join(self.video_dir, '..', 'V001', '0020.jpg')}}
+        relative = os.path.relpath(os.path.join(self.tmp.name, 'Mid_Frames', 'L25'))
+        frames = find_frames([relative])
+        self.assertTrue(all(os.path.isabs(path) for path in frames))
+        self.assertEqual([os.path.basename(path) for path in new_frames(frames, id2img_fps)], ['3.jpg', '100.jpg'])
+
+    def test_model_index_catches_up_with_id2img_fps(self):
+        id2img_fps = {str(i): {'image_path': f'a/{i}.jpg'} for i in range(4)}
+        index = faiss.IndexFlatIP(4)
+        # A previous run committed frames 2-3 but failed before extending this index
+        index.add(np.eye(4, dtype=np.float32)[:2])
+        self.assertEqual(frames_missing_from(index, id2img_fps), ['a/2.jpg', 'a/3.jpg'])
+
+        index.add(np.eye(4, dtype=np.float32))
+        self.assertEqual(frames_missing_from(index, id2img_fps), [])
+        self.assertEqual(index.ntotal, 4)
+
+    def test_derived_stores_catch_up_without_new_frames(self):
+        id2img_fps = {str(i): {'image_path': f'/data/Mid_Frames/{part}/V001/{i}.jpg'}
+                      for i, part in enumerate(['L01', 'L01', 'L02', 'L03'])}
+        index = faiss.IndexFlatIP(4)
+        index.add(np.eye(4, dtype=np.float32))
+        faiss.write_index(index, self.index_path)
+        args = argparse.Namespace(
+            index=self.index_path, frame_table=os.path.join(self.tmp.name, 'frame_table.npz'),
+            sharded_index=os.path.join(self.tmp.name, 'shards'), metadata_store=os.path.join(self.tmp.name, 'store'),
+            bitmap_index=os.path.join(self.tmp.name, 'bitmap'), ocr_index=os.path.join(self.tmp.name, 'ocr.npz'),
+            keyframe_index=os.path.join(self.tmp.name, 'keyframes.npz'), map_dir=os.path.join(self.tmp.name, 'maps')
+        )
+        # A run committed frames 2-3 to id2img_fps, then crashed before the derived structures
+        old_frames = {key: id2img_fps[key] for key in ('0', '1')}
+        FrameTable.from_id2img_fps(old_frames).save(args.frame_table)
+        small_index = faiss.IndexFlatIP(4)
+        small_index.add(np.eye(4, dtype=np.float32)[:2])
+        build_sharded_index(small_index, FrameTable.from_id2img_fps(old_frames), args.sharded_index)
+        self.assertEqual(covered_frames(args), {'frame_table': 2, 'sharded_index': 2})
+
+        update_derived_stores(id2img_fps, args)
+        self.assertEqual(covered_frames(args), {'frame_table': 4, 'sharded_index': 4})
+        self.assertEqual(sorted(np.load(os.path.join(args.sharded_index, 'L03_ids.npy'))), [3])
+
+        # Up-to-date structures are not rewritten
+        modified = os.path.getmtime(args.frame_table)
+        update_derived_stores(id2img_fps, args)
+        self.assertEqual(os.path.getmtime(args.frame_table), modified)
+
+if __name__ == '__main__':
+    unittest.main()
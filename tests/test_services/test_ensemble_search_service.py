@@ -0,0 +1,46 @@
+# tests/test_services/test_ensemble_search_service.py
+import unittest
+from unittest.mock import patch
+import numpy as np
+from services.ensemble_search_service import EnsembleSearchService
+
+# Ranked frame ids each model's index returns
+RANKINGS = {
+    'base': [0, 1, 2, 3],
+    'large': [2, 0, 4, 1],
+}
+
+def fake_search_image_by_text(encoder, index, text_query, top_k, candidate_ids=None):
+    ids = [frame_id for frame_id in RANKINGS[encoder] if candidate_ids is None or frame_id in candidate_ids][:top_k]
+    return np.array([ids]), np.array([[1.0 - 0.1 * rank for rank in range(len(ids))]])
+
+class TestEnsembleSearchService(unittest.TestCase):
+    def setUp(self):
+        id2img_fps = {str(i): {'image_path': f'image{i}.jpg'} for i in range(5)}
+        self.service = EnsembleSearchService({'base': ('base', None), 'large': ('large', None)}, id2img_fps)
+        patcher = patch('services.ensemble_search_service.search_image_by_text', side_effect=fake_search_image_by_text)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.service.executor.shutdown)
+
+    def test_fuses_rankings_of_all_models(self):
+        results = self.service.search("query", 3)
+        self.assertEqual([result['image_path'] for result in results], ['image0.jpg', 'image2.jpg', 'image1.jpg'])
+        # Each model's score is kept on the fused result
+        self.assertIn('distance_base', results[0])
+        self.assertIn('distance_large', results[0])
+
+    def test_model_toggle_and_candidates(self):
+        self.assertEqual(self.service.search_paths("query", 2, models=['large']), ['image2.jpg', 'image0.jpg'])
+        self.assertEqual(self.service.search_paths("query", 2, models=['base'], candidate_ids=np.array([1, 3])),
+                         ['image1.jpg', 'image3.jpg'])
+        with self.assertRaises(ValueError):
+            self.service.search("query", 2, models=['missing'])
+
+    def test_records_latency_per_model(self):
+        self.service.search("query", 3)
+        self.service.search("query", 3, models=['base'])
+        summary = self.service.latency_summary()
+        self.assertEqual(summary['base']['searches'], 2)
+        self.assertEqual(summary['large']['searches'], 1)
+        self.assertGreaterEqual(summary['base']['p95_ms'], 0)
@@ -0,0 +1,64 @@
+# tests/test_services/test_job_manager.py
+import asyncio
+import time
+import unittest
+from services.job_manager import JobManager, DONE, FAILED, CANCELLED
+
+def wait_for(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = JobManager(max_jobs=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_job_result_and_progress(self):
+        async def run(progress):
+            progress('search', 'scene 1')
+            return ['image1.jpg']
+
+        job = self.manager.get(self.manager.submit(run, key='query'))
+        wait_for(job)
+
+        self.assertEqual(job.status, DONE)
+        self.assertEqual(job.result, ['image1.jpg'])
+        self.assertEqual([event['stage'] for event in job.events], ['started', 'search', 'done'])
+        self.assertIs(self.manager.find_finished('query'), job)
+
+    def test_cancel_aborts_running_job(self):
+        async def run(progress):
+            await asyncio.sleep(10)
+
+        job = self.manager.get(self.manager.submit(run))
+        while job.status != 'running':
+            time.sleep(0.01)
+        self.assertTrue(self.manager.cancel(job.id))
+        wait_for(job)
+        self.assertEqual(job.status, CANCELLED)
+
+    def test_failed_job(self):
+        async def run(progress):
+            raise RuntimeError("LLM down")
+
+        job = self.manager.get(self.manager.submit(run))
+        wait_for(job)
+        self.assertEqual(job.status, FAILED)
+        self.assertEqual(job.error, "LLM down")
+
+    def test_prunes_oldest_finished_jobs(self):
+        async def run(progress):
+            return None
+
+        job_ids = []
+        for _ in range(3):
+            job_ids.append(self.manager.submit(run))
+            wait_for(self.manager.get(job_ids[-1]))
+        self.assertIsNone(self.manager.get(job_ids[0]))
+        self.assertIsNotNone(self.manager.get(job_ids[2]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# tests/test_services/test_search_filters.py
+import unittest
+import numpy as np
+from data_loaders.bitmap_index import BitmapIndex
+from data_loaders.frame_table import FrameTable
+from data_loaders.keyframe_index import KeyframeIndex
+from data_loaders.metadata_store import MetadataStore
+from services.search_filters import compile_filter
+
+ROOT = '/data/Mid_Frames'
+
+class TestSearchFilters(unittest.TestCase):
+    def setUp(self):
+        # ids 0-2: L01_V001 keyframes 1-3, ids 3-4: L01_V002 keyframes 1-2, id 5: L01_extra/V001 frame 500
+        paths = [f"{ROOT}/L01/V001/{n}.jpg" for n in (1, 2, 3)] + [f"{ROOT}/L01/V002/{n}.jpg" for n in (1, 2)]
+        paths.append(f"{ROOT}/L01_extra/V001/500.jpg")
+        self.table = FrameTable.from_id2img_fps({str(i): {'image_path': path} for i, path in enumerate(paths)})
+        # L01_V001 at 25 fps: keyframes at 0s, 10s, 40s; L01_V002 at 30 fps: 1s, 60s
+        self.keyframes = KeyframeIndex(['L01_V001', 'L01_V002'], [25.0, 30.0], [0, 3, 5],
+                                       [1, 2, 3, 1, 2], [0, 250, 1000, 30, 1800], [0, 10, 40, 1, 60])
+        objects = [['person'], ['person', 'bus'], ['bus'], [], ['bus'], ['person', 'bus']]
+        ocr = [['KHAI MAC'], [], ['bus stop'], [], ['Khai mạc'], []]
+        self.store = self.make_store({'objects': objects, 'counts': [[]] * 6, 'ocr': ocr})
+        self.bitmaps = BitmapIndex.build(self.store)
+
+    @staticmethod
+    def make_store(rows_by_field):
+        vocab, offsets, values = {}, {}, {}
+        for field, rows in rows_by_field.items():
+            vocab[field] = sorted({term for row in rows for term in row})
+            offsets[field] = np.concatenate([[0], np.cumsum([len(row) for row in rows])]).astype(np.int64)
+            values[field] = np.array([vocab[field].index(term) for row in rows for term in row], dtype=np.int32)
+        return MetadataStore(vocab, offsets, values)
+
+    def compile(self, filters):
+        result = compile_filter(filters, self.table, self.keyframes, self.store, self.bitmaps)
+        return None if result is None else list(result)
+
+    def test_empty_filter(self):
+        self.assertIsNone(self.compile(None))
+        self.assertIsNone(self.compile({'videos': [], 'objects': []}))
+
+    def test_videos_and_time_range(self):
+        self.assertEqual(self.compile({'videos': ['L01_V001']}), [0, 1, 2, 5])
+        self.assertEqual(self.compile({'parts': ['L01']}), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(self.compile({'parts': ['L02']}), [])
+        # The extra frame 500 at 25 fps is at 20s
+        self.assertEqual(self.compile({'videos': ['L01_V001'], 'time_range': [5, 30]}), [1, 5])
+        self.assertEqual(self.compile({'time_range': [0, 1]}), [0, 3])
+
+    def test_objects_and_ocr(self):
+        self.assertEqual(self.compile({'objects': ['person', 'bus']}), [1, 5])
+        self.assertEqual(self.compile({'objects': ['bus'], 'videos': ['L01_V002']}), [4])
+        self.assertEqual(self.compile({'ocr': ['khai mac']}), [0, 4])
+        self.assertEqual(self.compile({'ocr': ['khai', 'stop']}), [0, 2, 4])
+
+    def test_invalid_filters(self):
+        with self.assertRaises(ValueError):
+            self.compile({'colour': ['red']})
+        with self.assertRaises(ValueError):
+            compile_filter({'time_range': [0, 5]}, self.table)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# tests/test_services/test_video_aggregation.py
+import unittest
+import numpy as np
+from data_loaders.frame_table import FrameTable
+from data_loaders.keyframe_index import KeyframeIndex
+from services.video_aggregation import aggregate_by_video, frame_times, rank_videos
+
+class TestVideoAggregation(unittest.TestCase):
+    def setUp(self):
+        # Frames 0-9: L01_V001 keyframes 1-10; frames 10-14: L01_V002 keyframes 1-5; frame 15: an extra frame of V001
+        id2img_fps = {}
+        for frame_id in range(10):
+            id2img_fps[str(frame_id)] = {'image_path': f"/data/Mid_Frames/L01/V001/{frame_id + 1:03d}.jpg"}
+        for frame_id in range(10, 15):
+            id2img_fps[str(frame_id)] = {'image_path': f"/data/Mid_Frames/L01/V002/{frame_id - 9:03d}.jpg"}
+        id2img_fps['15'] = {'image_path': "/data/Mid_Frames/L01_extra/V001/2500.jpg"}
+        self.frame_table = FrameTable.from_id2img_fps(id2img_fps)
+        # Keyframe n of both videos is at frame 125 * n, 25 fps -> 5 s apart
+        n = np.arange(1, 11)
+        self.keyframe_index = KeyframeIndex(['L01_V001', 'L01_V002'], [25.0, 25.0], [0, 10, 15],
+                                            np.concatenate([n, n[:5]]), np.concatenate([n, n[:5]]) * 125,
+                                            np.concatenate([n, n[:5]]) * 5.0)
+
+    def test_frame_times(self):
+        times = frame_times(self.frame_table, self.keyframe_index, [0, 3, 11, 15])
+        np.testing.assert_allclose(times, [5.0, 20.0, 10.0, 100.0])
+        self.assertTrue(np.isnan(frame_times(self.frame_table, None, [0])).all())
+
+    def test_modes_rank_differently(self):
+        video_codes = [0, 1, 1, 1, 0]
+        times = [0.0, 10.0, 12.0, 300.0, 500.0]
+        scores = [0.9, 0.5, 0.5, 0.6, 0.2]
+        self.assertEqual(aggregate_by_video(video_codes, times, scores, 'max')['video_code'].tolist(), [0, 1])
+        self.assertEqual(aggregate_by_video(video_codes, times, scores, 'sum')['video_code'].tolist(), [1, 0])
+
+        density = aggregate_by_video(video_codes, times, scores, 'density', window_seconds=5)
+        self.assertEqual(density['video_code'].tolist(), [1, 0])
+        self.assertAlmostEqual(density['score'][0], 1.0)
+        self.assertEqual((density['window_start'][0], density['window_end'][0], density['window_hits'][0]), (10.0, 12.0, 2))
+
+        with self.assertRaises(ValueError):
+            aggregate_by_video(video_codes, times, scores, 'median')
+
+    def test_rank_videos_with_best_window(self):
+        frame_ids = np.array([12, 0, 1, 2, 13, -1])
+        scores = np.array([0.95, 0.8, 0.7, 0.6, 0.1, 0.5])
+        videos = rank_videos(self.frame_table, self.keyframe_index, frame_ids, scores, mode='density', window_seconds=10)
+        self.assertEqual([video['video'] for video in videos], ['L01_V001', 'L01_V002'])
+        first = videos[0]
+        self.assertEqual(first['hits'], 3)
+        self.assertEqual(first['frame_id'], 0)
+        self.assertEqual(first['image_path'], "/data/Mid_Frames/L01/V001/001.jpg")
+        self.assertEqual((first['window_start'], first['window_end'], first['window_hits']), (5.0, 15.0, 3))
+        self.assertEqual(len(rank_videos(self.frame_table, self.keyframe_index, frame_ids, scores, top_n=1)), 1)
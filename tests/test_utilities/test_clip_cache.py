@@ -0,0 +1,54 @@
+# tests/test_utilities/test_clip_cache.py
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from utilities.clip_cache import ClipCache
+
+class TestClipCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ClipCache(os.path.join(self.tmp.name, 'clips'), max_bytes=250, max_workers=2)
+        self.calls = 0
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.cache.executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    def fake_ffmpeg(self, command, **kwargs):
+        self.calls += 1
+        self.release.wait(5)
+        with open(command[-1], 'wb') as f:
+            f.write(b'x' * 100)
+
+    def test_concurrent_requests_share_one_extraction(self):
+        with patch('utilities.clip_cache.subprocess.run', side_effect=self.fake_ffmpeg):
+            first = self.cache.submit('L01_V001', '/videos/L01_V001.mp4', 0, 60)
+            second = self.cache.submit('L01_V001', '/videos/L01_V001.mp4', 0, 60)
+            self.release.set()
+            self.assertIs(first, second)
+            path, error = first.result()
+
+            self.assertIsNone(error)
+            self.assertTrue(os.path.exists(path))
+            # A later request is a cache hit
+            self.assertEqual(self.cache.get('L01_V001', '/videos/L01_V001.mp4', 0, 60), (path, None))
+        self.assertEqual(self.calls, 1)
+
+    def test_evicts_least_recently_used(self):
+        self.release.set()
+        with patch('utilities.clip_cache.subprocess.run', side_effect=self.fake_ffmpeg):
+            oldest, _ = self.cache.get('L01_V001', '/videos/L01_V001.mp4', 0, 60)
+            os.utime(oldest, (1, 1))
+            middle, _ = self.cache.get('L01_V001', '/videos/L01_V001.mp4', 60, 120)
+            os.utime(middle, (2, 2))
+            newest, _ = self.cache.get('L01_V002', '/videos/L01_V002.mp4', 0, 60)
+
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(middle))
+        self.assertTrue(os.path.exists(newest))
+
+if __name__ == '__main__':
+    unittest.main()
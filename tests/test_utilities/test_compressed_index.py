@@ -0,0 +1,52 @@
+# tests/test_utilities/test_compressed_index.py
+import os
+import tempfile
+import unittest
+
+import faiss
+import numpy as np
+
+from utilities.compressed_index import build_compressed_index, load_compressed_index
+from utilities.subset_search import search_subset
+
+def normalized(rows, d, seed):
+    vectors = np.random.default_rng(seed).normal(size=(rows, d)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+class TestCompressedIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.vectors = normalized(2000, 32, seed=0)
+        self.index = faiss.IndexFlatIP(32)
+        self.index.add(self.vectors)
+        self.queries = normalized(20, 32, seed=1)
+        _, self.truth = self.index.search(self.queries, 10)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, mode, **kwargs):
+        index_dir = os.path.join(self.tmp.name, mode)
+        build_compressed_index(self.index, mode, index_dir, pq_m=8, train_size=2000, **kwargs)
+        return load_compressed_index(index_dir, rerank_k=200)
+
+    def test_reranked_tiers_match_float32_ranking(self):
+        for mode in ('fp16', 'sq8', 'pq'):
+            compressed = self.build(mode)
+            D, I = compressed.search(self.queries, 10)
+            recall = np.mean([len(set(I[row]) & set(self.truth[row])) / 10 for row in range(len(I))])
+            self.assertGreaterEqual(recall, 0.95, mode)
+            self.assertTrue(np.all(D[:, :-1] >= D[:, 1:]))
+            self.assertLess(compressed.memory_bytes(), self.vectors.nbytes)
+
+    def test_candidate_search_and_reconstruct(self):
+        compressed = self.build('sq8')
+        candidates = np.arange(0, 2000, 7)
+        D, I = search_subset(compressed, self.queries[:2], 5, candidates)
+        self.assertTrue(np.isin(I, candidates).all())
+        expected = np.argsort(-(self.queries[:2] @ self.vectors[candidates].T), axis=1)[:, :5]
+        np.testing.assert_array_equal(I, candidates[expected])
+        np.testing.assert_allclose(compressed.reconstruct_batch([3, 1]), self.vectors[[3, 1]], atol=1e-3)
+
+if __name__ == '__main__':
+    unittest.main()
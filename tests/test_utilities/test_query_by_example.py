@@ -0,0 +1,37 @@
+# tests/test_utilities/test_query_by_example.py
+import unittest
+import faiss
+import numpy as np
+from utilities.query_by_example import example_query_vector, search_by_example
+
+class TestQueryByExample(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(200, 16)).astype(np.float32)
+        # Frames 10-14 are near-duplicates of frame 10
+        vectors[11:15] = vectors[10] + rng.normal(scale=0.05, size=(4, 16))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors
+        self.index = faiss.IndexFlatIP(16)
+        self.index.add(vectors)
+        # 20 videos of 10 frames each
+        self.video_codes = np.repeat(np.arange(20), 10).astype(np.int32)
+
+    def test_query_is_normalized_mean_of_examples(self):
+        query = example_query_vector(self.index, [3, 7])
+        expected = self.vectors[[3, 7]].mean(axis=0)
+        np.testing.assert_allclose(query[0], expected / np.linalg.norm(expected), rtol=1e-5)
+
+    def test_finds_near_duplicates_without_the_examples(self):
+        D, I = search_by_example(self.index, [10, 11], 3)
+        self.assertEqual(sorted(I[0].tolist()), [12, 13, 14])
+        self.assertTrue(np.all(np.diff(D[0]) <= 0))
+
+    def test_excludes_same_video_and_respects_candidates(self):
+        D, I = search_by_example(self.index, [10], 5, video_codes=self.video_codes)
+        self.assertFalse(np.any(self.video_codes[I[0]] == 1))
+
+        candidates = np.arange(0, 200, 2)
+        D, I = search_by_example(self.index, [10], 5, video_codes=self.video_codes, candidate_ids=candidates)
+        self.assertTrue(np.all(I[0] % 2 == 0))
+        self.assertFalse(np.any(self.video_codes[I[0]] == 1))
@@ -0,0 +1,19 @@
+# tests/test_utilities/test_rank_fusion.py
+import unittest
+from utilities.rank_fusion import reciprocal_rank_fusion
+
+class TestRankFusion(unittest.TestCase):
+    def test_fuses_and_merges_fields(self):
+        clip = [{'image_path': 'a', 'distance': 0.9}, {'image_path': 'b', 'distance': 0.8}]
+        ocr = [{'image_path': 'b', 'ocr_score': 7.5}, {'image_path': 'c', 'ocr_score': 2.0}]
+        fused = reciprocal_rank_fusion([clip, ocr], k=60)
+        self.assertEqual([result['image_path'] for result in fused], ['b', 'a', 'c'])
+        self.assertEqual(fused[0], {'image_path': 'b', 'distance': 0.8, 'ocr_score': 7.5,
+                                    'fused_score': 1 / 62 + 1 / 61})
+
+    def test_weights(self):
+        fused = reciprocal_rank_fusion([[{'image_path': 'a'}], [{'image_path': 'b'}]], weights=[1.0, 2.0])
+        self.assertEqual(fused[0]['image_path'], 'b')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+# tests/test_utilities/test_relevance_feedback.py
+import unittest
+import faiss
+import numpy as np
+from utilities.relevance_feedback import rocchio_query
+
+class TestRelevanceFeedback(unittest.TestCase):
+    def setUp(self):
+        self.vectors = np.eye(4, dtype=np.float32)
+        self.index = faiss.IndexFlatIP(4)
+        self.index.add(self.vectors)
+        self.text = np.array([[1.0, 1.0, 0.0, 0.0]], dtype=np.float32) / np.sqrt(2)
+
+    def test_without_feedback_returns_normalized_query(self):
+        np.testing.assert_allclose(rocchio_query(self.text, self.index), self.text, rtol=1e-6)
+
+    def test_moves_towards_selected_and_away_from_deleted(self):
+        query = rocchio_query(self.text, self.index, positive_ids=[1], negative_ids=[0], alpha=0.75, beta=0.25)
+        expected = self.text[0] + 0.75 * self.vectors[1] - 0.25 * self.vectors[0]
+        np.testing.assert_allclose(query[0], expected / np.linalg.norm(expected), rtol=1e-6)
+        self.assertAlmostEqual(float(np.linalg.norm(query)), 1.0, places=6)
+        # The selected frame now ranks first, the deleted one drops
+        _, I = self.index.search(query, 4)
+        self.assertEqual(I[0][0], 1)
+        self.assertLess(float(query[0, 0]), float(self.text[0, 0]))
+
+    def test_averages_multiple_feedback_frames(self):
+        query = rocchio_query(np.zeros((1, 4), dtype=np.float32), self.index, positive_ids=[2, 3], alpha=1.0)
+        np.testing.assert_allclose(query[0], [0, 0, np.sqrt(0.5), np.sqrt(0.5)], rtol=1e-6)
@@ -0,0 +1,61 @@
+# tests/test_utilities/test_sharded_index.py
+import os
+import tempfile
+import unittest
+
+import faiss
+import numpy as np
+
+from data_loaders.frame_table import FrameTable
+from utilities.sharded_index import ShardedIndex, build_sharded_index
+from utilities.subset_search import search_subset
+
+class TestShardedIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # Interleaved parts so shard rows differ from global ids; L01_extra belongs to the L01 shard
+        dirs = ['L01/V001', 'L02/V001', 'L01_extra/V001', 'L03/V002']
+        paths = [f"/data/Mid_Frames/{dirs[i % 4]}/{i}.jpg" for i in range(400)]
+        self.table = FrameTable.from_id2img_fps({str(i): {'image_path': path} for i, path in enumerate(paths)})
+        vectors = np.random.default_rng(0).normal(size=(400, 16)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.index = faiss.IndexFlatIP(16)
+        self.index.add(self.vectors)
+        self.queries = self.vectors[:3] + 0.1
+        self.index_dir = os.path.join(self.tmp.name, 'shards')
+        build_sharded_index(self.index, self.table, self.index_dir)
+        self.sharded = ShardedIndex.load(self.index_dir, max_workers=3)
+
+    def tearDown(self):
+        self.sharded.executor.shutdown()
+        self.tmp.cleanup()
+
+    def test_fan_out_matches_single_index(self):
+        self.assertEqual(self.sharded.parts, ['L01', 'L02', 'L03'])
+        D, I = self.sharded.search(self.queries, 10)
+        expected_D, expected_I = self.index.search(self.queries, 10)
+        np.testing.assert_array_equal(I, expected_I)
+        np.testing.assert_allclose(D, expected_D, rtol=1e-5)
+        np.testing.assert_allclose(self.sharded.reconstruct_batch([5, 2]), self.vectors[[5, 2]])
+
+    def test_scoped_and_candidate_search(self):
+        _, I = self.sharded.search(self.queries, 5, parts=['L02'])
+        self.assertTrue(np.all(I % 4 == 1))
+
+        candidates = np.arange(0, 400, 4)  # L01/V001 frames only
+        _, I = search_subset(self.sharded, self.queries, 5, candidates)
+        _, expected_I = search_subset(self.index, self.queries, 5, candidates)
+        np.testing.assert_array_equal(I, expected_I)
+
+    def test_unloaded_shards_are_skipped(self):
+        self.sharded.unload_shard('L01')
+        self.assertEqual(self.sharded.loaded_parts, ['L02', 'L03'])
+        _, I = self.sharded.search(self.queries, 20)
+        self.assertFalse(np.isin(I % 4, [0, 2]).any())
+        with self.assertRaises(KeyError):
+            self.sharded.reconstruct_batch([0])
+        self.sharded.load_shard('L01')
+        self.assertEqual(self.sharded.search(self.queries, 10)[1].tolist(), self.index.search(self.queries, 10)[1].tolist())
+
+if __name__ == '__main__':
+    unittest.main()
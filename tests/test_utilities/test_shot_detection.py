@@ -0,0 +1,34 @@
+# tests/test_utilities/test_shot_detection.py
+import unittest
+import numpy as np
+from utilities.shot_detection import ShotDetector, frame_histograms, shot_keyframes
+
+def solid_frames(colour, count, noise=0, seed=0):
+    frames = np.tile(np.array(colour, dtype=np.int16), (count, 9, 16, 1))
+    frames += np.random.default_rng(seed).integers(-noise, noise + 1, frames.shape) if noise else 0
+    return np.clip(frames, 0, 255).astype(np.uint8)
+
+class TestShotDetection(unittest.TestCase):
+    def test_histograms_are_normalized_per_channel(self):
+        histograms = frame_histograms(solid_frames((0, 128, 255), 2))
+        self.assertEqual(histograms.shape, (2, 48))
+        np.testing.assert_allclose(histograms.reshape(2, 3, 16).sum(axis=2), 1.0)
+        self.assertEqual(histograms[0, 16 + 8], 1.0)
+
+    def test_detects_cuts_across_chunks(self):
+        detector = ShotDetector()
+        video = np.concatenate([solid_frames((20, 20, 20), 30, noise=3), solid_frames((200, 40, 40), 25, noise=3, seed=1),
+                                solid_frames((30, 160, 220), 40, noise=3, seed=2)])
+        for start in range(0, len(video), 16):
+            detector.update(video[start:start + 16])
+        self.assertEqual(detector.n_frames, 95)
+        self.assertEqual(detector.boundaries().tolist(), [0, 30, 55])
+        # A cut too close to the previous one is ignored, merging the short shot into the next
+        self.assertEqual(detector.boundaries(min_shot_frames=26).tolist(), [0, 30])
+
+    def test_shot_keyframes(self):
+        self.assertEqual(shot_keyframes(np.array([0, 30, 55]), 95).tolist(), [15, 42, 75])
+        self.assertEqual(shot_keyframes(np.array([0]), 100, max_shot_frames=40).tolist(), [16, 50, 83])
+
+if __name__ == '__main__':
+    unittest.main()
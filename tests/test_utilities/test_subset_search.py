@@ -0,0 +1,53 @@
+# tests/test_utilities/test_subset_search.py
+import unittest
+import faiss
+import numpy as np
+from utilities.subset_search import search_subset
+
+class TestSubsetSearch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((500, 16)).astype(np.float32)
+        self.queries = rng.standard_normal((2, 16)).astype(np.float32)
+        self.candidates = np.sort(rng.choice(500, 40, replace=False))
+
+    def expected(self, index, top_k):
+        subset = faiss.IndexFlat(16, index.metric_type)
+        subset.add(self.vectors[self.candidates])
+        D, I = subset.search(self.queries, top_k)
+        return D, self.candidates[I]
+
+    def test_reconstruct_and_selector_paths_agree(self):
+        for index in (faiss.IndexFlatIP(16), faiss.IndexFlatL2(16)):
+            index.add(self.vectors)
+            expected_D, expected_I = self.expected(index, 5)
+            for reconstruct_limit in (1000, 0):
+                D, I = search_subset(index, self.queries, 5, self.candidates, reconstruct_limit)
+                np.testing.assert_array_equal(I, expected_I)
+                np.testing.assert_allclose(D, expected_D, rtol=1e-4, atol=1e-4)
+                self.assertTrue(np.isin(I, self.candidates).all())
+
+    def test_small_and_empty_candidate_sets(self):
+        index = faiss.IndexFlatIP(16)
+        index.add(self.vectors)
+        for reconstruct_limit in (1000, 0):
+            D, I = search_subset(index, self.queries, 10, [3, 7], reconstruct_limit=reconstruct_limit)
+            self.assertEqual(I.shape, (2, 10))
+            self.assertEqual(sorted(I[0][:2]), [3, 7])
+            self.assertTrue((I[:, 2:] == -1).all())
+        D, I = search_subset(index, self.queries, 10, [])
+        self.assertEqual(I.shape, (2, 10))
+        self.assertTrue((I == -1).all())
+
+    def test_ivf_index_uses_ivf_selector_parameters(self):
+        quantizer = faiss.IndexFlatIP(16)
+        index = faiss.IndexIVFFlat(quantizer, 16, 4, faiss.METRIC_INNER_PRODUCT)
+        index.train(self.vectors)
+        index.add(self.vectors)
+        index.nprobe = 4
+        # Without a direct map the reconstruct path fails and the selector is used
+        D, I = search_subset(index, self.queries, 5, self.candidates)
+        np.testing.assert_array_equal(I, self.expected(index, 5)[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+# tests/test_utilities/test_text_encoder.py
+import unittest
+import clip
+import torch
+from clip.model import CLIP
+from utilities.text_encoder import TextEncoder, REFERENCE_QUERIES, encoder_cosines, quantize_text_encoder
+
+class TestTextEncoder(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        # Tiny randomly initialized CLIP with the real tokenizer's vocabulary and context length
+        self.model = CLIP(embed_dim=32, image_resolution=32, vision_layers=1, vision_width=64, vision_patch_size=16,
+                          context_length=77, vocab_size=49408, transformer_width=64, transformer_heads=2,
+                          transformer_layers=2).eval()
+        self.tokens = clip.tokenize(REFERENCE_QUERIES)
+
+    def test_matches_full_model_text_embeddings(self):
+        encoder = TextEncoder(self.model).eval()
+        with torch.no_grad():
+            expected = self.model.encode_text(self.tokens)
+            actual = encoder.encode_text(self.tokens)
+        self.assertTrue(torch.allclose(actual, expected, atol=1e-5))
+        self.assertFalse(any(name.startswith('visual') for name, _ in encoder.named_parameters()))
+
+    def test_int8_stays_close_to_float(self):
+        encoder = TextEncoder(self.model).eval()
+        quantized = quantize_text_encoder(encoder)
+        cosines = encoder_cosines(quantized, encoder, 'cpu')
+        self.assertEqual(len(cosines), len(REFERENCE_QUERIES))
+        self.assertGreater(float(cosines.min()), 0.95)
+        # The float encoder is left untouched
+        self.assertIsInstance(encoder.transformer.resblocks[0].mlp.c_fc, torch.nn.Linear)
@@ -0,0 +1,41 @@
+# tests/test_utilities/test_thumbnail_utils.py
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from utilities.thumbnail_utils import get_thumbnail, build_thumbnails
+
+class TestThumbnailUtils(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        frame_dir = os.path.join(self.tmp.name, 'Mid_Frames', 'L01', 'V001')
+        os.makedirs(frame_dir)
+        self.image_path = os.path.join(frame_dir, '001.jpg')
+        Image.new('RGB', (1280, 720), 'red').save(self.image_path)
+        self.thumbnail_dir = os.path.join(self.tmp.name, 'thumbnails')
+        self.config = patch.multiple('utilities.thumbnail_utils.Config', THUMBNAIL_DIR=self.thumbnail_dir,
+                                     THUMBNAIL_MAX_SIDE=320, THUMBNAIL_QUALITY=70, THUMBNAIL_FORMAT='webp')
+        self.config.start()
+
+    def tearDown(self):
+        self.config.stop()
+        self.tmp.cleanup()
+
+    def test_get_thumbnail_generates_mirrored_layout(self):
+        thumbnail = get_thumbnail(self.image_path)
+        self.assertEqual(thumbnail, os.path.join(self.thumbnail_dir, 'L01', 'V001', '001.webp'))
+        with Image.open(thumbnail) as image:
+            self.assertEqual(image.size, (320, 180))
+        self.assertLess(os.path.getsize(thumbnail), os.path.getsize(self.image_path))
+
+    def test_get_thumbnail_falls_back_to_original(self):
+        missing = os.path.join(self.tmp.name, 'Mid_Frames', 'L01', 'V001', '002.jpg')
+        self.assertEqual(get_thumbnail(missing), missing)
+
+    def test_build_thumbnails_skips_existing(self):
+        self.assertEqual(build_thumbnails([self.image_path], workers=1), (1, 0))
+        self.assertEqual(build_thumbnails([self.image_path], workers=1), (0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# utilities/clip_cache.py
+"""
+Content-addressed cache for extracted video clips.
+
+Clips are keyed by (source video, start, end) and stored in a dedicated
+directory. A bounded ffmpeg worker pool does the cutting; concurrent requests
+for the same clip share one job. The directory is kept under a size limit by
+evicting least recently used clips.
+"""
+import hashlib
+import os
+import subprocess
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import streamlit as st
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ClipCache:
+    def __init__(self, cache_dir, max_bytes, max_workers=2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ffmpeg")
+        self.in_flight = {}
+        self.lock = threading.RLock()
+
+    def clip_path(self, video_id, video_path, start_time, end_time):
+        key = f"{os.path.abspath(video_path)}|{start_time:.3f}|{end_time:.3f}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{video_id}_{int(start_time)}_{int(end_time)}_{digest}.mp4")
+
+    def submit(self, video_id, video_path, start_time, end_time):
+        """Future resolving to (clip_path, error). Cached and in-flight clips are shared."""
+        output_path = self.clip_path(video_id, video_path, start_time, end_time)
+        with self.lock:
+            try:
+                # Touch on hit so eviction sees the clip as recently used
+                os.utime(output_path)
+                future = Future()
+                future.set_result((output_path, None))
+                return future
+            except FileNotFoundError:
+                pass
+            future = self.in_flight.get(output_path)
+            if future is None:
+                future = self.executor.submit(self._extract, video_path, output_path, start_time, end_time)
+                self.in_flight[output_path] = future
+                future.add_done_callback(lambda _: self._finish(output_path))
+            return future
+
+    def get(self, video_id, video_path, start_time, end_time):
+        return self.submit(video_id, video_path, start_time, end_time).result()
+
+    def prefetch(self, clips):
+        """Queue (video_id, video_path, start_time, end_time) clips without waiting for them."""
+        for clip in clips:
+            self.submit(*clip)
+
+    def _finish(self, output_path):
+        with self.lock:
+            self.in_flight.pop(output_path, None)
+
+    def _extract(self, video_path, output_path, start_time, end_time):
+        tmp_path = f"{output_path}.part.mp4"
+        command = [
+            "ffmpeg", "-y", "-ss", str(start_time), "-to", str(end_time),
+            "-i", video_path, "-c", "copy", tmp_path
+        ]
+        try:
+            subprocess.run(command, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None, f"Error executing ffmpeg: {e.stderr}"
+
+        os.replace(tmp_path, output_path)
+        self.evict(keep=output_path)
+        return output_path, None
+
+    def evict(self, keep=None):
+        """Delete least recently used clips until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith('.mp4') or name.endswith('.part.mp4'):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                logger.debug(f"Evicted clip {path}")
+            except FileNotFoundError:
+                pass
+
+
+@st.cache_resource
+def get_clip_cache():
+    return ClipCache(Config.CLIP_CACHE_DIR, Config.CLIP_CACHE_MAX_MB * 1024 * 1024, Config.FFMPEG_WORKERS)
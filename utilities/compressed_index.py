@@ -0,0 +1,230 @@
+# utilities/compressed_index.py
+"""
+Compressed storage tiers for the CLIP index with exact re-ranking.
+
+The searchable index holds compact codes (fp16 or int8 scalar quantization,
+or product quantization) and only that lives in RAM. Every vector is also
+kept as fp16 in a memory-mapped .npy file; the top `rerank_k` candidates
+from the codes are re-scored exactly against it, so ranking quality stays
+close to the float32 index while RAM drops to 1/2 (fp16), 1/4 (sq8) or
+~1/8-1/32 (pq).
+
+A compressed index directory holds:
+    codes.index        FAISS index over the codes
+    vectors_fp16.npy   all vectors, row = global frame id
+    meta.json          mode, metric, dimension and size
+
+Build from the float32 index with:
+    python -m utilities.compressed_index --mode sq8
+"""
+import argparse
+import json
+import os
+import shutil
+import logging
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FLOAT32_INDEX_PATH = "/content/drive/MyDrive/HCMC_AI/data/faiss_clip_16_full_v3.bin"
+COMPRESSED_INDEX_ROOT = "/content/drive/MyDrive/HCMC_AI/data"
+
+STORAGE_MODES = ('float32', 'fp16', 'sq8', 'pq')
+RERANK_K = 400
+# Candidate sets up to this size are scored directly against the fp16 vectors
+EXACT_CANDIDATE_LIMIT = 20000
+BUILD_CHUNK = 65536
+TRAIN_SIZE = 100000
+
+
+def compressed_index_dir(mode, root=COMPRESSED_INDEX_ROOT):
+    return os.path.join(root, f"faiss_clip_16_{mode}")
+
+
+def model_index_path(model_name, root=COMPRESSED_INDEX_ROOT):
+    """Float32 index of another CLIP model, e.g. ViT-L/14 -> faiss_clip_vit-l-14.bin (ViT-B/16 is FLOAT32_INDEX_PATH)."""
+    if model_name == "ViT-B/16":
+        return FLOAT32_INDEX_PATH
+    slug = model_name.lower().replace('/', '-').replace('@', '-')
+    return os.path.join(root, f"faiss_clip_{slug}.bin")
+
+
+def codes_index_factory(mode, d, metric, pq_m=64, pq_bits=8):
+    if mode == 'fp16':
+        return faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, metric)
+    if mode == 'sq8':
+        return faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, metric)
+    if mode == 'pq':
+        return faiss.IndexPQ(d, pq_m, pq_bits, metric)
+    raise ValueError(f"Unsupported storage mode: {mode} (expected one of {STORAGE_MODES[1:]})")
+
+
+class CompressedIndex:
+    """FAISS-compatible search over a codes index, re-ranked exactly with mmap'd fp16 vectors."""
+
+    def __init__(self, codes_index, vectors, mode, rerank_k=RERANK_K):
+        self.codes_index = codes_index
+        self.vectors = vectors
+        self.mode = mode
+        # fp16 codes already are the re-ranking vectors
+        self.rerank_k = 0 if mode == 'fp16' else rerank_k
+
+    @property
+    def ntotal(self):
+        return self.codes_index.ntotal
+
+    @property
+    def d(self):
+        return self.codes_index.d
+
+    @property
+    def metric_type(self):
+        return self.codes_index.metric_type
+
+    def memory_bytes(self):
+        """RAM held by the codes (the fp16 vectors are paged in from disk on demand)."""
+        return self.codes_index.sa_code_size() * self.ntotal
+
+    def reconstruct(self, frame_id):
+        return np.asarray(self.vectors[frame_id], dtype=np.float32)
+
+    def reconstruct_batch(self, frame_ids):
+        return self.exact_vectors(np.asarray(frame_ids, dtype=np.int64))
+
+    def exact_vectors(self, frame_ids):
+        # Sorted unique reads keep the mmap access sequential
+        unique_ids, inverse = np.unique(frame_ids, return_inverse=True)
+        return np.asarray(self.vectors[unique_ids], dtype=np.float32)[inverse]
+
+    def exact_scores(self, query_vectors, vectors):
+        if self.metric_type == faiss.METRIC_INNER_PRODUCT:
+            return query_vectors @ vectors.T
+        return -((query_vectors[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+
+    def rerank(self, query_vectors, candidate_ids, top_k):
+        """Exact top_k among per-query `candidate_ids` (-1 padded), as FAISS (D, I)."""
+        n_queries = len(query_vectors)
+        D = np.full((n_queries, top_k), -np.inf if self.metric_type == faiss.METRIC_INNER_PRODUCT else np.inf, dtype=np.float32)
+        I = np.full((n_queries, top_k), -1, dtype=np.int64)
+        for row in range(n_queries):
+            ids = candidate_ids[row][candidate_ids[row] >= 0]
+            if len(ids) == 0:
+                continue
+            scores = self.exact_scores(query_vectors[row:row + 1], self.exact_vectors(ids))[0]
+            order = np.argsort(-scores, kind='stable')[:top_k]
+            I[row, :len(order)] = ids[order]
+            D[row, :len(order)] = scores[order] if self.metric_type == faiss.METRIC_INNER_PRODUCT else -scores[order]
+        return D, I
+
+    def search(self, query_vectors, top_k, params=None):
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        fetch_k = max(top_k, self.rerank_k)
+        D, I = self.codes_index.search(query_vectors, fetch_k, params=params)
+        if not self.rerank_k:
+            return D[:, :top_k], I[:, :top_k]
+        return self.rerank(query_vectors, I, top_k)
+
+    def search_candidates(self, query_vectors, top_k, candidate_ids):
+        """`search` limited to `candidate_ids` (hook used by utilities.subset_search)."""
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        candidate_ids = candidate_ids[(candidate_ids >= 0) & (candidate_ids < self.ntotal)]
+        if len(candidate_ids) <= EXACT_CANDIDATE_LIMIT:
+            return self.rerank(query_vectors, np.tile(candidate_ids, (len(query_vectors), 1)), top_k)
+
+        mask = np.zeros(self.ntotal, dtype=bool)
+        mask[candidate_ids] = True
+        bits = np.packbits(mask, bitorder='little')
+        selector = faiss.IDSelectorBitmap(self.ntotal, faiss.swig_ptr(bits))
+        try:
+            return self.search(query_vectors, top_k, params=faiss.SearchParameters(sel=selector))
+        except RuntimeError as e:
+            # IndexPQ does not take id selectors; score the candidates in chunks instead
+            logger.debug(f"Selector search failed, scoring candidates exactly: {e}")
+        return self.search_exact_chunked(query_vectors, top_k, candidate_ids)
+
+    def search_exact_chunked(self, query_vectors, top_k, candidate_ids):
+        best_D, best_I = None, None
+        for start in range(0, len(candidate_ids), EXACT_CANDIDATE_LIMIT):
+            chunk = candidate_ids[start:start + EXACT_CANDIDATE_LIMIT]
+            D, I = self.rerank(query_vectors, np.tile(chunk, (len(query_vectors), 1)), top_k)
+            if best_D is not None:
+                D, I = np.hstack([best_D, D]), np.hstack([best_I, I])
+                order = np.argsort(-D if self.metric_type == faiss.METRIC_INNER_PRODUCT else D, axis=1, kind='stable')[:, :top_k]
+                D, I = np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+            best_D, best_I = D, I
+        return best_D, best_I
+
+
+def build_compressed_index(index, mode, output_dir, pq_m=64, pq_bits=8, train_size=TRAIN_SIZE, seed=0):
+    """Write a compressed copy of the float32 `index` to `output_dir` (tmp dir, then swapped in)."""
+    n, d = index.ntotal, index.d
+    tmp_dir = f"{output_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    vectors = np.lib.format.open_memmap(os.path.join(tmp_dir, 'vectors_fp16.npy'), mode='w+', dtype=np.float16, shape=(n, d))
+    for start in range(0, n, BUILD_CHUNK):
+        count = min(BUILD_CHUNK, n - start)
+        vectors[start:start + count] = index.reconstruct_n(start, count).astype(np.float16)
+    vectors.flush()
+
+    codes_index = codes_index_factory(mode, d, index.metric_type, pq_m, pq_bits)
+    if not codes_index.is_trained:
+        sample = np.random.default_rng(seed).choice(n, size=min(train_size, n), replace=False)
+        codes_index.train(np.asarray(vectors[np.sort(sample)], dtype=np.float32))
+    for start in range(0, n, BUILD_CHUNK):
+        codes_index.add(np.asarray(vectors[start:start + BUILD_CHUNK], dtype=np.float32))
+    faiss.write_index(codes_index, os.path.join(tmp_dir, 'codes.index'))
+    with open(os.path.join(tmp_dir, 'meta.json'), "w") as f:
+        json.dump({'mode': mode, 'metric_type': int(index.metric_type), 'd': d, 'ntotal': n,
+                   'pq_m': pq_m, 'pq_bits': pq_bits}, f)
+    del vectors
+
+    old_dir = f"{output_dir}.old"
+    if os.path.exists(output_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def rebuild_compressed_index(index, index_dir):
+    """Rebuild an existing tier from the (grown) float32 `index` with its original settings."""
+    with open(os.path.join(index_dir, 'meta.json'), "r") as f:
+        meta = json.load(f)
+    build_compressed_index(index, meta['mode'], index_dir, meta.get('pq_m', 64), meta.get('pq_bits', 8))
+
+
+def load_compressed_index(index_dir, rerank_k=RERANK_K):
+    with open(os.path.join(index_dir, 'meta.json'), "r") as f:
+        meta = json.load(f)
+    codes_index = faiss.read_index(os.path.join(index_dir, 'codes.index'))
+    vectors = np.load(os.path.join(index_dir, 'vectors_fp16.npy'), mmap_mode='r')
+    if codes_index.ntotal != len(vectors):
+        raise ValueError(f"{index_dir} is inconsistent: {codes_index.ntotal} codes for {len(vectors)} vectors")
+    return CompressedIndex(codes_index, vectors, meta['mode'], rerank_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compressed copy of the CLIP FAISS index")
+    parser.add_argument('--mode', choices=STORAGE_MODES[1:], default='sq8')
+    parser.add_argument('--index', default=FLOAT32_INDEX_PATH)
+    parser.add_argument('--output', help="defaults to faiss_clip_16_<mode> next to the float32 index")
+    parser.add_argument('--pq-m', type=int, default=64, help="PQ sub-quantizers (must divide the dimension)")
+    parser.add_argument('--pq-bits', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    output = args.output or compressed_index_dir(args.mode, os.path.dirname(args.index))
+    index = faiss.read_index(args.index)
+    build_compressed_index(index, args.mode, output, args.pq_m, args.pq_bits)
+    compressed = load_compressed_index(output)
+    logger.info(f"Wrote {compressed.ntotal} vectors to {output}: {compressed.memory_bytes() / 2**20:.1f} MiB of codes "
+                f"vs {index.ntotal * index.d * 4 / 2**20:.1f} MiB float32")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,10 @@
 import csv
 import io
-import pandas as pd
 import os
 import streamlit as st
 
+from data_loaders.keyframe_index import get_video_fps
+
 # Calculate frame index from time and fps
 def calculate_frame_idx(time_str, fps):
     minutes, seconds = map(int, time_str.split(':'))
@@ -12,10 +13,8 @@ def calculate_frame_idx(time_str, fps):
 
 # Create CSV content
 def create_csv_content(x, y, video_id, base_time, answer=None):
-    csv_path = f"/content/drive/MyDrive/HCMC_AI/data/map-keyframes/{video_id}.csv"
     try:
-        df = pd.read_csv(csv_path)
-        fps = df['fps'].iloc[0]
+        fps = get_video_fps(video_id)
     except Exception as e:
         st.error(f"Error reading CSV file: {e}")
         return None, None
@@ -40,10 +39,8 @@ def create_csv_content(x, y, video_id, base_time, answer=None):
 
 # Create CSV file
 def create_csv_file(x, y, video_id, base_time, answer=None):
-    csv_path = f"/content/drive/MyDrive/HCMC_AI/data/map-keyframes/{video_id}.csv"
     try:
-        df = pd.read_csv(csv_path)
-        fps = df['fps'].iloc[0]
+        fps = get_video_fps(video_id)
     except Exception as e:
         st.error(f"Error reading CSV file: {e}")
         return None, None
@@ -11,17 +11,60 @@ from pinecone import Pinecone, ServerlessSpec
 from typing import List, Tuple, Dict, Any
 
 from config import Config
+from utilities.subset_search import search_subset
+from utilities.relevance_feedback import rocchio_query
+from utilities.compressed_index import FLOAT32_INDEX_PATH, compressed_index_dir, load_compressed_index, model_index_path
+from utilities.sharded_index import SHARDED_INDEX_DIR, ShardedIndex
+from utilities.text_encoder import CLIP_MODEL_NAME, load_text_encoder
+from data_loaders.ocr_index import load_ocr_index
+from data_loaders.frame_table import load_frame_table
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
 # Load model and FAISS index with caching
 @st.cache_resource
 def load_model():
-    return clip.load("ViT-B/16", device=device)
+    """(query encoder, preprocess): the CLIP text tower per TEXT_ENCODER_MODE, int8-quantized on CPU by default."""
+    return load_text_encoder(Config.TEXT_ENCODER_MODE, device, Config.TEXT_ENCODER_THREADS, Config.TEXT_ENCODER_MIN_COSINE)
 
 @st.cache_resource
-def load_faiss_index():
-    return faiss.read_index("/content/drive/MyDrive/HCMC_AI/data/faiss_clip_16_full_v3.bin")
+def load_faiss_index(storage_mode: str = None):
+    """
+    The CLIP index: per-data-part shards if FAISS_SHARDED (float32 shards,
+    limited to FAISS_SHARD_PARTS if set), otherwise FAISS_STORAGE_MODE
+    float32 or a compressed tier (fp16/sq8/pq) with exact re-ranking.
+    """
+    if Config.FAISS_SHARDED:
+        if os.path.exists(os.path.join(SHARDED_INDEX_DIR, 'meta.json')):
+            return ShardedIndex.load(SHARDED_INDEX_DIR, Config.FAISS_SHARD_PARTS or None, Config.FAISS_SHARD_THREADS)
+        st.warning(f"Sharded index {SHARDED_INDEX_DIR} not built, loading a single index")
+    storage_mode = storage_mode or Config.FAISS_STORAGE_MODE
+    if storage_mode != 'float32':
+        index_dir = compressed_index_dir(storage_mode)
+        if os.path.exists(os.path.join(index_dir, 'meta.json')):
+            return load_compressed_index(index_dir, Config.FAISS_RERANK_K)
+        st.warning(f"Compressed index {index_dir} not built, loading the float32 index")
+    return faiss.read_index(FLOAT32_INDEX_PATH)
+
+@st.cache_resource
+def load_ensemble_members():
+    """
+    {model name: (query encoder, index)} for ENSEMBLE_MODELS whose index is
+    built; ViT-B/16 reuses the main model and index.
+    """
+    members = {}
+    for model_name in Config.ENSEMBLE_MODELS:
+        if model_name == CLIP_MODEL_NAME:
+            members[model_name] = (load_model()[0], load_faiss_index())
+            continue
+        index_path = model_index_path(model_name)
+        if not os.path.exists(index_path):
+            st.warning(f"No index for {model_name} at {index_path}, leaving it out of the ensemble")
+            continue
+        encoder, _ = load_text_encoder(Config.TEXT_ENCODER_MODE, device, Config.TEXT_ENCODER_THREADS,
+                                       Config.TEXT_ENCODER_MIN_COSINE, model_name)
+        members[model_name] = (encoder, faiss.read_index(index_path))
+    return members
 
 @st.cache_data
 def load_id2img_fps():
@@ -35,9 +78,23 @@ def encode_text(model: Any, text_query: str) -> torch.Tensor:
         text_features = model.encode_text(text)
     return text_features / text_features.norm(dim=-1, keepdim=True)
 
-def search_image_by_text(model: Any, index: Any, text_query: str, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+def search_image_by_text(model: Any, index: Any, text_query: str, top_k: int, candidate_ids: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
     text_features = encode_text(model, text_query).cpu().numpy()
-    D, I = index.search(text_features, top_k)
+    if candidate_ids is not None:
+        D, I = search_subset(index, text_features, top_k, candidate_ids)
+    else:
+        D, I = index.search(text_features, top_k)
+    return I, D
+
+def search_image_by_text_with_feedback(model: Any, index: Any, text_query: str, top_k: int, positive_ids: np.ndarray,
+                                       negative_ids: np.ndarray, candidate_ids: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """`search_image_by_text` with the query moved towards `positive_ids` and away from `negative_ids` (Rocchio)."""
+    text_features = encode_text(model, text_query).cpu().numpy()
+    query = rocchio_query(text_features, index, positive_ids, negative_ids, Config.ROCCHIO_ALPHA, Config.ROCCHIO_BETA)
+    if candidate_ids is not None:
+        D, I = search_subset(index, query, top_k, candidate_ids)
+    else:
+        D, I = index.search(query, top_k)
     return I, D
 
 # Initialize Pinecone and OpenAI
@@ -80,7 +137,23 @@ def search_image_by_text_with_captioning(text_query: str, top_k: int) -> List[st
     return [os.path.join(data_path, match['id']) for match in result['matches'] if os.path.exists(os.path.join(data_path, match['id']))]
 
 # OCR search
+def search_images_by_ocr_ranked(text_query: str, top_k: int, candidate_ids: np.ndarray = None) -> List[Tuple[str, float]]:
+    """BM25-ranked (image_path, score) pairs from the OCR index, or None if the index is not built."""
+    ocr_index = load_ocr_index()
+    frame_table = load_frame_table() if ocr_index is not None else None
+    if frame_table is None:
+        return None
+    frame_ids, scores = ocr_index.search(text_query, top_k, candidate_ids)
+    return [(path, float(score)) for path, score in zip(frame_table.paths(frame_ids), scores) if path]
+
 def search_images_by_ocr(text_query: str, top_k: int) -> List[str]:
+    ranked = search_images_by_ocr_ranked(text_query, top_k)
+    if ranked is not None:
+        return [path for path, _ in ranked]
+    return search_images_by_ocr_scan(text_query, top_k)
+
+def search_images_by_ocr_scan(text_query: str, top_k: int) -> List[str]:
+    """Unranked substring match over the OCR JSON files (used when no OCR index is built)."""
     matching_paths = []
     ocr_folder = "/content/drive/MyDrive/HCMC_AI/data/ocr"
     for root, _, files in os.walk(ocr_folder):
@@ -107,6 +180,9 @@ def search_images_by_ocr(text_query: str, top_k: int) -> List[str]:
 def get_image_paths(image_indices: np.ndarray, id2img_fps: Dict[str, Dict[str, str]]) -> List[str]:
     image_paths = []
     for idx in image_indices[0]:
+        if idx < 0:
+            # FAISS pads results with -1 when fewer than top_k frames qualify
+            continue
         image_info = id2img_fps.get(str(idx))
         if image_info:
             image_paths.append(image_info.get("image_path", ""))
@@ -0,0 +1,49 @@
+# utilities/query_by_example.py
+"""
+Query-by-example: search the CLIP index with frames that are already in it.
+
+The example frames' vectors are read back from the index by global frame id
+(`reconstruct_batch`, which the float32, compressed and sharded indexes all
+provide), so no image is decoded and no vision forward pass runs. Several
+examples are averaged into one query vector. The examples themselves, and
+optionally every frame of their videos, are left out of the results.
+"""
+import numpy as np
+
+from utilities.subset_search import search_subset
+
+
+def example_query_vector(index, frame_ids):
+    """Normalized mean of the indexed vectors of `frame_ids`, shaped (1, d)."""
+    vectors = np.asarray(index.reconstruct_batch(np.asarray(frame_ids, dtype=np.int64)), dtype=np.float32)
+    query = vectors.mean(axis=0, keepdims=True)
+    norm = np.linalg.norm(query)
+    return query / norm if norm > 0 else query
+
+
+def search_by_example(index, frame_ids, top_k, video_codes=None, candidate_ids=None):
+    """
+    (D, I) of the top_k frames closest to the mean of `frame_ids`, excluding
+    the examples. With `video_codes` (video code per frame id, as in
+    FrameTable.video_codes) the examples' videos are excluded as well;
+    `candidate_ids` restricts the search like a compiled search filter.
+    """
+    frame_ids = np.asarray(frame_ids, dtype=np.int64)
+    query = example_query_vector(index, frame_ids)
+    if video_codes is None and candidate_ids is None:
+        # Only the examples to drop: over-fetch by their count
+        D, I = index.search(query, top_k + len(frame_ids))
+        keep = ~np.isin(I[0], frame_ids)
+        return D[:, keep][:, :top_k], I[:, keep][:, :top_k]
+
+    allowed = np.ones(index.ntotal, dtype=bool)
+    if candidate_ids is not None:
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        allowed[:] = False
+        allowed[candidate_ids[(candidate_ids >= 0) & (candidate_ids < index.ntotal)]] = True
+    allowed[frame_ids] = False
+    if video_codes is not None:
+        size = min(len(video_codes), index.ntotal)
+        example_videos = video_codes[frame_ids[frame_ids < size]]
+        allowed[:size] &= ~np.isin(video_codes[:size], example_videos[example_videos >= 0])
+    return search_subset(index, query, top_k, np.flatnonzero(allowed))
@@ -0,0 +1,29 @@
+# utilities/rank_fusion.py
+"""Reciprocal rank fusion of ranked result lists from different retrievers."""
+from collections import defaultdict
+
+# Damping constant from the original RRF paper
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K, weights=None, key='image_path'):
+    """
+    Fuse ranked lists of result dicts into one list ordered by RRF score.
+
+    Each result's score is the sum over lists of weight / (k + rank). Fields
+    from every list are merged into one dict per `key`, and the fused score is
+    stored under 'fused_score'.
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    scores = defaultdict(float)
+    merged = {}
+    for results, weight in zip(ranked_lists, weights):
+        for rank, result in enumerate(results, start=1):
+            item_key = result[key]
+            scores[item_key] += weight / (k + rank)
+            merged.setdefault(item_key, {}).update(result)
+
+    fused = sorted(merged.values(), key=lambda result: -scores[result[key]])
+    for result in fused:
+        result['fused_score'] = scores[result[key]]
+    return fused
@@ -0,0 +1,31 @@
+# utilities/relevance_feedback.py
+"""
+Rocchio relevance feedback for CLIP search.
+
+The refined query is the text embedding moved towards the frames the user
+selected and away from the ones they deleted:
+
+    q' = q + alpha * mean(selected vectors) - beta * mean(deleted vectors)
+
+renormalized. Frame vectors are read back from the index by global frame id,
+so a refinement costs one reconstruct and one search, with no LLM call.
+"""
+import numpy as np
+
+ROCCHIO_ALPHA = 0.75
+ROCCHIO_BETA = 0.25
+
+
+def mean_vector(index, frame_ids):
+    return np.asarray(index.reconstruct_batch(np.asarray(frame_ids, dtype=np.int64)), dtype=np.float32).mean(axis=0)
+
+
+def rocchio_query(query_vector, index, positive_ids=(), negative_ids=(), alpha=ROCCHIO_ALPHA, beta=ROCCHIO_BETA):
+    """Refined (1, d) query from `query_vector` and the feedback frames' indexed vectors."""
+    query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1).copy()
+    if len(positive_ids):
+        query += alpha * mean_vector(index, positive_ids)
+    if len(negative_ids):
+        query -= beta * mean_vector(index, negative_ids)
+    norm = np.linalg.norm(query)
+    return query / norm if norm > 0 else query
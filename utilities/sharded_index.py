@@ -0,0 +1,203 @@
+# utilities/sharded_index.py
+"""
+CLIP index split into one shard per data part (L01, L02, ...).
+
+Each shard is a FAISS index over the frames of one part plus the sorted
+global frame ids of its rows. Searches fan out over a thread pool (FAISS
+releases the GIL) and the per-shard results are merged into a global top-k
+with global frame ids, so callers see the same (D, I) as from the single
+index. Shards can be loaded and unloaded independently; unloaded shards are
+skipped. Queries scoped to some parts, directly or through a candidate set
+(e.g. a `parts` or `videos` filter), only touch the shards involved.
+
+Build from the float32 index and frame table with:
+    python -m utilities.sharded_index
+"""
+import argparse
+import json
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+from data_loaders.frame_table import FrameTable, FRAME_TABLE_PATH, ID2IMG_FPS_PATH
+from utilities.compressed_index import FLOAT32_INDEX_PATH
+from utilities.subset_search import search_subset
+
+logger = logging.getLogger(__name__)
+
+SHARDED_INDEX_DIR = "/content/drive/MyDrive/HCMC_AI/data/faiss_clip_16_shards"
+BUILD_CHUNK = 65536
+
+
+def data_part_of_dir(dir_path):
+    """Data part of a keyframe directory, e.g. .../Mid_Frames/L01_extra/V001 -> L01."""
+    return dir_path.rstrip('/').split('/')[-2].split('_')[0]
+
+
+def frame_parts(frame_table):
+    """(sorted part names, part code per global frame id or -1)."""
+    dir_parts = [data_part_of_dir(dir_path) for dir_path in frame_table.dirs]
+    parts = sorted(set(dir_parts))
+    part_lookup = {part: code for code, part in enumerate(parts)}
+    part_of_dir = np.array([part_lookup[part] for part in dir_parts] + [-1], dtype=np.int32)
+    return parts, part_of_dir[frame_table.dir_codes]
+
+
+def build_sharded_index(index, frame_table, output_dir=SHARDED_INDEX_DIR, parts=None):
+    """Write one flat shard per data part of `index`; with `parts`, only those shards are rewritten."""
+    os.makedirs(output_dir, exist_ok=True)
+    all_parts, part_codes = frame_parts(frame_table)
+    size = min(len(part_codes), index.ntotal)
+    for code, part in enumerate(all_parts):
+        if parts and part not in parts:
+            continue
+        ids = np.flatnonzero(part_codes[:size] == code).astype(np.int64)
+        shard = faiss.IndexFlat(index.d, index.metric_type)
+        for start in range(0, len(ids), BUILD_CHUNK):
+            shard.add(index.reconstruct_batch(ids[start:start + BUILD_CHUNK]))
+        tmp_index, tmp_ids = os.path.join(output_dir, f"{part}.index.tmp"), os.path.join(output_dir, f"{part}_ids.tmp.npy")
+        faiss.write_index(shard, tmp_index)
+        np.save(tmp_ids, ids)
+        os.replace(tmp_ids, os.path.join(output_dir, f"{part}_ids.npy"))
+        os.replace(tmp_index, os.path.join(output_dir, f"{part}.index"))
+        logger.info(f"Shard {part}: {len(ids)} frames")
+
+    tmp_meta = os.path.join(output_dir, 'meta.json.tmp')
+    with open(tmp_meta, "w") as f:
+        json.dump({'parts': all_parts, 'd': index.d, 'metric_type': int(index.metric_type), 'ntotal': size}, f)
+    os.replace(tmp_meta, os.path.join(output_dir, 'meta.json'))
+
+
+class ShardedIndex:
+    def __init__(self, index_dir, parts, shard_ids, d, metric_type, ntotal, max_workers=4):
+        self.index_dir = index_dir
+        self.parts = list(parts)
+        self.shard_ids = shard_ids
+        self.d = d
+        self.metric_type = metric_type
+        self.ntotal = ntotal
+        self.shards = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="faiss-shard")
+
+        # Global frame id -> (shard, row in shard)
+        self.shard_of = np.full(ntotal, -1, dtype=np.int32)
+        self.row_of = np.zeros(ntotal, dtype=np.int64)
+        for code, part in enumerate(self.parts):
+            ids = shard_ids[part]
+            self.shard_of[ids] = code
+            self.row_of[ids] = np.arange(len(ids))
+
+    @classmethod
+    def load(cls, index_dir=SHARDED_INDEX_DIR, parts=None, max_workers=4):
+        """Open the sharded index, loading the shards in `parts` (all by default)."""
+        with open(os.path.join(index_dir, 'meta.json'), "r") as f:
+            meta = json.load(f)
+        shard_ids = {part: np.load(os.path.join(index_dir, f"{part}_ids.npy")) for part in meta['parts']}
+        sharded = cls(index_dir, meta['parts'], shard_ids, meta['d'], meta['metric_type'], meta['ntotal'], max_workers)
+        for part in parts or meta['parts']:
+            sharded.load_shard(part)
+        return sharded
+
+    @property
+    def loaded_parts(self):
+        return [part for part in self.parts if part in self.shards]
+
+    def load_shard(self, part):
+        if part not in self.shard_ids:
+            raise KeyError(f"No shard for data part {part}")
+        with self.lock:
+            if part not in self.shards:
+                self.shards[part] = faiss.read_index(os.path.join(self.index_dir, f"{part}.index"))
+
+    def unload_shard(self, part):
+        with self.lock:
+            self.shards.pop(part, None)
+
+    def _better_first(self, D):
+        return np.argsort(-D if self.metric_type == faiss.METRIC_INNER_PRODUCT else D, axis=1, kind='stable')
+
+    def _merge(self, results, n_queries, top_k):
+        """Global top_k from per-shard (D, global I) results, -1 padded like FAISS."""
+        worst = -np.inf if self.metric_type == faiss.METRIC_INNER_PRODUCT else np.inf
+        D = np.full((n_queries, top_k), worst, dtype=np.float32)
+        I = np.full((n_queries, top_k), -1, dtype=np.int64)
+        if not results:
+            return D, I
+        all_D = np.hstack([shard_D for shard_D, _ in results] + [D])
+        all_I = np.hstack([shard_I for _, shard_I in results] + [I])
+        all_D = np.where(all_I >= 0, all_D, worst)
+        order = self._better_first(all_D)[:, :top_k]
+        return np.take_along_axis(all_D, order, axis=1), np.take_along_axis(all_I, order, axis=1)
+
+    def _search_shard(self, part, query_vectors, top_k, rows=None):
+        shard = self.shards.get(part)
+        if shard is None:
+            return None
+        if rows is None or len(rows) == shard.ntotal:
+            D, I = shard.search(query_vectors, min(top_k, shard.ntotal))
+        else:
+            D, I = search_subset(shard, query_vectors, top_k, rows)
+        ids = self.shard_ids[part]
+        return D, np.where(I >= 0, ids[np.maximum(I, 0)], -1)
+
+    def search(self, query_vectors, top_k, parts=None):
+        """Global top_k over the loaded shards, or only over `parts`."""
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        parts = [part for part in (parts or self.parts) if part in self.shards]
+        results = self.executor.map(lambda part: self._search_shard(part, query_vectors, top_k), parts)
+        return self._merge([result for result in results if result is not None], len(query_vectors), top_k)
+
+    def search_candidates(self, query_vectors, top_k, candidate_ids):
+        """`search` limited to `candidate_ids`; shards without candidates are not searched."""
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        candidate_ids = candidate_ids[(candidate_ids >= 0) & (candidate_ids < self.ntotal)]
+        codes = self.shard_of[candidate_ids]
+        jobs = []
+        for code in np.unique(codes[codes >= 0]):
+            part = self.parts[code]
+            if part in self.shards:
+                jobs.append((part, np.sort(self.row_of[candidate_ids[codes == code]])))
+        results = self.executor.map(lambda job: self._search_shard(job[0], query_vectors, top_k, job[1]), jobs)
+        return self._merge([result for result in results if result is not None], len(query_vectors), top_k)
+
+    def reconstruct_batch(self, frame_ids):
+        frame_ids = np.asarray(frame_ids, dtype=np.int64)
+        vectors = np.zeros((len(frame_ids), self.d), dtype=np.float32)
+        codes = self.shard_of[frame_ids]
+        for code in np.unique(codes):
+            if code < 0 or self.parts[code] not in self.shards:
+                raise KeyError(f"Frames {frame_ids[codes == code][:5].tolist()} are not in a loaded shard")
+            selected = codes == code
+            vectors[selected] = self.shards[self.parts[code]].reconstruct_batch(self.row_of[frame_ids[selected]])
+        return vectors
+
+    def reconstruct(self, frame_id):
+        return self.reconstruct_batch([frame_id])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the CLIP FAISS index into one shard per data part")
+    parser.add_argument('--index', default=FLOAT32_INDEX_PATH)
+    parser.add_argument('--frame-table', default=FRAME_TABLE_PATH)
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--output', default=SHARDED_INDEX_DIR)
+    parser.add_argument('--parts', nargs='*', help="only rebuild these shards")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if os.path.exists(args.frame_table):
+        frame_table = FrameTable.load(args.frame_table)
+    else:
+        with open(args.id2img_fps, "r") as f:
+            frame_table = FrameTable.from_id2img_fps(json.load(f))
+    build_sharded_index(faiss.read_index(args.index), frame_table, args.output, args.parts)
+
+
+if __name__ == '__main__':
+    main()
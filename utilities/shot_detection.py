@@ -0,0 +1,83 @@
+# utilities/shot_detection.py
+"""
+Shot-boundary detection on downscaled frames.
+
+Frames arrive in chunks (N, H, W, 3 uint8) from a decoder. For each frame we
+keep only a normalized per-channel colour histogram and the mean absolute
+difference to the previous frame, so a whole video never has to be held in
+memory. A cut is declared where the histogram distance jumps, or where the
+frame difference jumps together with a smaller histogram change. Each shot
+contributes its middle frame as keyframe (long shots one per segment).
+"""
+import numpy as np
+
+HISTOGRAM_BINS = 16
+# Half-L1 histogram distance in [0, 1] at which consecutive frames are a cut
+HISTOGRAM_THRESHOLD = 0.35
+# Mean absolute pixel difference in [0, 1] that confirms a cut with half the histogram distance
+PIXEL_THRESHOLD = 0.3
+
+
+def frame_histograms(frames, bins=HISTOGRAM_BINS):
+    """Per-frame RGB histograms, each channel normalized to sum to 1: (N, 3 * bins)."""
+    n_frames = len(frames)
+    pixels = frames.reshape(n_frames, -1, 3)
+    codes = (pixels // (256 // bins)).astype(np.int64) + np.arange(3) * bins
+    codes += (np.arange(n_frames) * 3 * bins)[:, None, None]
+    counts = np.bincount(codes.ravel(), minlength=n_frames * 3 * bins).reshape(n_frames, 3 * bins)
+    return counts.astype(np.float32) / pixels.shape[1]
+
+
+class ShotDetector:
+    """Accumulates frame statistics chunk by chunk and finds shot boundaries."""
+
+    def __init__(self, histogram_threshold=HISTOGRAM_THRESHOLD, pixel_threshold=PIXEL_THRESHOLD, bins=HISTOGRAM_BINS):
+        self.histogram_threshold = histogram_threshold
+        self.pixel_threshold = pixel_threshold
+        self.bins = bins
+        self.histogram_diffs = []
+        self.pixel_diffs = []
+        self.last_histogram = None
+        self.last_frame = None
+        self.n_frames = 0
+
+    def update(self, frames):
+        if len(frames) == 0:
+            return
+        histograms = frame_histograms(frames, self.bins)
+        frames = frames.astype(np.int16)
+        previous_histograms = np.concatenate([histograms[:1] if self.last_histogram is None else self.last_histogram[None], histograms[:-1]])
+        previous_frames = np.concatenate([frames[:1] if self.last_frame is None else self.last_frame[None], frames[:-1]])
+        # Half-L1 per channel, averaged over channels: 0 for identical, 1 for disjoint
+        self.histogram_diffs.append(np.abs(histograms - previous_histograms).sum(axis=1) / 6)
+        self.pixel_diffs.append(np.abs(frames - previous_frames).reshape(len(frames), -1).mean(axis=1) / 255)
+        self.last_histogram = histograms[-1]
+        self.last_frame = frames[-1]
+        self.n_frames += len(frames)
+
+    def boundaries(self, min_shot_frames=1):
+        """Start frame of every shot (always including 0)."""
+        if self.n_frames == 0:
+            return np.zeros(0, dtype=np.int64)
+        histogram_diffs = np.concatenate(self.histogram_diffs)
+        pixel_diffs = np.concatenate(self.pixel_diffs)
+        cuts = np.flatnonzero(
+            (histogram_diffs >= self.histogram_threshold)
+            | ((pixel_diffs >= self.pixel_threshold) & (histogram_diffs >= self.histogram_threshold / 2))
+        )
+        starts = [0]
+        for cut in cuts:
+            if cut - starts[-1] >= min_shot_frames:
+                starts.append(int(cut))
+        return np.asarray(starts, dtype=np.int64)
+
+
+def shot_keyframes(shot_starts, n_frames, max_shot_frames=None):
+    """Middle frame of each shot; shots longer than `max_shot_frames` give one keyframe per segment."""
+    shot_ends = np.append(shot_starts[1:], n_frames)
+    keyframes = []
+    for start, end in zip(shot_starts, shot_ends):
+        segments = 1 if not max_shot_frames else max(1, int(np.ceil((end - start) / max_shot_frames)))
+        edges = np.linspace(start, end, segments + 1)
+        keyframes.extend(int((low + high) // 2) for low, high in zip(edges[:-1], edges[1:]))
+    return np.unique(np.asarray(keyframes, dtype=np.int64))
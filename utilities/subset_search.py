@@ -0,0 +1,79 @@
+# utilities/subset_search.py
+"""
+FAISS search restricted to a candidate set of ids.
+
+Small candidate sets are scored exactly against their reconstructed vectors;
+larger ones go through FAISS with an IDSelectorBitmap so the index only ever
+returns ids from the set. Either way the top_k results all satisfy the filter
+without over-fetching. Index wrappers can provide their own
+`search_candidates(query_vectors, top_k, candidate_ids)` hook (not
+`search_subset`, which FAISS indexes already define with another signature).
+"""
+import logging
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Candidate sets up to this size are scored by reconstructing their vectors
+RECONSTRUCT_LIMIT = 20000
+
+
+def score_vectors(index, query_vectors, vectors):
+    """Distances in the index's metric: inner product (higher is better) or squared L2 (lower is better)."""
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return query_vectors @ vectors.T
+    return ((query_vectors ** 2).sum(axis=1)[:, None] - 2 * query_vectors @ vectors.T
+            + (vectors ** 2).sum(axis=1)[None, :])
+
+
+def pad_results(index, D, I, top_k):
+    """Pad (D, I) to top_k columns like FAISS: id -1 with the metric's worst distance."""
+    missing = top_k - I.shape[1]
+    if missing <= 0:
+        return D, I
+    worst = -np.inf if index.metric_type == faiss.METRIC_INNER_PRODUCT else np.inf
+    return (np.hstack([D, np.full((len(D), missing), worst, dtype=np.float32)]),
+            np.hstack([I, np.full((len(I), missing), -1, dtype=np.int64)]))
+
+
+def selector_parameters(index, selector):
+    """Search parameters carrying `selector`; IVF indexes need their own type, which also sets nprobe."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def search_reconstructed(index, query_vectors, top_k, candidate_ids):
+    vectors = index.reconstruct_batch(candidate_ids)
+    scores = score_vectors(index, query_vectors, vectors)
+    order = np.argsort(-scores if index.metric_type == faiss.METRIC_INNER_PRODUCT else scores, axis=1, kind='stable')[:, :top_k]
+    return np.take_along_axis(scores, order, axis=1).astype(np.float32), candidate_ids[order]
+
+
+def search_subset(index, query_vectors, top_k, candidate_ids, reconstruct_limit=RECONSTRUCT_LIMIT):
+    """`index.search` limited to `candidate_ids`. Returns (D, I) like FAISS, -1 padded."""
+    if hasattr(index, 'search_candidates'):
+        return index.search_candidates(query_vectors, top_k, candidate_ids)
+
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+    candidate_ids = candidate_ids[(candidate_ids >= 0) & (candidate_ids < index.ntotal)]
+    if len(candidate_ids) == 0:
+        empty = np.zeros((len(query_vectors), 0))
+        return pad_results(index, empty.astype(np.float32), empty.astype(np.int64), top_k)
+
+    if len(candidate_ids) <= reconstruct_limit:
+        try:
+            return pad_results(index, *search_reconstructed(index, query_vectors, top_k, candidate_ids), top_k)
+        except RuntimeError as e:
+            # Indexes without a direct map cannot reconstruct; use the selector instead
+            logger.debug(f"Reconstruct failed, searching with an id selector: {e}")
+
+    mask = np.zeros(index.ntotal, dtype=bool)
+    mask[candidate_ids] = True
+    bits = np.packbits(mask, bitorder='little')
+    selector = faiss.IDSelectorBitmap(index.ntotal, faiss.swig_ptr(bits))
+    return index.search(query_vectors, top_k, params=selector_parameters(index, selector))
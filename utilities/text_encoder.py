@@ -0,0 +1,120 @@
+# utilities/text_encoder.py
+"""
+Text-only CLIP inference path for query encoding.
+
+Query time only ever runs the text tower, so after loading ViT-B/16 the
+vision tower is dropped and the text transformer is wrapped on its own.
+On CPU its Linear layers are dynamically quantized to int8; the quantized
+encoder is only kept if its embeddings stay within TEXT_ENCODER_MIN_COSINE
+of the float32 tower on a set of reference queries, otherwise the float32
+tower is used. Intra-op threads are pinned (TEXT_ENCODER_THREADS) and the
+encoder is warmed up once at load so the first real query is not slow.
+
+`TextEncoder.encode_text(tokens)` has the same signature as CLIP's, so
+`model_utils.encode_text` works with either.
+
+Benchmark against the full model with:
+    python -m scripts.benchmark_text_encoder
+"""
+import copy
+import logging
+
+import clip
+import torch
+
+logger = logging.getLogger(__name__)
+
+CLIP_MODEL_NAME = "ViT-B/16"
+TEXT_ENCODER_MODES = ('full', 'text', 'int8')
+REFERENCE_QUERIES = [
+    "a man riding a motorbike on a busy street",
+    "news anchor in a studio with a blue background",
+    "cảnh một người phụ nữ đang nấu ăn trong bếp",
+    "a red bus parked next to a tall building at night",
+    "two children playing football on the grass",
+    "a banner with the text khai mạc",
+]
+
+
+class TextEncoder(torch.nn.Module):
+    """CLIP's text tower (token embedding, transformer, final projection) without the vision tower."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.token_embedding = model.token_embedding
+        self.positional_embedding = model.positional_embedding
+        self.transformer = model.transformer
+        self.ln_final = model.ln_final
+        self.text_projection = model.text_projection
+        self.dtype = model.dtype
+
+    def forward(self, text):
+        x = self.token_embedding(text).type(self.dtype) + self.positional_embedding.type(self.dtype)
+        x = self.transformer(x.permute(1, 0, 2)).permute(1, 0, 2)
+        x = self.ln_final(x).type(self.dtype)
+        # Features at the end-of-text token (highest token id in each sequence)
+        return x[torch.arange(x.shape[0]), text.argmax(dim=-1)] @ self.text_projection
+
+    def encode_text(self, text):
+        return self.forward(text)
+
+
+def normalized(features):
+    features = features.float()
+    return features / features.norm(dim=-1, keepdim=True)
+
+
+def encoder_cosines(encoder, reference, device, queries=REFERENCE_QUERIES):
+    """Cosine similarity of `encoder` to `reference` embeddings for each of `queries`."""
+    tokens = clip.tokenize(queries).to(device)
+    with torch.no_grad():
+        return (normalized(encoder.encode_text(tokens)) * normalized(reference.encode_text(tokens))).sum(dim=-1)
+
+
+def quantize_text_encoder(encoder):
+    """Dynamic int8 quantization of the Linear layers (CPU only)."""
+    return torch.quantization.quantize_dynamic(copy.deepcopy(encoder).float(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def warm_up(encoder, device, runs=2):
+    tokens = clip.tokenize(REFERENCE_QUERIES[:1]).to(device)
+    with torch.no_grad():
+        for _ in range(runs):
+            encoder.encode_text(tokens)
+
+
+def load_text_encoder(mode='int8', device='cpu', threads=0, min_cosine=0.99, model_name=CLIP_MODEL_NAME):
+    """
+    (encoder, preprocess) of CLIP `model_name` for query encoding. `mode` is
+    'full' (the whole CLIP model), 'text' (text tower only) or 'int8'
+    (quantized text tower on CPU, falling back to 'text' if it drifts below
+    `min_cosine`).
+    """
+    if mode not in TEXT_ENCODER_MODES:
+        raise ValueError(f"Unsupported text encoder mode: {mode} (expected one of {TEXT_ENCODER_MODES})")
+    if threads:
+        torch.set_num_threads(threads)
+
+    model, preprocess = clip.load(model_name, device=device)
+    model.eval()
+    if mode == 'full':
+        warm_up(model, device)
+        return model, preprocess
+
+    encoder = TextEncoder(model).eval()
+    # Drop the vision tower; only the text tower is referenced from here on
+    del model
+
+    if mode == 'int8':
+        if device != 'cpu':
+            logger.info("Dynamic int8 quantization is CPU-only, using the float text tower")
+        else:
+            quantized = quantize_text_encoder(encoder)
+            cosines = encoder_cosines(quantized, encoder, device)
+            if float(cosines.min()) >= min_cosine:
+                encoder = quantized
+            else:
+                logger.warning(f"int8 text encoder drifts to cosine {float(cosines.min()):.4f} < {min_cosine}, using float32")
+
+    warm_up(encoder, device)
+    return encoder, preprocess
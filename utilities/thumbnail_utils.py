@@ -0,0 +1,100 @@
+# utilities/thumbnail_utils.py
+"""
+Thumbnail tier for result grids.
+
+Thumbnails mirror the Mid_Frames layout under THUMBNAIL_DIR
+(`{data_part}/{video_id}/{frame}.webp`). `get_thumbnail` is read-through: it
+returns the cached thumbnail or generates it on first use, and falls back to
+the full-size keyframe if generation fails.
+
+Pre-generate for the whole corpus with:
+    python -m utilities.thumbnail_utils --workers 8
+"""
+import argparse
+import json
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ID2IMG_FPS_PATH = "/content/drive/MyDrive/HCMC_AI/data/id2img_fps_mid_full.json"
+
+
+def thumbnail_path_for(image_path, thumbnail_dir=None):
+    parts = image_path.split('/')
+    data_part, video_id = parts[-3], parts[-2]
+    stem = os.path.splitext(parts[-1])[0]
+    extension = 'webp' if Config.THUMBNAIL_FORMAT.lower() == 'webp' else 'jpg'
+    return os.path.join(thumbnail_dir or Config.THUMBNAIL_DIR, data_part, video_id, f"{stem}.{extension}")
+
+
+def generate_thumbnail(image_path, thumbnail_path, max_side=None, quality=None):
+    max_side = max_side or Config.THUMBNAIL_MAX_SIDE
+    quality = quality or Config.THUMBNAIL_QUALITY
+    os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+
+    with Image.open(image_path) as image:
+        image = image.convert('RGB')
+        image.thumbnail((max_side, max_side))
+        tmp_path = f"{thumbnail_path}.tmp"
+        image_format = 'WEBP' if thumbnail_path.endswith('.webp') else 'JPEG'
+        image.save(tmp_path, format=image_format, quality=quality)
+    os.replace(tmp_path, thumbnail_path)
+    return thumbnail_path
+
+
+def get_thumbnail(image_path):
+    """Path of the thumbnail for `image_path`, generating it if needed."""
+    thumbnail_path = thumbnail_path_for(image_path)
+    if os.path.exists(thumbnail_path):
+        return thumbnail_path
+    try:
+        return generate_thumbnail(image_path, thumbnail_path)
+    except Exception as e:
+        logger.warning(f"Could not create thumbnail for {image_path}: {e}")
+        return image_path
+
+
+def build_thumbnails(image_paths, workers=8):
+    """Generate missing thumbnails for `image_paths`. Returns (created, failed)."""
+    def build_one(image_path):
+        thumbnail_path = thumbnail_path_for(image_path)
+        if os.path.exists(thumbnail_path):
+            return None
+        try:
+            generate_thumbnail(image_path, thumbnail_path)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not create thumbnail for {image_path}: {e}")
+            return False
+
+    created = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, result in enumerate(executor.map(build_one, image_paths), start=1):
+            created += result is True
+            failed += result is False
+            if i % 10000 == 0:
+                logger.info(f"{i}/{len(image_paths)} frames checked, {created} thumbnails created")
+    return created, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate keyframe thumbnails")
+    parser.add_argument('--id2img-fps', default=ID2IMG_FPS_PATH)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.id2img_fps, "r") as f:
+        image_paths = [info['image_path'] for info in json.load(f).values() if info.get('image_path')]
+    created, failed = build_thumbnails(image_paths, args.workers)
+    logger.info(f"Created {created} thumbnails ({failed} failed) in {Config.THUMBNAIL_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,29 +2,44 @@
 
 import streamlit as st
 import os
-from utilities.video_utils import get_temporal_frames, get_video_and_frame_idx, display_video_for_frame
+from utilities.video_utils import get_temporal_frames, get_video_and_frame_idx, get_video_and_frame_idx_batch, display_video_for_frame
 from utilities.model_utils import load_id2img_fps
-from session.session_state import toggle_select, toggle_delete
+from utilities.thumbnail_utils import get_thumbnail
+from session.session_state import toggle_select, toggle_delete, toggle_example
 
 id2img_fps = load_id2img_fps()
 
-def display_image_with_buttons(path, id2img_fps, index, is_validated=False):
-    video_name, frame_idx, time_display, mili = get_video_and_frame_idx(path, id2img_fps)
+def display_image_with_buttons(path, id2img_fps, index, is_validated=False, frame_info=None, key_prefix=None):
+    video_name, frame_idx, time_display, mili = frame_info or get_video_and_frame_idx(path, id2img_fps)
+    key_prefix = key_prefix or ('validated' if is_validated else 'regular')
 
-    st.image(path, caption=f"{index+1}. {video_name}, Time: {time_display}, Mili: {mili}s")
+    st.image(get_thumbnail(path), caption=f"{index+1}. {video_name}, Time: {time_display}, Mili: {mili}s")
+    display_full_size_toggle(path, f"{index+1}", key_prefix=key_prefix)
 
     if not is_validated:
-        if st.button(f"Play Video {video_name}", key=f"play_{path}"):
+        if st.button(f"Play Video {video_name}", key=f"play_{key_prefix}_{path}"):
             display_video_for_frame(video_name, frame_idx)
 
-        if st.button(f"Select Image {index+1}", key=f"select_{path}"):
-            toggle_select((video_name, frame_idx))
+        if st.button(f"Select Image {index+1}", key=f"select_{key_prefix}_{path}"):
+            toggle_select((video_name, frame_idx), path)
 
-        if st.button(f"Delete Image {index+1}", key=f"delete_{path}"):
+        if st.button(f"Delete Image {index+1}", key=f"delete_{key_prefix}_{path}"):
             toggle_delete(path)
 
+    example_label = "Remove Example" if path in st.session_state.get('example_images', []) else "Find Similar"
+    if st.button(f"{example_label} {index+1}", key=f"example_{key_prefix}_{path}"):
+        toggle_example(path)
+
     return video_name, frame_idx
 
+def display_full_size_toggle(path, label, key_prefix):
+    # Grids show thumbnails; the full-size keyframe is only loaded on demand
+    full_size_images = st.session_state.setdefault('full_size_images', set())
+    if st.button(f"Full Size {label}", key=f"full_size_{key_prefix}_{path}"):
+        full_size_images.symmetric_difference_update({path})
+    if path in full_size_images:
+        st.image(path, use_column_width=True)
+
 def display_validation_details(validation, video_name, frame_idx, index):
     confidence = validation['match_assessment']['confidence']
     category = validation['match_assessment']['category']
@@ -38,7 +53,7 @@ def display_validation_details(validation, video_name, frame_idx, index):
     if st.button(f"Play Video {video_name}", key=f"play_validated_{validation['image_path']}"):
         display_video_for_frame(video_name, frame_idx)
     if st.button(f"Select {index+1}", key=f"select_validated_{validation['image_path']}"):
-        toggle_select((video_name, frame_idx))
+        toggle_select((video_name, frame_idx), validation['image_path'])
     if st.button(f"Delete {index+1}", key=f"delete_validated_{validation['image_path']}"):
         toggle_delete(validation['image_path'])
 
@@ -48,12 +63,14 @@ def display_surrounding_frames(clicked_image_path, id2img_fps):
         surrounding_frames = get_temporal_frames(clicked_image_path, min_distance=50, temporal_range=5)
         st.subheader("Surrounding Frames")
         surrounding_cols = st.columns(5)
+        frame_infos = get_video_and_frame_idx_batch(surrounding_frames, id2img_fps)
         for i, frame_path in enumerate(surrounding_frames):
-            surr_video_name, surr_frame_idx, surr_time_display, surr_mili = get_video_and_frame_idx(frame_path, id2img_fps)
+            surr_video_name, surr_frame_idx, surr_time_display, surr_mili = frame_infos[i]
             with surrounding_cols[i % 5]:
-                st.image(frame_path, caption=f"{i+1}. {surr_video_name}, {os.path.basename(frame_path)}, Mili:{surr_mili}s ", use_column_width=True)
+                st.image(get_thumbnail(frame_path), caption=f"{i+1}. {surr_video_name}, {os.path.basename(frame_path)}, Mili:{surr_mili}s ", use_column_width=True)
+                display_full_size_toggle(frame_path, f"Surr {i+1}", key_prefix='surr')
                 if st.button(f"Select Surr {i+1}", key=f"select_surr_{frame_path}"):
-                    toggle_select((surr_video_name, surr_frame_idx))
+                    toggle_select((surr_video_name, surr_frame_idx), frame_path)
                 if st.button(f"Delete Surr {i+1}", key=f"delete_surr_{frame_path}"):
                     toggle_delete(frame_path)
 
@@ -70,3 +87,22 @@ def create_image_selector(image_paths, key_prefix):
     if st.session_state.get('clicked_image_path'):
         if st.button("Display Surrounding Frames", key=f'{key_prefix}_display_surrounding_frames_button'):
             display_surrounding_frames(st.session_state.clicked_image_path, id2img_fps)
+
+def create_search_filter_inputs():
+    """Filter expression (see services.search_filters) from the sidebar filter inputs, or None."""
+    def split_terms(text):
+        return [term.strip() for term in text.split(',') if term.strip()]
+
+    with st.sidebar.expander("Search filters"):
+        parts = split_terms(st.text_input("Data parts (comma separated, e.g. L01, L02)", key='filter_parts'))
+        videos = split_terms(st.text_input("Videos (comma separated, e.g. L01_V001)", key='filter_videos'))
+        use_time_range = st.checkbox("Limit to a time range", key='filter_use_time_range')
+        time_range = st.slider("Time range (seconds)", 0, 3600, (0, 3600), key='filter_time_range') if use_time_range else None
+        objects = split_terms(st.text_input("Objects (all of)", key='filter_objects'))
+        counts = split_terms(st.text_input("Object counts (all of)", key='filter_counts'))
+        ocr = split_terms(st.text_input("OCR text (any of)", key='filter_ocr'))
+
+    filters = {'parts': parts, 'videos': videos, 'time_range': list(time_range) if time_range else None,
+               'objects': objects, 'counts': counts, 'ocr': ocr}
+    filters = {key: value for key, value in filters.items() if value}
+    return filters or None
@@ -1,23 +1,17 @@
 # utilities/video_utils.py
 import os
-import subprocess
+import numpy as np
 import pandas as pd
 import streamlit as st
 import re  # Added for sanitization
+import logging
 
 from utilities.utils import sanitize_filename  # Importing sanitize_filename
+from data_loaders.keyframe_index import load_keyframe_index
+from data_loaders.frame_table import load_frame_table
+from utilities.clip_cache import get_clip_cache
 
-def generate_unique_file_name(base_name, extension):
-    """Generate a unique file name to avoid overwriting existing files."""
-    counter = 1
-    new_file_name = f"{base_name}{extension}"
-
-    # Loop to find an available file name by appending a counter to the base name
-    while os.path.exists(new_file_name):
-        new_file_name = f"{base_name}_{counter}{extension}"
-        counter += 1
-
-    return new_file_name
+logger = logging.getLogger(__name__)
 
 # Extract video segment based on time
 def find_video_file(base_path, video_part, video_id):
@@ -36,36 +30,37 @@ def find_video_file(base_path, video_part, video_id):
 
 def extract_video_segment(video_id, start_time, end_time):
     video_id = sanitize_filename(video_id)
-    video_part = video_id.split('_')[0]
-    base_path = "/content/drive/MyDrive/HCMC_AI/AIC_Video"
-
-    video_path = find_video_file(base_path, video_part, video_id)
+    video_path = resolve_video_path(video_id)
 
     if not video_path:
         error_message = f"Video file not found for ID: {video_id}"
         return None, error_message
 
-    base_output_file = f"{video_id}_segment"
-    output_video_file = generate_unique_file_name(base_output_file, ".mp4")
-    output_video_file = sanitize_filename(output_video_file)
-
-    command = [
-        "ffmpeg", "-ss", str(start_time), "-to", str(end_time),
-        "-i", video_path, "-c", "copy", output_video_file
-    ]
+    return get_clip_cache().get(video_id, video_path, start_time, end_time)
 
-    try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        return output_video_file, None
-    except subprocess.CalledProcessError as e:
-        error_message = f"Error executing ffmpeg: {e.stderr}"
-        return None, error_message
+def resolve_video_path(video_id):
+    video_part = video_id.split('_')[0]
+    base_path = "/content/drive/MyDrive/HCMC_AI/AIC_Video"
+    return find_video_file(base_path, video_part, video_id)
+
+def video_segment_bounds(frame_time):
+    # Clip 60 seconds either side of the frame
+    return max(0, frame_time - 60), frame_time + 60
+
+def prefetch_video_segments(frame_infos):
+    """Cut clips for (video_name, frame_time) pairs in the background, e.g. for the top results."""
+    clips = []
+    for video_name, frame_time in frame_infos:
+        video_id = sanitize_filename(video_name)
+        video_path = resolve_video_path(video_id)
+        if video_path:
+            clips.append((video_id, video_path, *video_segment_bounds(frame_time)))
+    get_clip_cache().prefetch(clips)
 
 # Function to display the video for a specific frame
 def display_video_for_frame(video_name, frame_time):
     # Assume frame_time is in seconds (calculated from frame_idx)
-    start_time = max(0, frame_time - 60)  # Start 60 seconds before the frame
-    end_time = frame_time + 60  # End 60 seconds after the frame
+    start_time, end_time = video_segment_bounds(frame_time)
 
     # Call the function to extract the video segment for this time range
     output_video_file, error = extract_video_segment(video_name, start_time, end_time)
@@ -90,13 +85,27 @@ def display_video_for_frame(video_name, frame_time):
     else:
         st.error("Unable to extract and display the video segment.")
 
+def parse_image_path(image_path):
+    """Split a keyframe path into (data_part, video_id, frame_number)."""
+    parts = image_path.split('/')
+    return parts[-3], parts[-2], int(parts[-1].split('.')[0])
+
+def format_frame_time(time_in_seconds):
+    mili_seconds = int(time_in_seconds * 1000)
+    minutes = int(time_in_seconds // 60)
+    seconds = int(time_in_seconds % 60)
+    time_display = f"{minutes}p{seconds}s ({int(time_in_seconds)}s)"
+    return time_display, mili_seconds
+
 # Get video ID and frame index from the image path
 def get_video_and_frame_idx(image_path, id2img_fps):
-    parts = image_path.split('/')
-    data_part = parts[-3]
-    video_id = parts[-2]
-    frame_number_str = parts[-1].split('.')[0]
-    frame_number = int(frame_number_str)
+    keyframe_index = load_keyframe_index()
+    if keyframe_index is not None:
+        return get_video_and_frame_idx_batch([image_path], id2img_fps, keyframe_index)[0]
+    return get_video_and_frame_idx_from_csv(image_path)
+
+def get_video_and_frame_idx_from_csv(image_path):
+    data_part, video_id, frame_number = parse_image_path(image_path)
 
     csv_path = f"/content/drive/MyDrive/HCMC_AI/data/map-keyframes/{data_part.split('_')[0]}_{video_id}.csv"
 
@@ -109,15 +118,65 @@ def get_video_and_frame_idx(image_path, id2img_fps):
         frame_idx = df.loc[df['n'] == frame_number, 'frame_idx'].values[0]
 
     time_in_seconds = frame_idx / fps
-    mili_seconds = int(time_in_seconds * 1000)
-    minutes = int(time_in_seconds // 60)
-    seconds = int(time_in_seconds % 60)
-    time_display = f"{minutes}p{seconds}s ({int(time_in_seconds)}s)"
+    time_display, mili_seconds = format_frame_time(time_in_seconds)
 
     return f"{data_part.split('_')[0]}_{video_id}", time_in_seconds, time_display, mili_seconds
 
+def get_video_and_frame_idx_batch(image_paths, id2img_fps, keyframe_index=None):
+    """
+    Resolve many keyframe paths at once from the consolidated keyframe index.
+
+    Returns a list of (video_name, time_in_seconds, time_display, mili_seconds)
+    aligned with `image_paths`. Paths missing from the index fall back to the
+    per-video CSV lookup.
+    """
+    if keyframe_index is None:
+        keyframe_index = load_keyframe_index()
+    if keyframe_index is None:
+        return [get_video_and_frame_idx_from_csv(path) for path in image_paths]
+
+    parsed = [parse_image_path(path) for path in image_paths]
+    video_names = [f"{data_part.split('_')[0]}_{video_id}" for data_part, video_id, _ in parsed]
+    frame_numbers = np.array([frame_number for _, _, frame_number in parsed], dtype=np.int64)
+    is_extra = np.array(['extra' in data_part for data_part, _, _ in parsed], dtype=bool)
+
+    frame_idx, _, fps = keyframe_index.lookup_batch(video_names, frame_numbers)
+    # Extra frames are named by their frame index rather than keyframe number
+    frame_idx = np.where(is_extra, frame_numbers, frame_idx)
+    resolved = (frame_idx >= 0) & ~np.isnan(fps)
+    times = np.where(resolved, frame_idx / np.where(resolved, fps, 1.0), 0.0)
+
+    results = []
+    for i, path in enumerate(image_paths):
+        if not resolved[i]:
+            logger.warning(f"{path} not in keyframe index, reading map-keyframes CSV")
+            results.append(get_video_and_frame_idx_from_csv(path))
+            continue
+        time_display, mili_seconds = format_frame_time(times[i])
+        results.append((video_names[i], float(times[i]), time_display, mili_seconds))
+    return results
+
 # Get surrounding frames for a specific image
 def get_temporal_frames(image_path, min_distance=25, temporal_range=5):
+    frame_table = load_frame_table()
+    if frame_table is not None:
+        surrounding_frames = frame_table.neighbours(image_path, min_distance, temporal_range)
+        if surrounding_frames is not None:
+            return surrounding_frames
+    return get_temporal_frames_from_listdir(image_path, min_distance, temporal_range)
+
+def get_temporal_frames_batch(image_paths, min_distance=25, temporal_range=5):
+    """Surrounding frames for many anchor frames in one frame-table query."""
+    frame_table = load_frame_table()
+    if frame_table is None:
+        return [get_temporal_frames_from_listdir(path, min_distance, temporal_range) for path in image_paths]
+    neighbours = frame_table.neighbours_batch(image_paths, min_distance, temporal_range)
+    return [
+        frames if frames is not None else get_temporal_frames_from_listdir(path, min_distance, temporal_range)
+        for path, frames in zip(image_paths, neighbours)
+    ]
+
+def get_temporal_frames_from_listdir(image_path, min_distance=25, temporal_range=5):
     dir_path = os.path.dirname(image_path)
     all_images = sorted([img for img in os.listdir(dir_path) if img.endswith('.jpg')])
     selected_image_name = os.path.basename(image_path)